@@ -1,13 +1,65 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, send_file, jsonify, g, make_response
+from flask import send_from_directory
+from flask import before_render_template, template_rendered, stream_template, get_flashed_messages
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
+from concurrent.futures import ThreadPoolExecutor
+from markupsafe import Markup
+import bisect
+import calendar
+import click
+import codecs
 import csv
+import functools
+import gzip
+import hashlib
+import heapq
+import html
+import io
+import itertools
+import json
+import math
+import mimetypes
+import mmap
 import os
-from datetime import datetime
+import queue
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from urllib.parse import urljoin
+from urllib.request import urlopen
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within the process
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz copies of assets are built
+    brotli = None
 
 app = Flask(__name__)
 app.secret_key = 'mystery_club_secret_key_2024'  # Change this in production
 
+# Behind a reverse proxy every request arrives from the proxy's address.
+# MYSTERY_CLUB_PROXIES is the number of proxies in front of the app whose
+# X-Forwarded-For header is trusted for request.remote_addr (1 on
+# PythonAnywhere); leave it at 0 when clients connect directly, or they could
+# pick their own address.
+TRUSTED_PROXIES = int(os.environ.get('MYSTERY_CLUB_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -15,121 +67,3374 @@ login_manager.login_view = 'login'
 
 # User class for Flask-Login
 class User(UserMixin):
-    def __init__(self, id, username, password_hash):
+    def __init__(self, id, username, password_hash, role='admin'):
         self.id = id
         self.username = username
         self.password_hash = password_hash
+        self.role = role
 
-# Default admin user (in production, store this in a database or secure file)
-ADMIN_USER = User(1, 'admin', generate_password_hash('admin123'))
+# Default admin account, created in the users table on first run
+# The password hash is read precomputed from the environment, so importing the
+# app never runs the slow PBKDF2 derivation; `flask hash-password` prints one.
+# The fallback is the hash of the default password 'admin123'.
+DEFAULT_ADMIN_PASSWORD_HASH = 'pbkdf2:sha256:600000$Hd4Ala9MoyUMfhs9$8c73f16528460448b4ce2c6e9f5f1b51ce2e2dc6ca4fd0cc40d21b4b37069ebb'
+ADMIN_USER = User(
+    '1',
+    os.environ.get('MYSTERY_CLUB_ADMIN_USERNAME', 'admin'),
+    os.environ.get('MYSTERY_CLUB_ADMIN_PASSWORD_HASH', DEFAULT_ADMIN_PASSWORD_HASH),
+)
 
 @login_manager.user_loader
 def load_user(user_id):
-    if user_id == '1':
-        return ADMIN_USER
-    return None
+    return user_store.get(user_id)
 
 # CSV file paths
 ATTENDANCE_CSV = 'data/attendance.csv'
 MEMBERS_CSV = 'data/members.csv'
 FINANCES_CSV = 'data/finances.csv'
 EVENTS_CSV = 'data/events.csv'
+USERS_CSV = 'data/users.csv'
+TODO_CSV = 'data/todo.csv'
+TODO_CHANGES_CSV = 'data/todo_changes.csv'
+
+# Table definitions shared by every storage backend
+TABLES = {
+    'attendance': {'path': ATTENDANCE_CSV, 'columns': ['Date', 'Member Name', 'Session Name', 'Hours', 'Notes']},
+    'members': {'path': MEMBERS_CSV, 'columns': ['Member Name', 'Email', 'Join Date']},
+    'finances': {'path': FINANCES_CSV, 'columns': ['Date', 'Type', 'Category', 'Amount', 'Description']},
+    'events': {'path': EVENTS_CSV, 'columns': ['Event Name', 'Date', 'Time', 'Location', 'Description']},
+    'todo': {'path': TODO_CSV, 'columns': ['ID', 'Title', 'Due Date', 'Completed', 'Created Date']},
+    'todo_changes': {'path': TODO_CHANGES_CSV, 'columns': ['ID', 'Change', 'Date']},
+    'users': {'path': USERS_CSV, 'columns': ['User ID', 'Username', 'Password Hash', 'Role', 'Created Date']},
+}
 
-# Initialize CSV files if they don't exist
+# Storage backend: 'csv' (flat files under data/) or 'sqlite'
+STORAGE_BACKEND = os.environ.get('MYSTERY_CLUB_STORAGE', 'csv')
+SQLITE_DB = 'data/mystery_club.db'
+
+# Initialize data files if they don't exist
 def init_csv_files():
-    if not os.path.exists('data'):
-        os.makedirs('data')
-    
-    # Initialize attendance.csv
-    if not os.path.exists(ATTENDANCE_CSV):
-        with open(ATTENDANCE_CSV, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Date', 'Member Name', 'Session Name', 'Hours', 'Notes'])
-    
-    # Initialize members.csv
-    if not os.path.exists(MEMBERS_CSV):
-        with open(MEMBERS_CSV, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Member Name', 'Email', 'Join Date'])
+    storage.init_table('attendance')
+    storage.init_table('members')
 
 def init_finances_csv():
-    if not os.path.exists(FINANCES_CSV):
-        with open(FINANCES_CSV, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Date', 'Type', 'Category', 'Amount', 'Description'])
+    storage.init_table('finances')
 
 def init_events_csv():
-    if not os.path.exists(EVENTS_CSV):
-        with open(EVENTS_CSV, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Event Name', 'Date', 'Time', 'Location', 'Description'])
+    storage.init_table('events')
+
+def init_todos():
+    storage.init_table('todo')
+    storage.init_table('todo_changes')
+
+def init_users():
+    storage.init_table('users')
+    user_store.ensure_admin(ADMIN_USER, reset_password='MYSTERY_CLUB_ADMIN_PASSWORD_HASH' in os.environ)
+
+def init_data():
+    init_csv_files()
+    init_finances_csv()
+    init_events_csv()
+    init_todos()
+    init_users()
+
+# Metrics
+# Latency histograms for routes, storage helpers and template rendering,
+# plus I/O counters, exposed in Prometheus text format on /metrics. Each
+# observation is a bisect and a locked increment, cheap enough to leave on.
+METRICS_TOKEN = os.environ.get('MYSTERY_CLUB_METRICS_TOKEN')
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for labels, series in sorted(self.series.items()):
+                label_text = _metric_labels(self.label_names, labels)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                    cumulative += count
+                    bucket = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{self.name}_bucket{{{label_text}{"," if label_text else ""}le="{bucket}"}} {cumulative}')
+                lines.append(f'{self.name}_sum{{{label_text}}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{{{_metric_labels(self.label_names, labels)}}} {value}')
+        return lines
+
+def _metric_labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+REQUEST_SECONDS = Histogram('mystery_request_seconds', 'Route latency including streamed bodies.', ('route', 'method', 'status'))
+STORAGE_SECONDS = Histogram('mystery_storage_seconds', 'Time spent in storage helpers.', ('helper', 'table'))
+STORAGE_ROWS = Counter('mystery_storage_rows_total', 'Rows returned by storage helpers.', ('helper', 'table'))
+STORAGE_BYTES = Counter('mystery_storage_bytes_read_total', 'Data file bytes read by storage helpers.', ('helper', 'table'))
+TEMPLATE_SECONDS = Histogram('mystery_template_seconds', 'Template render time.', ('template',))
+TABLE_CACHE_LOOKUPS = Counter('mystery_table_cache_lookups_total', 'Table cache lookups.', ('result',))
+METRICS = [REQUEST_SECONDS, STORAGE_SECONDS, STORAGE_ROWS, STORAGE_BYTES, TEMPLATE_SECONDS, TABLE_CACHE_LOOKUPS]
+
+# Bytes read by the storage helper currently running on this thread
+_io_stats = threading.local()
+
+def count_bytes_read(count):
+    _io_stats.bytes_read = getattr(_io_stats, 'bytes_read', 0) + count
+
+def instrumented(func):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outer_bytes = getattr(_io_stats, 'bytes_read', 0)
+        _io_stats.bytes_read = 0
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            bytes_read = _io_stats.bytes_read
+            _io_stats.bytes_read = outer_bytes + bytes_read
+        table = args[0] if args and isinstance(args[0], str) and args[0] in TABLES else ''
+        STORAGE_SECONDS.observe(elapsed, name, table)
+        if bytes_read:
+            STORAGE_BYTES.inc(bytes_read, name, table)
+        if isinstance(result, list):
+            STORAGE_ROWS.inc(len(result), name, table)
+        elif isinstance(result, dict) and isinstance(result.get('records'), list):
+            STORAGE_ROWS.inc(len(result['records']), name, table)
+        return result
+    return wrapper
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (route, request.method, str(response.status_code))
+        # Observed when the body has been sent, so streaming is included.
+        response.call_on_close(lambda: REQUEST_SECONDS.observe(time.perf_counter() - started, *labels))
+    return response
+
+@before_render_template.connect_via(app)
+def _start_template_timer(sender, template, context, **extra):
+    g.setdefault('template_started', {})[template.name] = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _observe_template(sender, template, context, **extra):
+    started = g.get('template_started', {}).pop(template.name, None)
+    if started is not None:
+        TEMPLATE_SECONDS.observe(time.perf_counter() - started, template.name)
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# Edits and deletes
+# CSV rows are never rewritten in place. Deleting row N appends a tombstone
+# row [TOMBSTONE, N]; editing it appends [REPLACEMENT, N, *new values]. Rows
+# are numbered from 1 in file order, counting these marker rows too, and a
+# marker never has as many fields as the header, so it cannot be mistaken
+# for data. Readers hide markers and deleted rows and show the newest
+# replacement in the original row's place; compact_csv() later rewrites the
+# file without them.
+TOMBSTONE = '#!delete'
+REPLACEMENT = '#!replace'
+
+def parse_marker(values, width):
+    # (action, target row, replacement values) for a marker row, else None
+    if len(values) < 2 or values[0] not in (TOMBSTONE, REPLACEMENT) or len(values) == width:
+        return None
+    try:
+        target = int(values[1])
+    except ValueError:
+        return None
+    return values[0], target, values[2:]
+
+def _apply_marker(overlay, row, marker):
+    # Fold marker row `row` into overlay = {'hidden', 'deleted', 'replaced'}.
+    action, target, values = marker
+    overlay['hidden'].add(row)
+    if not 0 < target < row or target in overlay['hidden']:
+        return
+    if action == TOMBSTONE:
+        overlay['replaced'].pop(target, None)
+        overlay['deleted'].add(target)
+        overlay['hidden'].add(target)
+    else:
+        overlay['replaced'][target] = values
+
+def _new_overlay():
+    return {'hidden': set(), 'deleted': set(), 'replaced': {}}
+
+# Shared table cache
+# Parsed rows are kept per CSV path and reused for as long as the file's
+# (mtime, size, inode) is unchanged. The budget is measured in on-disk CSV
+# bytes; the least recently used tables are evicted first.
+TABLE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_table_cache = OrderedDict()
+_table_cache_bytes = 0
+_table_cache_lock = threading.Lock()
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _evict_tables():
+    global _table_cache_bytes
+    while _table_cache_bytes > TABLE_CACHE_MAX_BYTES and _table_cache:
+        _, entry = _table_cache.popitem(last=False)
+        _table_cache_bytes -= entry['signature'][1]
+
+def _drop_table(path):
+    global _table_cache_bytes
+    entry = _table_cache.pop(path, None)
+    if entry is not None:
+        _table_cache_bytes -= entry['signature'][1]
+
+def _fold_rows(fieldnames, numbered_rows):
+    # Records (with their row number as '_id') from (row, values) pairs,
+    # with tombstones and replacements applied; also returns the row count.
+    width = len(fieldnames)
+    live = {}
+    count = 0
+    for row, values in numbered_rows:
+        count = row
+        marker = parse_marker(values, width)
+        if marker is None:
+            if values:
+                live[row] = values
+            continue
+        action, target, replacement = marker
+        if target in live:
+            if action == TOMBSTONE:
+                del live[target]
+            else:
+                live[target] = replacement
+    return [dict(zip(fieldnames, values), _id=row) for row, values in live.items()], count
+
+def read_table(path):
+    # Stat before parsing: if the file grows mid-read the cached signature is
+    # older than the rows, so the next call simply re-reads.
+    global _table_cache_bytes
+    signature = _file_signature(path)
+    if signature is None:
+        return []
+    with _table_cache_lock:
+        entry = _table_cache.get(path)
+        if entry is not None and entry['signature'] == signature:
+            _table_cache.move_to_end(path)
+            TABLE_CACHE_LOOKUPS.inc(1, 'hit')
+            return list(entry['rows'])
+
+    TABLE_CACHE_LOOKUPS.inc(1, 'miss')
+    count_bytes_read(signature[1])
+    with open(path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        fieldnames = next(reader, [])
+        rows, count = _fold_rows(fieldnames, enumerate(reader, 1))
+
+    with _table_cache_lock:
+        _drop_table(path)
+        if signature[1] <= TABLE_CACHE_MAX_BYTES:
+            _table_cache[path] = {'signature': signature, 'fieldnames': fieldnames, 'rows': rows, 'count': count}
+            _table_cache_bytes += signature[1]
+            _evict_tables()
+    return list(rows)
+
+# Callbacks run after every append as listener(path, start, end, values),
+# where start/end are the byte offsets of the new row.
+_append_listeners = []
+
+def on_append(listener):
+    _append_listeners.append(listener)
+    return listener
+
+def _extend_cached_table(path, before, after, rows):
+    global _table_cache_bytes
+    with _table_cache_lock:
+        entry = _table_cache.get(path)
+        if entry is None:
+            return
+        if entry['signature'] != before:
+            _drop_table(path)
+            return
+        fieldnames = entry['fieldnames']
+        cached = entry['rows']
+        for values in rows:
+            entry['count'] += 1
+            marker = parse_marker(values, len(fieldnames))
+            if marker is None:
+                cached.append(dict(zip(fieldnames, values), _id=entry['count']))
+                continue
+            action, target, replacement = marker
+            position = bisect.bisect_left(cached, target, key=lambda record: record['_id'])
+            if position < len(cached) and cached[position]['_id'] == target:
+                if action == TOMBSTONE:
+                    del cached[position]
+                else:
+                    cached[position] = dict(zip(fieldnames, replacement), _id=target)
+        entry['signature'] = after
+        _table_cache_bytes += after[1] - before[1]
+        _evict_tables()
+
+# Group-commit writer
+# Appends to a CSV are queued per file. The first thread to find the queue
+# idle becomes the leader: it waits GROUP_COMMIT_WINDOW for concurrent
+# requests to add their rows, then writes the whole batch with one write()
+# (and one fsync when CSV_FSYNC is on) under an exclusive flock, so rows from
+# other worker processes never interleave. Turning CSV_FSYNC off trades
+# durability on power loss for throughput.
+CSV_FSYNC = os.environ.get('MYSTERY_CLUB_FSYNC', '1') != '0'
+GROUP_COMMIT_WINDOW = 0.002
+
+# (path, column) -> the highest number in that column and how far the file
+# has been scanned for it; only read under the file's flock.
+_highest_numbers = {}
+
+def _highest_number(path, column, stat):
+    entry = _highest_numbers.get((path, column))
+    if entry is None or entry['inode'] != stat.st_ino or entry['offset'] > stat.st_size:
+        entry = _highest_numbers[(path, column)] = {'inode': stat.st_ino, 'offset': 0, 'highest': 0}
+    for _, end, values in scan_rows(path, entry['offset']):
+        if len(values) > column and values[column].isdigit():
+            entry['highest'] = max(entry['highest'], int(values[column]))
+        entry['offset'] = end
+    return entry['highest']
+
+class GroupWriter:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = []
+        self.flushing = False
+
+    def submit(self, rows, inode=None, number=None):
+        # With `inode`, the rows are only written if the file still has that
+        # inode (edits address rows by number, which compaction changes);
+        # otherwise None is returned. With `number`, that column of each row
+        # is set (in place) to one more than the highest number in it so far.
+        item = {'rows': rows, 'inode': inode, 'number': number, 'done': threading.Event(), 'offsets': None, 'error': None}
+        with self.lock:
+            self.pending.append(item)
+            leader = not self.flushing
+            self.flushing = True
+
+        if leader:
+            if GROUP_COMMIT_WINDOW:
+                time.sleep(GROUP_COMMIT_WINDOW)
+            while True:
+                with self.lock:
+                    batch = self.pending
+                    self.pending = []
+                    if not batch:
+                        self.flushing = False
+                        break
+                self._commit(batch)
+        item['done'].wait()
+        if item['error'] is not None:
+            raise item['error']
+        return item['offsets']
+
+    def _open_locked(self):
+        # compact_csv() swaps in a new file under the same lock; a writer
+        # that waited on the old one must not append to it. If the file was
+        # moved away altogether (partition_table), the append fails rather
+        # than recreating it.
+        while True:
+            file = open(self.path, 'ab')
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                if os.fstat(file.fileno()).st_ino == os.stat(self.path).st_ino:
+                    return file
+            except FileNotFoundError:
+                file.close()
+                raise
+            file.close()
+
+    def _commit(self, batch):
+        try:
+            with self._open_locked() as file:
+                try:
+                    stat = os.fstat(file.fileno())
+                    before = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                    for item in batch:
+                        if item['inode'] is not None and item['inode'] != stat.st_ino:
+                            item['rows'] = []
+                    self._number(batch, stat)
+                    encoded = []
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    for item in batch:
+                        for values in item['rows']:
+                            buffer.seek(0)
+                            buffer.truncate()
+                            writer.writerow(values)
+                            encoded.append(buffer.getvalue().encode('utf-8'))
+
+                    file.write(b''.join(encoded))
+                    file.flush()
+                    if CSV_FSYNC:
+                        os.fsync(file.fileno())
+                    stat = os.fstat(file.fileno())
+                    after = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(file, fcntl.LOCK_UN)
+
+            all_rows = [values for item in batch for values in item['rows']]
+            _extend_cached_table(self.path, before, after, all_rows)
+
+            # Readers are brought up to date before any waiting request returns.
+            position = before[1]
+            encoded_rows = iter(encoded)
+            for item in batch:
+                if not item['rows']:
+                    continue
+                item['offsets'] = []
+                for values in item['rows']:
+                    end = position + len(next(encoded_rows))
+                    item['offsets'].append((position, end))
+                    for listener in _append_listeners:
+                        listener(self.path, position, end, values)
+                    position = end
+        except Exception as error:
+            for item in batch:
+                item['error'] = error
+        finally:
+            for item in batch:
+                item['done'].set()
+
+    def _number(self, batch, stat):
+        # Caller holds the flock, so no other process can take the same number.
+        columns = {item['number'] for item in batch if item['number'] is not None and item['rows']}
+        for column in columns:
+            highest = _highest_number(self.path, column, stat)
+            for item in batch:
+                for values in item['rows']:
+                    if item['number'] == column:
+                        highest += 1
+                        values[column] = str(highest)
+                    elif len(values) > column and values[column].isdigit():
+                        highest = max(highest, int(values[column]))
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def _writer(path):
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = GroupWriter(path)
+    return writer
+
+def append_rows(path, rows, inode=None):
+    rows = [['' if value is None else str(value) for value in values] for values in rows]
+    if not rows:
+        return []
+    return _writer(path).submit(rows, inode)
+
+def append_numbered(path, values, column):
+    # Append one row numbered as GroupWriter.submit() describes; returns the number.
+    values = ['' if value is None else str(value) for value in values]
+    _writer(path).submit([values], number=column)
+    return values[column]
+
+def append_row(path, values):
+    return append_rows(path, [values])[0]
+
+def scan_rows(path, offset=0):
+    # Yield (start, end, values) for every complete row from a byte offset.
+    # A trailing row that is still being written (no newline yet, or an
+    # unbalanced quote) is left for the next scan.
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        start = offset
+        buffer = b''
+        for line in file:
+            count_bytes_read(len(line))
+            buffer += line
+            if not buffer.endswith(b'\n') or buffer.count(b'"') % 2:
+                continue
+            end = start + len(buffer)
+            values = next(csv.reader([buffer.decode('utf-8', 'replace')]), [])
+            yield start, end, values
+            start = end
+            buffer = b''
+
+# Row offset index
+# For each CSV a sidecar data/.<name>.idx stores the file's inode followed by
+# the start offset of every data row and the end offset of the last one, as
+# unsigned 64-bit ints. It is extended on append and lets a page of rows be
+# read with a single seek. A second sidecar, .<name>.marks, holds the inode
+# and the numbers of the marker rows, so the edit/delete overlay is rebuilt
+# from a handful of seeks rather than a scan.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_row_indexes = {}
+_row_index_lock = threading.Lock()
+
+def _sidecar_path(path, extension):
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, '.' + os.path.splitext(filename)[0] + '.' + extension)
+
+def _read_header(path):
+    for _, end, values in scan_rows(path):
+        return values, end
+    return [], 0
+
+def _load_row_index(path, inode, size):
+    stored = array('Q')
+    try:
+        with open(_sidecar_path(path, 'idx'), 'rb') as file:
+            stored.frombytes(file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if len(stored) < 2 or stored[0] != inode or stored[-1] > size or not _increasing(stored, 1):
+        return None
+    # The file may have been rewritten in place; the indexed end must still
+    # fall on a row boundary.
+    with open(path, 'rb') as file:
+        file.seek(stored[-1] - 1)
+        if file.read(1) != b'\n':
+            return None
+    fieldnames, header_end = _read_header(path)
+    if stored[1] != header_end:
+        return None
+
+    marks = array('Q')
+    try:
+        with open(_sidecar_path(path, 'marks'), 'rb') as file:
+            marks.frombytes(file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if not marks or marks[0] != inode or not _increasing(marks, 1):
+        return None
+    index = {'inode': inode, 'fieldnames': fieldnames, 'offsets': stored[1:], 'marks': array('Q')}
+    index.update(_new_overlay())
+    # Marks past the indexed rows were saved just before a crash; the scan
+    # that extends the index finds them again.
+    count = len(index['offsets']) - 1
+    with open(path, 'rb') as file:
+        for row in sorted(set(mark for mark in marks[1:] if mark <= count)):
+            file.seek(index['offsets'][row - 1])
+            chunk = file.read(index['offsets'][row] - index['offsets'][row - 1])
+            marker = parse_marker(next(csv.reader([chunk.decode('utf-8', 'replace')]), []), len(fieldnames))
+            if marker is not None:
+                index['marks'].append(row)
+                _apply_marker(index, row, marker)
+    return index
+
+def _increasing(values, start=0):
+    return all(a < b for a, b in zip(itertools.islice(values, start, None), itertools.islice(values, start + 1, None)))
+
+def _write_sidecar_at(target, position, data, inode=None):
+    # Write `data` at byte `position` of a sidecar, under its flock. Every
+    # process indexing a file derives the same entries, so one catching up
+    # on rows another already saved rewrites them in place instead of
+    # appending duplicates. With `inode`, the sidecar's first entry must be
+    # that inode. Returns False when the sidecar is missing, stale or shorter
+    # than `position`, for the caller to rebuild it.
+    while True:
+        try:
+            file = open(target, 'r+b')
+        except FileNotFoundError:
+            return False
+        with file:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                try:
+                    replaced = os.fstat(file.fileno()).st_ino != os.stat(target).st_ino
+                except FileNotFoundError:
+                    return False
+                if replaced:
+                    continue
+                if inode is not None:
+                    head = array('Q')
+                    head.frombytes(file.read(8).ljust(8, b'\0'))
+                    if head[0] != inode:
+                        return False
+                if os.fstat(file.fileno()).st_size < position:
+                    return False
+                file.seek(position)
+                file.write(data)
+                return True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+def _save_row_index(path, index, new_offsets=None, new_marks=None):
+    index_path = _sidecar_path(path, 'idx')
+    marks_path = _sidecar_path(path, 'marks')
+    if new_offsets is not None:
+        # Marks first: a mark without its offset is dropped on load, an
+        # offset without its mark would hide a marker from the overlay.
+        # Both are written at their positions (the in-memory arrays already
+        # end with them; entry 0 is the inode).
+        new_marks = new_marks or []
+        marks_at = (len(index['marks']) - len(new_marks) + 1) * 8
+        offsets_at = (len(index['offsets']) - len(new_offsets) + 1) * 8
+        if (_write_sidecar_at(marks_path, marks_at, array('Q', new_marks).tobytes(), index['inode'])
+                and _write_sidecar_at(index_path, offsets_at, array('Q', new_offsets).tobytes(), index['inode'])):
+            return
+    for target, values in ((marks_path, index['marks']), (index_path, index['offsets'])):
+        tmp_path = target + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(array('Q', [index['inode']]).tobytes())
+            file.write(values.tobytes())
+        os.replace(tmp_path, target)
+
+def _index_rows(index, rows):
+    # Extend the index with (end offset, values) pairs; returns new marks.
+    width = len(index['fieldnames'])
+    new_marks = []
+    for end, values in rows:
+        index['offsets'].append(end)
+        marker = parse_marker(values, width)
+        if marker is not None:
+            row = len(index['offsets']) - 1
+            index['marks'].append(row)
+            new_marks.append(row)
+            _apply_marker(index, row, marker)
+    return new_marks
+
+def get_row_index(path):
+    signature = _file_signature(path)
+    if signature is None:
+        return None
+    _, size, inode = signature
+
+    with _row_index_lock:
+        index = _row_indexes.get(path)
+        if index is None or index['inode'] != inode or index['offsets'][-1] > size or not index['offsets'][0]:
+            index = _load_row_index(path, inode, size)
+        if index is None:
+            fieldnames, header_end = _read_header(path)
+            index = {'inode': inode, 'fieldnames': fieldnames, 'offsets': array('Q', [header_end]), 'marks': array('Q')}
+            index.update(_new_overlay())
+            if header_end:
+                _save_row_index(path, index)
+
+        offsets = index['offsets']
+        if offsets[0] and offsets[-1] < size:
+            rows = [(end, values) for _, end, values in scan_rows(path, offsets[-1])]
+            new_marks = _index_rows(index, rows)
+            _save_row_index(path, index, [end for end, _ in rows], new_marks)
+        _row_indexes[path] = index
+        return index
+
+@on_append
+def _update_row_index(path, start, end, values):
+    with _row_index_lock:
+        index = _row_indexes.get(path)
+        if index is not None and index['offsets'][-1] == start:
+            new_marks = _index_rows(index, [(end, values)])
+            _save_row_index(path, index, [end], new_marks)
+
+def _live_rows(index, rows, limit=None):
+    # Rows from the iterable `rows` that are neither markers nor deleted
+    hidden = index['hidden']
+    found = []
+    for row in rows:
+        if row not in hidden:
+            found.append(row)
+            if limit is not None and len(found) >= limit:
+                break
+    return found
+
+def read_page(path, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    # Keyset pagination, newest first. Row ids are 1-based positions in the
+    # file; `before` returns older rows, `after` newer ones. Markers and
+    # deleted rows are skipped, so a page still holds `limit` live rows.
+    index = get_row_index(path)
+    if index is None:
+        return {'records': [], 'total': 0, 'older': None, 'newer': None}
+    offsets = index['offsets']
+    count = len(offsets) - 1
+
+    if after is not None:
+        rows = _live_rows(index, range(max(0, after) + 1, count + 1), limit)[::-1]
+    else:
+        top = count if before is None else min(before - 1, count)
+        rows = _live_rows(index, range(top, 0, -1), limit)
+
+    records = []
+    if rows:
+        with open(path, 'rb') as file:
+            file.seek(offsets[rows[-1] - 1])
+            data = file.read(offsets[rows[0]] - offsets[rows[-1] - 1])
+        count_bytes_read(len(data))
+        base = offsets[rows[-1] - 1]
+        for row in rows:
+            values = index['replaced'].get(row)
+            if values is None:
+                chunk = data[offsets[row - 1] - base:offsets[row] - base]
+                values = next(csv.reader([chunk.decode('utf-8', 'replace')]), [])
+            if values:
+                record = dict(zip(index['fieldnames'], values))
+                record['_id'] = row
+                records.append(record)
+
+    return {
+        'records': records,
+        'total': count - len(index['hidden']),
+        'older': rows[-1] if rows and _live_rows(index, range(rows[-1] - 1, 0, -1), 1) else None,
+        'newer': rows[0] if rows and _live_rows(index, range(rows[0] + 1, count + 1), 1) else None,
+    }
+
+def read_row(path, row):
+    # One live row by number, with any replacement applied, or None
+    index = get_row_index(path)
+    if index is None or not 0 < row < len(index['offsets']) or row in index['hidden']:
+        return None
+    values = index['replaced'].get(row)
+    if values is None:
+        with open(path, 'rb') as file:
+            file.seek(index['offsets'][row - 1])
+            chunk = file.read(index['offsets'][row] - index['offsets'][row - 1])
+        count_bytes_read(len(chunk))
+        values = next(csv.reader([chunk.decode('utf-8', 'replace')]), [])
+    if not values:
+        return None
+    record = dict(zip(index['fieldnames'], values))
+    record['_id'] = row
+    return record
+
+def tail_csv(path, columns, cursor=None, replay=True):
+    # Rows appended since `cursor`, as (records, cursor, restarted). The
+    # cursor is (inode, byte offset); if the file was replaced or truncated
+    # the rows start again from the first one and restarted is True. With
+    # replay=False a missing or stale cursor is just moved to the end of the
+    # file. Marker rows are skipped; records carry their row number as _id.
+    signature = _file_signature(path)
+    if signature is None:
+        return [], None, True
+    _, size, inode = signature
+    restarted = cursor is None or cursor[0] != inode or cursor[1] > size
+    if restarted and not replay:
+        return [], (inode, size), True
+    offset = _read_header(path)[1] if restarted else cursor[1]
+    if not offset:
+        return [], None, True
+    index = get_row_index(path)
+    row = bisect.bisect_left(index['offsets'], offset) if index is not None else 0
+    records = []
+    for _, offset, values in scan_rows(path, offset):
+        row += 1
+        if values and parse_marker(values, len(columns)) is None:
+            records.append(dict(zip(columns, values), _id=row))
+    return records, (inode, offset), restarted
+
+def _page_args():
+    per_page = request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int)
+    return {
+        'before': request.args.get('before', type=int),
+        'after': request.args.get('after', type=int),
+        'limit': max(1, min(per_page, MAX_PAGE_SIZE)),
+    }
+
+# Compaction
+# Once marker rows and the rows they retire make up COMPACT_DEAD_RATIO of a
+# file (and at least COMPACT_MIN_DEAD rows), a background thread rewrites it
+# without them. The copy is made while holding the writers' flock and swapped
+# in with os.replace(), so every append lands either before the copy or in
+# the new file. Row numbers change; sidecars notice the new inode and rebuild.
+COMPACT_DEAD_RATIO = 0.25
+COMPACT_MIN_DEAD = 50
+
+_compacting = set()
+_compacting_lock = threading.Lock()
+
+def dead_rows(path):
+    # (dead rows, all rows) for a CSV
+    index = get_row_index(path)
+    if index is None:
+        return 0, 0
+    return len(index['hidden']) + len(index['replaced']), len(index['offsets']) - 1
+
+def compact_csv(path):
+    # Rewrite `path` without markers and retired rows; returns rows dropped.
+    with open(path, 'rb') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.fstat(lock_file.fileno()).st_ino != os.stat(path).st_ino:
+                return 0
+            # Writers are blocked, so the index now covers the whole file.
+            index = get_row_index(path)
+            dead = len(index['hidden']) + len(index['replaced'])
+            if not dead:
+                return 0
+            tmp_path = path + '.compact'
+            with open(path, 'r', newline='') as source, open(tmp_path, 'w', newline='') as target:
+                reader = csv.reader(source)
+                writer = csv.writer(target)
+                writer.writerow(next(reader, index['fieldnames']))
+                for row, values in enumerate(reader, 1):
+                    if values and row not in index['hidden']:
+                        writer.writerow(index['replaced'].get(row, values))
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return dead
+
+def schedule_compaction(path):
+    dead, total = dead_rows(path)
+    if dead < COMPACT_MIN_DEAD or dead < total * COMPACT_DEAD_RATIO:
+        return False
+    with _compacting_lock:
+        if path in _compacting:
+            return False
+        _compacting.add(path)
+
+    def run():
+        try:
+            compact_csv(path)
+        except Exception:
+            app.logger.exception('Compacting %s failed', path)
+        finally:
+            with _compacting_lock:
+                _compacting.discard(path)
+    threading.Thread(target=run, name='compact-' + os.path.basename(path), daemon=True).start()
+    return True
+
+# Columnar finance snapshot
+# Each finance CSV is mirrored into fixed-width column files next to it:
+#   .<name>.cents       amount in integer cents (int64)
+#   .<name>.types       0 = Income, 1 = Expense, 2 = anything else,
+#                       3 = marker or deleted row (uint8)
+#   .<name>.categories  code into the category dictionary (uint32)
+#   .<name>.dates       proleptic ordinal of Date, 0 if unparseable (int32)
+# and .<name>.meta.json holding the dictionary, the row count and the byte
+# offset covered. Row i of each column is row i of the row index. Columns
+# are memory-mapped on load, extended on append and tail-read from the saved
+# offset after a restart; running totals, overall and per (month, type,
+# category), are derived from them once, kept current in O(1) and saved with
+# the metadata. A tombstone or replacement overwrites its target's entries
+# in place; totals are adjusted by the difference, or re-derived when the
+# marker was written by another process.
+FINANCE_TYPES = ['Income', 'Expense']
+FINANCE_DEAD = 3
+FINANCE_COLUMNS = {'cents': 'q', 'types': 'B', 'categories': 'I', 'dates': 'i'}
+
+def to_cents(amount):
+    try:
+        value = Decimal(str(amount).strip())
+    except InvalidOperation:
+        return 0
+    if not value.is_finite():
+        return 0
+    return int(value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) * 100)
+
+def to_ordinal(date):
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+@functools.lru_cache(maxsize=8192)
+def ordinal_month(ordinal):
+    # 'YYYY-MM' for a date ordinal, '' for 0 (no usable date)
+    if not ordinal:
+        return ''
+    day = datetime.fromordinal(ordinal)
+    return f'{day.year:04d}-{day.month:02d}'
+
+class FinanceColumns:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.meta = None
+        self.base = {}
+        self.tail = {}
+        self.category_codes = {}
+        self.totals = {}
+        self.months = {}
+
+    def _meta_path(self):
+        return _sidecar_path(self.path, 'meta.json')
+
+    def _save_meta(self):
+        self.meta['totals'] = [[type_code, category_code, cents] for (type_code, category_code), cents in self.totals.items()]
+        self.meta['months'] = [[month, type_code, category_code, cents]
+                               for (month, type_code, category_code), cents in self.months.items()]
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.meta, file)
+        os.replace(tmp_path, self._meta_path())
+
+    def _load(self, inode, size):
+        try:
+            with open(self._meta_path(), 'r') as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            meta = None
+        if meta is None or meta.get('inode') != inode or meta.get('offset', 0) > size:
+            meta = {'inode': inode, 'offset': 0, 'count': 0, 'header': None, 'categories': [], 'totals': [], 'months': []}
+
+        # A column shorter than the saved count means the snapshot is damaged;
+        # anything longer was written after the last metadata save and is cut.
+        for name, typecode in FINANCE_COLUMNS.items():
+            column_path = _sidecar_path(self.path, name)
+            length = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+            if length < meta['count'] * array(typecode).itemsize:
+                meta = {'inode': inode, 'offset': 0, 'count': 0, 'header': None, 'categories': [], 'totals': [], 'months': []}
+
+        for name, typecode in FINANCE_COLUMNS.items():
+            if not meta['count']:
+                # Unlink rather than truncate: other processes may still have
+                # the old columns mapped.
+                try:
+                    os.remove(_sidecar_path(self.path, name))
+                except FileNotFoundError:
+                    pass
+            with open(_sidecar_path(self.path, name), 'a+b') as file:
+                file.truncate(meta['count'] * array(typecode).itemsize)
+                if meta['count']:
+                    mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE)
+                    self.base[name] = memoryview(mapped).cast(typecode)
+                else:
+                    self.base[name] = array(typecode)
+            self.tail[name] = array(typecode)
+
+        self.meta = meta
+        self.category_codes = {category: code for code, category in enumerate(meta['categories'])}
+        # Totals saved with the metadata cover exactly meta['count'] rows, so
+        # an unchanged file (an old partition) never has its columns summed.
+        if meta.get('totals') is not None:
+            self.totals = {(type_code, category_code): cents for type_code, category_code, cents in meta['totals']}
+        else:
+            self.totals = self.aggregate()
+        if meta.get('months') is not None:
+            self.months = {(month, type_code, category_code): cents
+                           for month, type_code, category_code, cents in meta['months']}
+        else:
+            self.months = self.aggregate(by_month=True)
+
+    def _encode(self, values, dead=False):
+        # (cents, type code, category code, date ordinal) for one row
+        record = dict(zip(self.meta['header'] or [], values))
+        record_type = record.get('Type')
+        type_code = FINANCE_TYPES.index(record_type) if record_type in FINANCE_TYPES else 2
+        category = '' if dead else record.get('Category') or ''
+        category_code = self.category_codes.get(category)
+        if category_code is None:
+            category_code = self.category_codes[category] = len(self.meta['categories'])
+            self.meta['categories'].append(category)
+        if dead:
+            return 0, FINANCE_DEAD, category_code, 0
+        cents = to_cents(record.get('Amount')) if values else 0
+        return cents, type_code, category_code, to_ordinal(record.get('Date'))
+
+    def _entry(self, row):
+        entry = []
+        for name in FINANCE_COLUMNS:
+            base, tail = self._column(name)
+            entry.append(base[row] if row < len(base) else tail[row - len(base)])
+        return tuple(entry)
+
+    def _overwrite(self, row, entry):
+        for name, value in zip(FINANCE_COLUMNS, entry):
+            base, tail = self._column(name)
+            if row < len(base):
+                base[row] = value  # shared mapping: lands in the column file
+                continue
+            tail[row - len(base)] = value
+            itemsize = array(FINANCE_COLUMNS[name]).itemsize
+            _write_sidecar_at(_sidecar_path(self.path, name), row * itemsize, array(FINANCE_COLUMNS[name], [value]).tobytes())
+
+    def _extend(self, rows, offset, own=False):
+        new = {name: array(typecode) for name, typecode in FINANCE_COLUMNS.items()}
+        width = len(self.meta['header'] or [])
+        markers = []
+        for values in rows:
+            marker = parse_marker(values, width)
+            if marker is not None:
+                markers.append(marker)
+            entry = self._encode(values, dead=marker is not None)
+            for name, value in zip(FINANCE_COLUMNS, entry):
+                new[name].append(value)
+            key = (entry[1], entry[2])
+            self.totals[key] = self.totals.get(key, 0) + entry[0]
+            key = (ordinal_month(entry[3]), entry[1], entry[2])
+            self.months[key] = self.months.get(key, 0) + entry[0]
+
+        # Written at this process's row count, never appended: another
+        # process may already have saved the same rows.
+        for name, typecode in FINANCE_COLUMNS.items():
+            position = self.meta['count'] * array(typecode).itemsize
+            if not _write_sidecar_at(_sidecar_path(self.path, name), position, new[name].tobytes()):
+                # The columns were rebuilt under us; start over from scratch.
+                self._discard()
+                return
+            self.tail[name].extend(new[name])
+        self.meta['count'] += len(rows)
+        self.meta['offset'] = offset
+
+        for action, target, replacement in markers:
+            row = target - 1
+            if not 0 <= row < self.meta['count']:
+                continue
+            old = self._entry(row)
+            if old[1] == FINANCE_DEAD:
+                continue
+            entry = self._encode(replacement, dead=action == TOMBSTONE)
+            self._overwrite(row, entry)
+            for cents, (_, type_code, category_code, date) in ((-old[0], old), (entry[0], entry)):
+                key = (type_code, category_code)
+                self.totals[key] = self.totals.get(key, 0) + cents
+                key = (ordinal_month(date), type_code, category_code)
+                self.months[key] = self.months.get(key, 0) + cents
+        if markers and not own:
+            # Another process may already have overwritten the targets, in
+            # which case `old` above was not what the totals counted.
+            self.totals = self.aggregate()
+            self.months = self.aggregate(by_month=True)
+        self._save_meta()
+
+    def _discard(self):
+        try:
+            os.remove(self._meta_path())
+        except FileNotFoundError:
+            pass
+        self.meta = None
+
+    def refresh(self):
+        signature = _file_signature(self.path)
+        if signature is None:
+            return False
+        _, size, inode = signature
+        with self.lock:
+            if self.meta is None or self.meta['inode'] != inode or self.meta['offset'] > size:
+                self._load(inode, size)
+            if self.meta['offset'] < size:
+                rows = []
+                offset = self.meta['offset']
+                for start, end, values in scan_rows(self.path, offset):
+                    offset = end
+                    if self.meta['header'] is None:
+                        self.meta['header'] = values
+                    else:
+                        rows.append(values)
+                self._extend(rows, offset)
+                if self.meta is None:
+                    return self.refresh()
+        return True
+
+    def append(self, start, end, values):
+        with self.lock:
+            if self.meta is not None and self.meta['offset'] == start and self.meta['header']:
+                self._extend([values], end, own=True)
+
+    def _column(self, name):
+        return self.base[name], self.tail[name]
+
+    def aggregate(self, start=None, end=None, by_month=False):
+        # Sum cents per (type code, category code), or per (month, type
+        # code, category code) with by_month, optionally for dates in
+        # [start, end] given as ordinals.
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is None:
+            sums = {}
+            for part in (0, 1):
+                columns = [self._column(name)[part] for name in ('cents', 'types', 'categories', 'dates')]
+                for cents, type_code, category_code, date in zip(*columns):
+                    if (start and date < start) or (end and date > end):
+                        continue
+                    key = (ordinal_month(date), type_code, category_code) if by_month else (type_code, category_code)
+                    sums[key] = sums.get(key, 0) + cents
+            return sums
+
+        def load(name, dtype):
+            base, tail = self._column(name)
+            return np.concatenate([np.frombuffer(base, dtype=dtype), np.frombuffer(tail, dtype=dtype)])
+
+        cents = load('cents', np.int64)
+        types = load('types', np.uint8).astype(np.int64)
+        categories = load('categories', np.uint32).astype(np.int64)
+        dates = load('dates', np.int32) if start or end or by_month else None
+        if start or end:
+            mask = np.ones(len(dates), dtype=bool)
+            if start:
+                mask &= dates >= start
+            if end:
+                mask &= dates <= end
+            cents, types, categories, dates = cents[mask], types[mask], categories[mask], dates[mask]
+        # float64 weights are exact for sums below 2**53 cents
+        width = max(len(self.meta['categories']), 1)
+        keys = types * width + categories
+        months = [None]
+        if by_month:
+            # Distinct dates are few; each is mapped to its month once.
+            ordinals, inverse = np.unique(dates, return_inverse=True)
+            labels = [ordinal_month(int(ordinal)) for ordinal in ordinals]
+            months = sorted(set(labels))
+            codes = {month: code for code, month in enumerate(months)}
+            month_codes = np.array([codes[label] for label in labels], dtype=np.int64)[inverse]
+            keys = keys + month_codes * (FINANCE_DEAD + 1) * width
+        totals = np.bincount(keys, weights=cents, minlength=(FINANCE_DEAD + 1) * width * len(months))
+        sums = {}
+        for position in np.flatnonzero(totals):
+            month_code, key = divmod(int(position), (FINANCE_DEAD + 1) * width)
+            type_code, category_code = divmod(key, width)
+            key = (months[month_code], type_code, category_code) if by_month else (type_code, category_code)
+            sums[key] = int(round(totals[position]))
+        return sums
+
+    def summarize(self, sums):
+        # Categories whose rows were all deleted are left out, as aggregate()
+        # leaves them out of a date range.
+        summary = {'total_income': 0, 'total_expenses': 0, 'income_by_category': {}, 'expense_by_category': {}}
+        for (type_code, category_code), cents in sums.items():
+            if not cents:
+                continue
+            category = self.meta['categories'][category_code]
+            if type_code == 0:
+                summary['total_income'] += cents
+                by_category = summary['income_by_category']
+            elif type_code == 1:
+                summary['total_expenses'] += cents
+                by_category = summary['expense_by_category']
+            else:
+                continue
+            by_category[category] = by_category.get(category, 0) + cents
+        return summary
+
+_finance_columns = {}
+_finance_columns_lock = threading.Lock()
+
+def get_finance_columns(path):
+    with _finance_columns_lock:
+        columns = _finance_columns.get(path)
+        if columns is None:
+            columns = _finance_columns[path] = FinanceColumns(path)
+    if not columns.refresh():
+        return None
+    return columns
+
+@on_append
+def _update_finance_columns(path, start, end, values):
+    columns = _finance_columns.get(path)
+    if columns is not None:
+        columns.append(start, end, values)
+
+def cents_to_amount(cents):
+    return cents / 100
+
+def _amount_summary(summary):
+    return {
+        'total_income': cents_to_amount(summary['total_income']),
+        'total_expenses': cents_to_amount(summary['total_expenses']),
+        'balance': cents_to_amount(summary['total_income'] - summary['total_expenses']),
+        'income_by_category': {category: cents_to_amount(cents) for category, cents in summary['income_by_category'].items()},
+        'expense_by_category': {category: cents_to_amount(cents) for category, cents in summary['expense_by_category'].items()},
+    }
+
+def get_finance_totals(parts):
+    # Totals over (path, start, end) parts, with start/end as YYYY-MM-DD
+    # bounds or None; a part with no bounds uses the running totals.
+    summary = {'total_income': 0, 'total_expenses': 0, 'income_by_category': {}, 'expense_by_category': {}}
+    for path, start, end in parts:
+        columns = get_finance_columns(path)
+        if columns is None:
+            continue
+        with columns.lock:
+            if start or end:
+                sums = columns.aggregate(to_ordinal(start) if start else None, to_ordinal(end) if end else None)
+            else:
+                sums = dict(columns.totals)
+            part = columns.summarize(sums)
+        summary['total_income'] += part['total_income']
+        summary['total_expenses'] += part['total_expenses']
+        for key in ('income_by_category', 'expense_by_category'):
+            for category, cents in part[key].items():
+                summary[key][category] = summary[key].get(category, 0) + cents
+    return _amount_summary(summary)
+
+def get_finance_months(paths, start=None, end=None):
+    # {(month, type, category): cents} for Income and Expense over finance
+    # files, limited to months in [start, end] ('YYYY-MM')
+    cells = {}
+    for path in paths:
+        columns = get_finance_columns(path)
+        if columns is None:
+            continue
+        with columns.lock:
+            for (month, type_code, category_code), cents in columns.months.items():
+                if type_code >= len(FINANCE_TYPES) or not cents or (start and month < start) or (end and month > end):
+                    continue
+                key = (month, FINANCE_TYPES[type_code], columns.meta['categories'][category_code])
+                cells[key] = cells.get(key, 0) + cents
+    return cells
+
+# Attendance rollup
+# Each attendance CSV keeps hours (in hundredths) and headcount (attendance
+# rows) per (month, Session Name) in .<name>.rollup.json, with the inode and
+# the byte offset covered. Rows are counted as they are appended, and rows
+# written by other processes are read from the saved offset. A marker only
+# names the row it changes: the target's current values (its last
+# replacement, kept in the rollup's 'changed' map, or else the row itself,
+# read with one seek) are subtracted and the replacement added.
+def date_month(date):
+    return date[:7] if to_ordinal(date) else ''
+
+class AttendanceRollup:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.meta = None
+        self.cells = {}  # (month, session_name) -> [hundredths of hours, headcount]
+
+    def _meta_path(self):
+        return _sidecar_path(self.path, 'rollup.json')
+
+    def _save(self):
+        self.meta['cells'] = [[month, session_name, hours, headcount] for (month, session_name), (hours, headcount) in self.cells.items()]
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.meta, file)
+        os.replace(tmp_path, self._meta_path())
+
+    def _load(self, inode, size):
+        try:
+            with open(self._meta_path(), 'r') as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            meta = None
+        if meta is None or meta.get('inode') != inode or meta.get('offset', 0) > size or 'changed' not in meta:
+            meta = {'inode': inode, 'offset': 0, 'header': None, 'rows': 0, 'changed': {}, 'cells': []}
+        self.meta = meta
+        self.cells = {(month, session_name): [hours, headcount] for month, session_name, hours, headcount in meta['cells']}
+
+    def _count(self, values, sign=1):
+        record = dict(zip(self.meta['header'], values))
+        cell = self.cells.setdefault((date_month(record.get('Date')), record.get('Session Name') or ''), [0, 0])
+        cell[0] += sign * to_cents(record.get('Hours'))
+        cell[1] += sign
+
+    def _extend(self, rows, offset):
+        width = len(self.meta['header'])
+        for values in rows:
+            self.meta['rows'] += 1
+            marker = parse_marker(values, width)
+            if marker is None:
+                if values:
+                    self._count(values)
+            elif not self._apply(self.meta['rows'], marker):
+                self._recount()
+                return
+        self.meta['offset'] = offset
+        self._save()
+
+    def _apply(self, row, marker):
+        # Fold marker row `row` in as _apply_marker() does for the row index;
+        # False if the target row could not be read.
+        action, target, replacement = marker
+        changed = self.meta['changed']
+        key = str(target)
+        if not 0 < target < row or (key in changed and changed[key] is None):
+            return True
+        old = changed.get(key)
+        if old is None:
+            old = self._read(target)
+            if old is None:
+                return False
+            if not old or parse_marker(old, len(self.meta['header'])) is not None:
+                return True
+        self._count(old, -1)
+        if action == TOMBSTONE:
+            changed[key] = None
+        else:
+            changed[key] = replacement
+            self._count(replacement)
+        return True
+
+    def _read(self, row):
+        # The values originally written as row `row`, or None
+        index = get_row_index(self.path)
+        if index is None or index['inode'] != self.meta['inode'] or row >= len(index['offsets']):
+            return None
+        with open(self.path, 'rb') as file:
+            file.seek(index['offsets'][row - 1])
+            chunk = file.read(index['offsets'][row] - index['offsets'][row - 1])
+        count_bytes_read(len(chunk))
+        return next(csv.reader([chunk.decode('utf-8', 'replace')]), [])
+
+    def _recount(self):
+        index = get_row_index(self.path)
+        if index is None or index['inode'] != self.meta['inode']:
+            return
+        offsets = index['offsets']
+        self.cells = {}
+        changed = {str(row): None for row in index['deleted']}
+        for row, (_, _, values) in enumerate(scan_rows(self.path, offsets[0]), 1):
+            if row >= len(offsets):
+                break
+            if values and row not in index['hidden']:
+                if row in index['replaced']:
+                    values = changed[str(row)] = index['replaced'][row]
+                self._count(values)
+        self.meta['rows'] = len(offsets) - 1
+        self.meta['changed'] = changed
+        self.meta['offset'] = offsets[-1]
+        self._save()
+
+    def refresh(self):
+        signature = _file_signature(self.path)
+        if signature is None:
+            return False
+        _, size, inode = signature
+        with self.lock:
+            if self.meta is None or self.meta['inode'] != inode or self.meta['offset'] > size:
+                self._load(inode, size)
+            if self.meta['offset'] < size:
+                rows = []
+                offset = self.meta['offset']
+                for _, end, values in scan_rows(self.path, offset):
+                    offset = end
+                    if self.meta['header'] is None:
+                        self.meta['header'] = values
+                    else:
+                        rows.append(values)
+                self._extend(rows, offset)
+        return True
+
+    def append(self, start, end, values):
+        with self.lock:
+            if self.meta is not None and self.meta['offset'] == start and self.meta['header']:
+                self._extend([values], end)
+
+_attendance_rollups = {}
+_attendance_rollups_lock = threading.Lock()
+
+def get_attendance_rollup(path):
+    with _attendance_rollups_lock:
+        rollup = _attendance_rollups.get(path)
+        if rollup is None:
+            rollup = _attendance_rollups[path] = AttendanceRollup(path)
+    if not rollup.refresh():
+        return None
+    return rollup
+
+@on_append
+def _update_attendance_rollup(path, start, end, values):
+    rollup = _attendance_rollups.get(path)
+    if rollup is not None:
+        rollup.append(start, end, values)
+
+def get_attendance_months(paths, start=None, end=None):
+    # {(month, session_name): [hundredths of hours, headcount]} over attendance
+    # files, limited to months in [start, end] ('YYYY-MM')
+    cells = {}
+    for path in paths:
+        rollup = get_attendance_rollup(path)
+        if rollup is None:
+            continue
+        with rollup.lock:
+            for (month, session_name), (hours, headcount) in rollup.cells.items():
+                if not headcount or (start and month < start) or (end and month > end):
+                    continue
+                cell = cells.setdefault((month, session_name), [0, 0])
+                cell[0] += hours
+                cell[1] += headcount
+    return cells
+
+# Partitions
+# Attendance and finance rows can be split by the year of their Date into
+# data/<table>/<year>.csv, with rows lacking a usable date in 0000.csv. Each
+# partition is an ordinary CSV with its own row index, finance columns and
+# compaction, so an append touches one small file and a date-filtered read,
+# export or total opens only the years it overlaps. Row ids stay single
+# integers, year * PARTITION_ROW_SPAN + row within the partition, which keeps
+# them ordered by partition. A table still stored as one file keeps working
+# until `flask partition` splits it.
+PARTITIONED_TABLES = {'attendance': 'Date', 'finances': 'Date'}
+PARTITION_ROW_SPAN = 10 ** 9
+
+def partition_dir(table):
+    return os.path.splitext(TABLES[table]['path'])[0]
+
+def is_partitioned(table):
+    return table in PARTITIONED_TABLES and os.path.isdir(partition_dir(table))
+
+def partition_key(date):
+    year = (date or '').strip()[:4]
+    return int(year) if len(year) == 4 and year.isdigit() else 0
+
+def partition_path(table, key):
+    return os.path.join(partition_dir(table), f'{key:04d}.csv')
+
+def partition_keys(table, start=None, end=None):
+    # Years with a partition file, ascending, limited to those overlapping
+    # [start, end] (ISO date prefixes, as the export filters use).
+    try:
+        filenames = os.listdir(partition_dir(table))
+    except FileNotFoundError:
+        return []
+    keys = sorted(int(name[:4]) for name in filenames if len(name) == 8 and name.endswith('.csv') and name[:4].isdigit())
+    if start:
+        keys = [key for key in keys if key >= partition_key(start)]
+    if end and partition_key(end):
+        keys = [key for key in keys if key <= partition_key(end)]
+    return keys
+
+def ensure_partition(table, key):
+    # Create the partition with its header; linking a finished temporary
+    # file into place means no process ever sees it without one.
+    path = partition_path(table, key)
+    if not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', newline='') as file:
+            csv.writer(file).writerow(TABLES[table]['columns'])
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    return path
+
+def _rebase(record, base):
+    # A record from one file with its row number turned into a table row id
+    if record is None or not base:
+        return record
+    return dict(record, _id=record['_id'] + base)
+
+def read_parts_page(parts, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    # read_page() over (row id base, path) parts ordered oldest first.
+    chunks = []  # (part position, page), newest part first
+    found = 0
+    if after is not None:
+        for position, (base, path) in enumerate(parts):
+            if after >= base + PARTITION_ROW_SPAN:
+                continue
+            page = read_page(path, after=max(0, after - base), limit=limit - found)
+            chunks.insert(0, (position, page))
+            found += len(page['records'])
+            if found >= limit:
+                break
+    else:
+        for position in range(len(parts) - 1, -1, -1):
+            base, path = parts[position]
+            if before is not None and before <= base:
+                continue
+            local = None if before is None or before - base >= PARTITION_ROW_SPAN else before - base
+            page = read_page(path, before=local, limit=limit - found)
+            chunks.append((position, page))
+            found += len(page['records'])
+            if found >= limit:
+                break
+
+    chunks = [(position, page) for position, page in chunks if page['records']]
+    records = [_rebase(record, parts[position][0]) for position, page in chunks for record in page['records']]
+    totals = [read_page_total(path) for _, path in parts]
+    older = newer = None
+    if chunks:
+        last_position, last_page = chunks[-1]
+        if last_page['older'] or any(totals[:last_position]):
+            older = records[-1]['_id']
+        first_position, first_page = chunks[0]
+        if first_page['newer'] or any(totals[first_position + 1:]):
+            newer = records[0]['_id']
+    return {'records': records, 'total': sum(totals), 'older': older, 'newer': newer}
+
+def concat_csv(paths):
+    # Partition files back to back with only the first header, unparsed
+    for position, path in enumerate(paths):
+        with open(path, 'r', newline='') as file:
+            if position:
+                file.readline()
+            while True:
+                chunk = file.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                count_bytes_read(len(chunk))
+                yield chunk
+
+class ConcatReader:
+    # Several files as one byte stream, the first whole and the rest without
+    # their header row, in EXPORT_CHUNK_SIZE chunks. The files are opened up
+    # front and read only up to their size then, so appends and compaction
+    # during a download do not change it. Seekable, so a Range request
+    # starts at its offset rather than reading up to it.
+    def __init__(self, paths):
+        self.spans = []
+        for position, path in enumerate(paths):
+            file = open(path, 'rb')
+            start = len(file.readline()) if position else 0
+            self.spans.append((file, start, os.fstat(file.fileno()).st_size))
+        self.length = sum(end - start for _, start, end in self.spans)
+        self.position = 0
+
+    def seekable(self):
+        return True
+
+    def seek(self, position):
+        self.position = position
+
+    def tell(self):
+        return self.position
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        skip = self.position
+        for file, start, end in self.spans:
+            if skip < end - start:
+                file.seek(start + skip)
+                chunk = file.read(min(EXPORT_CHUNK_SIZE, end - start - skip))
+                if chunk:
+                    count_bytes_read(len(chunk))
+                    self.position += len(chunk)
+                    return chunk
+                break
+            skip -= end - start
+        raise StopIteration
+
+    def close(self):
+        for file, _, _ in self.spans:
+            file.close()
+
+def read_page_total(path):
+    # Live rows in one file, from its row index
+    index = get_row_index(path)
+    return len(index['offsets']) - 1 - len(index['hidden']) if index else 0
+
+def partition_table(table):
+    # Move a single-file table's live rows into partitions and set the file
+    # aside as <name>.csv.<timestamp>.bak; returns the rows moved. The
+    # writers' flock is held throughout, and a writer that was waiting on it
+    # fails rather than recreating the file (GroupWriter._open_locked). Run
+    # again, it merges rows that arrived in a single file since.
+    path = TABLES[table]['path']
+    if not os.path.exists(path):
+        return 0
+    column = TABLES[table]['columns'].index(PARTITIONED_TABLES[table])
+    directory = partition_dir(table)
+    moved = 0
+    with open(path, 'rb') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            batches = {}
+            for record in read_table(path):
+                values = [record[name] for name in TABLES[table]['columns']]
+                batches.setdefault(partition_key(values[column]), []).append(values)
+                moved += 1
+
+            if os.path.isdir(directory):
+                for key, rows in sorted(batches.items()):
+                    append_rows(ensure_partition(table, key), rows)
+            else:
+                staging = directory + '.partitioning'
+                shutil.rmtree(staging, ignore_errors=True)
+                os.makedirs(staging)
+                for key, rows in batches.items():
+                    with open(os.path.join(staging, f'{key:04d}.csv'), 'w', newline='') as file:
+                        writer = csv.writer(file)
+                        writer.writerow(TABLES[table]['columns'])
+                        writer.writerows(rows)
+                        file.flush()
+                        os.fsync(file.fileno())
+                os.rename(staging, directory)
+            os.replace(path, f"{path}.{datetime.now().strftime('%Y%m%d%H%M%S')}.bak")
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # The single file's sidecars are now stale.
+    for name in os.listdir(os.path.dirname(path)):
+        if name.startswith('.' + os.path.splitext(os.path.basename(path))[0] + '.'):
+            os.remove(os.path.join(os.path.dirname(path), name))
+    with _table_cache_lock:
+        _drop_table(path)
+    return moved
+
+# Storage backends
+# Both backends expose the same small interface; the get_*/add_* helpers
+# below only ever talk to `storage`.
+
+# Callbacks run as listener(table, change) after a backend appends, edits or
+# deletes rows in this process; change is 'append', 'update' or 'delete'.
+_write_listeners = []
+
+def on_write(listener):
+    _write_listeners.append(listener)
+    return listener
+
+def _notify_write(table, change='append'):
+    for listener in _write_listeners:
+        listener(table, change)
+
+class CsvStorage:
+    name = 'csv'
+
+    def path(self, table):
+        return TABLES[table]['path']
+
+    def parts(self, table, start=None, end=None):
+        # (row id base, path) for each file holding the table, oldest first
+        if not is_partitioned(table):
+            return [(0, self.path(table))]
+        return [(key * PARTITION_ROW_SPAN, partition_path(table, key)) for key in partition_keys(table, start, end)]
+
+    def paths(self, table):
+        return [path for _, path in self.parts(table)]
+
+    def _locate(self, table, row_id):
+        # (path, row within that file, row id base) for a row id
+        if not is_partitioned(table):
+            return self.path(table), row_id, 0
+        key, row = divmod(row_id, PARTITION_ROW_SPAN)
+        return partition_path(table, key), row, key * PARTITION_ROW_SPAN
+
+    def _append_path(self, table, values):
+        if not is_partitioned(table):
+            return self.path(table)
+        column = TABLES[table]['columns'].index(PARTITIONED_TABLES[table])
+        return ensure_partition(table, partition_key(values[column]))
+
+    def init_table(self, table):
+        path = self.path(table)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        if table in PARTITIONED_TABLES and not os.path.exists(path):
+            # New installs start partitioned; a single file is kept until
+            # `flask partition` splits it.
+            os.makedirs(partition_dir(table), exist_ok=True)
+            return
+        if not os.path.exists(path):
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(TABLES[table]['columns'])
+
+    def read(self, table):
+        parts = self.parts(table)
+        if len(parts) == 1 and not parts[0][0]:
+            return read_table(parts[0][1])
+        # Built on each call rather than kept: the partitions' rows are
+        # already in the table cache, and a second copy would sit outside
+        # its byte budget.
+        return [_rebase(record, base) for base, path in parts for record in read_table(path)]
+
+    def get(self, table, row_id):
+        path, row, base = self._locate(table, row_id)
+        return _rebase(read_row(path, row), base)
+
+    def _mark(self, table, row_id, values, expected):
+        # Append a replacement (or, with values None, a tombstone) for a row
+        # that still holds `expected`; False if the row is gone, changed, or
+        # compaction renumbered the file.
+        path, row, _ = self._locate(table, row_id)
+        index = get_row_index(path)
+        current = self.get(table, row_id)
+        if index is None or current is None or (expected is not None and current != expected):
+            return False
+        marker = [TOMBSTONE, row] if values is None else [REPLACEMENT, row, *values]
+        if append_rows(path, [marker], inode=index['inode']) is None:
+            return False
+        schedule_compaction(path)
+        _notify_write(table, 'delete' if values is None else 'update')
+        return True
+
+    def update(self, table, row_id, values, expected=None):
+        # A new date in another year moves the row to that partition.
+        path, _, _ = self._locate(table, row_id)
+        if is_partitioned(table) and self._append_path(table, values) != path:
+            if not self._mark(table, row_id, None, expected):
+                return False
+            self.append(table, values)
+            return True
+        return self._mark(table, row_id, values, expected)
+
+    def delete(self, table, row_id, expected=None):
+        return self._mark(table, row_id, None, expected)
+
+    def append(self, table, values):
+        append_row(self._append_path(table, values), values)
+        _notify_write(table)
+
+    def append_numbered(self, table, column, values):
+        # Sets `column` to the next number under the file's lock; returns it.
+        number = append_numbered(self._append_path(table, values), values, TABLES[table]['columns'].index(column))
+        _notify_write(table)
+        return number
+
+    def append_many(self, table, rows):
+        batches = {}
+        for values in rows:
+            batches.setdefault(self._append_path(table, values), []).append(values)
+        for path, batch in batches.items():
+            append_rows(path, batch)
+        _notify_write(table)
+
+    def page(self, table, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+        parts = self.parts(table)
+        if len(parts) == 1 and not parts[0][0]:
+            return read_page(parts[0][1], before, after, limit)
+        return read_parts_page(parts, before, after, limit)
+
+    def export(self, table, filters):
+        # Only partitions overlapping a date filter are opened.
+        start, end = filters.get(PARTITIONED_TABLES.get(table), ('', ''))
+        paths = [path for _, path in self.parts(table, start, end)]
+        if not paths:
+            return stream_records(TABLES[table]['columns'], [])
+        if not filters and not any(dead_rows(path)[0] for path in paths):
+            return concat_csv(paths)
+        return itertools.chain.from_iterable(
+            stream_csv(path, filters, header=position == 0) for position, path in enumerate(paths)
+        )
+
+    def rows(self, table, filters=None):
+        # Live rows as value lists in table order, read as a stream; like
+        # export(), only partitions overlapping a date filter are opened.
+        filters = filters or {}
+        start, end = filters.get(PARTITIONED_TABLES.get(table), ('', ''))
+        return itertools.chain.from_iterable(
+            iter_csv_rows(path, filters) for _, path in self.parts(table, start, end)
+        )
+
+    def tail(self, table, cursor=None, replay=True):
+        # Rows appended since `cursor`, as (records, cursor, restarted); see
+        # tail_csv(). A partitioned table's cursor maps each partition path
+        # to its own, and a partition created since then is read in full.
+        columns = TABLES[table]['columns']
+        if not is_partitioned(table):
+            return tail_csv(self.path(table), columns, None if isinstance(cursor, dict) else cursor, replay)
+        if not isinstance(cursor, dict):
+            cursor = None
+        records = []
+        cursors = {}
+        restarted = cursor is None
+        for base, path in self.parts(table):
+            if cursor is not None and path not in cursor:
+                part_records, cursors[path], _ = tail_csv(path, columns, None)
+            else:
+                part_records, cursors[path], part_restarted = tail_csv(
+                    path, columns, None if cursor is None else cursor[path], replay
+                )
+                if part_restarted and cursor is not None:
+                    if replay:
+                        return self.tail(table, None)
+                    restarted = True
+            records.extend(_rebase(record, base) for record in part_records)
+        return records, cursors, restarted
+
+    def read_frame(self, table):
+        import pandas as pd
+        columns = TABLES[table]['columns']
+        frames = []
+        for _, path in self.parts(table):
+            if dead_rows(path)[0]:
+                frames.append(pd.DataFrame(read_table(path), columns=columns))
+            else:
+                frames.append(pd.read_csv(path, dtype=str, keep_default_na=False))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def compact(self, table):
+        return sum(compact_csv(path) for path in self.paths(table))
+
+    def finance_totals(self, start=None, end=None):
+        # Partitions wholly inside the range contribute their saved totals;
+        # only the ones it cuts through are summed by date.
+        parts = []
+        for base, path in self.parts('finances', start, end):
+            year = base // PARTITION_ROW_SPAN
+            if year and (not start or start <= f'{year:04d}-01-01') and (not end or end >= f'{year:04d}-12-31'):
+                parts.append((path, None, None))
+            else:
+                parts.append((path, start, end))
+        return get_finance_totals(parts)
+
+    def _month_paths(self, table, start, end):
+        # Files that can hold months in [start, end]; partitions are by year.
+        return [path for _, path in self.parts(table, start and start + '-01', end and end + '-01')]
+
+    def finance_months(self, start=None, end=None):
+        # {(month, type, category): cents} for months in [start, end]
+        return get_finance_months(self._month_paths('finances', start, end), start, end)
+
+    def attendance_months(self, start=None, end=None):
+        # {(month, session_name): [hundredths of hours, headcount]}
+        return get_attendance_months(self._month_paths('attendance', start, end), start, end)
+
+    def version(self, table):
+        if is_partitioned(table):
+            signatures = [(path, _file_signature(path)) for path in self.paths(table)]
+            return 'p-' + hashlib.sha1(repr(signatures).encode('utf-8')).hexdigest()[:16]
+        signature = _file_signature(self.path(table))
+        return '-'.join(str(part) for part in signature) if signature else '0'
+
+# Integer cents from the TEXT Amount column, as to_cents() does for CSV
+SQLITE_CENTS = 'CAST(ROUND(CAST({0}"Amount" AS REAL) * 100) AS INTEGER)'
+# Hundredths of an hour, and the YYYY-MM month of Date ('' when not a date)
+SQLITE_HUNDREDTHS = 'CAST(ROUND(CAST({0}"Hours" AS REAL) * 100) AS INTEGER)'
+SQLITE_MONTH = ('CASE WHEN {0}"Date" GLOB \'[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]\' '
+                'THEN substr({0}"Date", 1, 7) ELSE \'\' END')
+
+def _sqlite_schema():
+    statements = ['CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)']
+    for table, spec in TABLES.items():
+        columns = ', '.join(f'"{column}" TEXT' for column in spec['columns'])
+        statements.append(f'CREATE TABLE IF NOT EXISTS {table} (rowid INTEGER PRIMARY KEY, {columns})')
+        statements.append(f"INSERT OR IGNORE INTO table_versions (name, version) VALUES ('{table}', 0)")
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(
+                f'CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN '
+                f"UPDATE table_versions SET version = version + 1 WHERE name = '{table}'; END"
+            )
+    statements += [
+        'CREATE INDEX IF NOT EXISTS attendance_date ON attendance ("Date")',
+        'CREATE INDEX IF NOT EXISTS attendance_member ON attendance ("Member Name" COLLATE NOCASE)',
+        'CREATE INDEX IF NOT EXISTS members_name ON members ("Member Name" COLLATE NOCASE)',
+        'CREATE INDEX IF NOT EXISTS finances_date ON finances ("Date")',
+        'CREATE INDEX IF NOT EXISTS finances_type_category ON finances ("Type", "Category" COLLATE NOCASE)',
+        'CREATE INDEX IF NOT EXISTS events_date ON events ("Date")',
+        # Running totals per (Type, Category), kept current by trigger
+        'CREATE TABLE IF NOT EXISTS finance_totals ("Type" TEXT, "Category" TEXT, cents INTEGER NOT NULL DEFAULT 0, '
+        'PRIMARY KEY ("Type", "Category"))',
+        'CREATE TRIGGER IF NOT EXISTS finances_totals_insert AFTER INSERT ON finances BEGIN '
+        'INSERT INTO finance_totals ("Type", "Category", cents) VALUES (NEW."Type", NEW."Category", ' + SQLITE_CENTS.format('NEW.') + ') '
+        'ON CONFLICT ("Type", "Category") DO UPDATE SET cents = cents + excluded.cents; END',
+        'CREATE TRIGGER IF NOT EXISTS finances_totals_delete AFTER DELETE ON finances BEGIN '
+        'UPDATE finance_totals SET cents = cents - ' + SQLITE_CENTS.format('OLD.') + ' '
+        'WHERE "Type" = OLD."Type" AND "Category" = OLD."Category"; END',
+        'CREATE TRIGGER IF NOT EXISTS finances_totals_update AFTER UPDATE ON finances BEGIN '
+        'UPDATE finance_totals SET cents = cents - ' + SQLITE_CENTS.format('OLD.') + ' '
+        'WHERE "Type" = OLD."Type" AND "Category" = OLD."Category"; '
+        'INSERT INTO finance_totals ("Type", "Category", cents) VALUES (NEW."Type", NEW."Category", ' + SQLITE_CENTS.format('NEW.') + ') '
+        'ON CONFLICT ("Type", "Category") DO UPDATE SET cents = cents + excluded.cents; END',
+    ]
+    finance_key = SQLITE_MONTH.format('{0}') + ', {0}"Type", {0}"Category"'
+    attendance_key = SQLITE_MONTH.format('{0}') + ', COALESCE({0}"Session Name", \'\')'
+    statements += [
+        # Rollups per (Month, Type, Category) and (Month, Session Name), kept
+        # current by trigger; a database from before they existed is filled
+        # once when it is first opened.
+        'CREATE TABLE IF NOT EXISTS finance_months ("Month" TEXT, "Type" TEXT, "Category" TEXT, '
+        'cents INTEGER NOT NULL DEFAULT 0, PRIMARY KEY ("Month", "Type", "Category"))',
+        'CREATE TRIGGER IF NOT EXISTS finance_months_insert AFTER INSERT ON finances BEGIN '
+        'INSERT INTO finance_months ("Month", "Type", "Category", cents) VALUES (' + finance_key.format('NEW.') + ', '
+        + SQLITE_CENTS.format('NEW.') + ') ON CONFLICT ("Month", "Type", "Category") DO UPDATE SET cents = cents + excluded.cents; END',
+        'CREATE TRIGGER IF NOT EXISTS finance_months_delete AFTER DELETE ON finances BEGIN '
+        'UPDATE finance_months SET cents = cents - ' + SQLITE_CENTS.format('OLD.') + ' '
+        'WHERE ("Month", "Type", "Category") = (' + finance_key.format('OLD.') + '); END',
+        'CREATE TRIGGER IF NOT EXISTS finance_months_update AFTER UPDATE ON finances BEGIN '
+        'UPDATE finance_months SET cents = cents - ' + SQLITE_CENTS.format('OLD.') + ' '
+        'WHERE ("Month", "Type", "Category") = (' + finance_key.format('OLD.') + '); '
+        'INSERT INTO finance_months ("Month", "Type", "Category", cents) VALUES (' + finance_key.format('NEW.') + ', '
+        + SQLITE_CENTS.format('NEW.') + ') ON CONFLICT ("Month", "Type", "Category") DO UPDATE SET cents = cents + excluded.cents; END',
+        'INSERT INTO finance_months ("Month", "Type", "Category", cents) SELECT ' + finance_key.format('') + ', '
+        'SUM(' + SQLITE_CENTS.format('') + ') FROM finances WHERE NOT EXISTS (SELECT 1 FROM finance_months) GROUP BY 1, 2, 3',
+        'CREATE TABLE IF NOT EXISTS attendance_months ("Month" TEXT, "Session Name" TEXT, '
+        'hours INTEGER NOT NULL DEFAULT 0, headcount INTEGER NOT NULL DEFAULT 0, PRIMARY KEY ("Month", "Session Name"))',
+        'CREATE TRIGGER IF NOT EXISTS attendance_months_insert AFTER INSERT ON attendance BEGIN '
+        'INSERT INTO attendance_months ("Month", "Session Name", hours, headcount) VALUES (' + attendance_key.format('NEW.') + ', '
+        + SQLITE_HUNDREDTHS.format('NEW.') + ', 1) ON CONFLICT ("Month", "Session Name") DO UPDATE SET '
+        'hours = hours + excluded.hours, headcount = headcount + 1; END',
+        'CREATE TRIGGER IF NOT EXISTS attendance_months_delete AFTER DELETE ON attendance BEGIN '
+        'UPDATE attendance_months SET hours = hours - ' + SQLITE_HUNDREDTHS.format('OLD.') + ', headcount = headcount - 1 '
+        'WHERE ("Month", "Session Name") = (' + attendance_key.format('OLD.') + '); END',
+        'CREATE TRIGGER IF NOT EXISTS attendance_months_update AFTER UPDATE ON attendance BEGIN '
+        'UPDATE attendance_months SET hours = hours - ' + SQLITE_HUNDREDTHS.format('OLD.') + ', headcount = headcount - 1 '
+        'WHERE ("Month", "Session Name") = (' + attendance_key.format('OLD.') + '); '
+        'INSERT INTO attendance_months ("Month", "Session Name", hours, headcount) VALUES (' + attendance_key.format('NEW.') + ', '
+        + SQLITE_HUNDREDTHS.format('NEW.') + ', 1) ON CONFLICT ("Month", "Session Name") DO UPDATE SET '
+        'hours = hours + excluded.hours, headcount = headcount + 1; END',
+        'INSERT INTO attendance_months ("Month", "Session Name", hours, headcount) SELECT ' + attendance_key.format('') + ', '
+        'SUM(' + SQLITE_HUNDREDTHS.format('') + '), COUNT(*) FROM attendance '
+        'WHERE NOT EXISTS (SELECT 1 FROM attendance_months) GROUP BY 1, 2',
+    ]
+    return statements
+
+class SqliteStorage:
+    name = 'sqlite'
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        with self._schema_lock:
+            if not self._schema_ready:
+                with conn:
+                    for statement in _sqlite_schema():
+                        conn.execute(statement)
+                self._schema_ready = True
+        return conn
+
+    def _columns(self, table):
+        return ', '.join(f'"{column}"' for column in TABLES[table]['columns'])
+
+    def _where(self, filters):
+        clauses = []
+        params = []
+        for column, wanted in filters.items():
+            if isinstance(wanted, tuple):
+                start, end = wanted
+                if start:
+                    clauses.append(f'"{column}" >= ?')
+                    params.append(start)
+                if end:
+                    # Match _row_matches: `end` is an inclusive prefix.
+                    clauses.append(f'"{column}" <= ?')
+                    params.append(end + '\U0010ffff')
+            else:
+                clauses.append(f'"{column}" = ? COLLATE NOCASE')
+                params.append(wanted)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def init_table(self, table):
+        self.connect()
+
+    def read(self, table, filters=None):
+        columns = TABLES[table]['columns']
+        where, params = self._where(filters or {})
+        cursor = self.connect().execute(f'SELECT rowid, {self._columns(table)} FROM {table}{where} ORDER BY rowid', params)
+        return [dict(zip(columns, row[1:]), _id=row[0]) for row in cursor]
+
+    def get(self, table, row_id):
+        row = self.connect().execute(
+            f'SELECT rowid, {self._columns(table)} FROM {table} WHERE rowid = ?', (row_id,)
+        ).fetchone()
+        return dict(zip(TABLES[table]['columns'], row[1:]), _id=row[0]) if row else None
+
+    def _matches(self, table, expected):
+        # WHERE clause pinning every column to the values the caller saw
+        if expected is None:
+            return '', []
+        columns = TABLES[table]['columns']
+        return ''.join(f' AND "{column}" IS ?' for column in columns), [expected.get(column) for column in columns]
+
+    def update(self, table, row_id, values, expected=None):
+        assignments = ', '.join(f'"{column}" = ?' for column in TABLES[table]['columns'])
+        matches, params = self._matches(table, expected)
+        conn = self.connect()
+        with conn:
+            cursor = conn.execute(f'UPDATE {table} SET {assignments} WHERE rowid = ?{matches}', [*values, row_id, *params])
+        if cursor.rowcount != 1:
+            return False
+        _notify_write(table, 'update')
+        return True
+
+    def delete(self, table, row_id, expected=None):
+        matches, params = self._matches(table, expected)
+        conn = self.connect()
+        with conn:
+            cursor = conn.execute(f'DELETE FROM {table} WHERE rowid = ?{matches}', [row_id, *params])
+        if cursor.rowcount != 1:
+            return False
+        _notify_write(table, 'delete')
+        return True
+
+    def compact(self, table):
+        # Deleted rows are reclaimed by SQLite itself.
+        return 0
+
+    def append(self, table, values):
+        self.append_many(table, [values])
+
+    def append_numbered(self, table, column, values):
+        # One statement, so the number is taken under SQLite's write lock.
+        columns = TABLES[table]['columns']
+        index = columns.index(column)
+        selected = ', '.join(
+            f'(SELECT COALESCE(MAX(CAST("{column}" AS INTEGER)), 0) + 1 FROM {table} '
+            f'WHERE "{column}" != \'\' AND "{column}" NOT GLOB \'*[^0-9]*\')' if position == index else '?'
+            for position in range(len(columns))
+        )
+        params = [value for position, value in enumerate(values) if position != index]
+        conn = self.connect()
+        with conn:
+            cursor = conn.execute(f'INSERT INTO {table} ({self._columns(table)}) SELECT {selected}', params)
+            number = conn.execute(f'SELECT "{column}" FROM {table} WHERE rowid = ?', (cursor.lastrowid,)).fetchone()[0]
+        _notify_write(table)
+        return str(number)
+
+    def append_many(self, table, rows):
+        placeholders = ', '.join('?' for _ in TABLES[table]['columns'])
+        conn = self.connect()
+        with conn:
+            conn.executemany(f'INSERT INTO {table} ({self._columns(table)}) VALUES ({placeholders})', rows)
+        _notify_write(table)
+
+    def page(self, table, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+        conn = self.connect()
+        columns = TABLES[table]['columns']
+        if after is not None:
+            rows = conn.execute(
+                f'SELECT rowid, {self._columns(table)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?', (after, limit)
+            ).fetchall()[::-1]
+        else:
+            rows = conn.execute(
+                f'SELECT rowid, {self._columns(table)} FROM {table} WHERE rowid < ? ORDER BY rowid DESC LIMIT ?',
+                (before if before is not None else 2 ** 63 - 1, limit),
+            ).fetchall()
+        total = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        older = newer = None
+        if rows:
+            newest, oldest = rows[0][0], rows[-1][0]
+            if conn.execute(f'SELECT 1 FROM {table} WHERE rowid < ? LIMIT 1', (oldest,)).fetchone():
+                older = oldest
+            if conn.execute(f'SELECT 1 FROM {table} WHERE rowid > ? LIMIT 1', (newest,)).fetchone():
+                newer = newest
+        return {
+            'records': [dict(zip(columns, row[1:]), _id=row[0]) for row in rows],
+            'total': total,
+            'older': older,
+            'newer': newer,
+        }
+
+    def export(self, table, filters):
+        where, params = self._where(filters)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(TABLES[table]['columns'])
+        cursor = self.connect().execute(f'SELECT {self._columns(table)} FROM {table}{where} ORDER BY rowid', params)
+        for row in cursor:
+            writer.writerow(row)
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def rows(self, table, filters=None):
+        where, params = self._where(filters or {})
+        cursor = self.connect().execute(f'SELECT {self._columns(table)} FROM {table}{where} ORDER BY rowid', params)
+        return (list(row) for row in cursor)
+
+    def tail(self, table, cursor=None, replay=True):
+        # Same contract as CsvStorage.tail; the cursor is the last rowid.
+        conn = self.connect()
+        last = conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0] or 0
+        restarted = cursor is None or cursor > last
+        if restarted and not replay:
+            return [], last, True
+        after = 0 if restarted else cursor
+        rows = conn.execute(
+            f'SELECT rowid, {self._columns(table)} FROM {table} WHERE rowid > ? ORDER BY rowid', (after,)
+        ).fetchall()
+        columns = TABLES[table]['columns']
+        records = [dict(zip(columns, row[1:]), _id=row[0]) for row in rows]
+        return records, rows[-1][0] if rows else after, restarted
+
+    def read_frame(self, table):
+        import pandas as pd
+        return pd.read_sql_query(f'SELECT {self._columns(table)} FROM {table} ORDER BY rowid', self.connect())
+
+    def finance_totals(self, start=None, end=None):
+        summary = {'total_income': 0, 'total_expenses': 0, 'income_by_category': {}, 'expense_by_category': {}}
+        query, params = 'SELECT "Type", "Category", cents FROM finance_totals', []
+        if start or end:
+            where, params = self._where({'Date': (start or '', end or '')})
+            query = ('SELECT "Type", "Category", SUM(' + SQLITE_CENTS.format('') + ') FROM finances'
+                     + where + ' GROUP BY "Type", "Category"')
+        for record_type, category, cents in self.connect().execute(query, params):
+            if not cents:
+                continue
+            if record_type == 'Income':
+                summary['total_income'] += cents
+                summary['income_by_category'][category] = cents
+            elif record_type == 'Expense':
+                summary['total_expenses'] += cents
+                summary['expense_by_category'][category] = cents
+        return _amount_summary(summary)
+
+    def _month_range(self, start, end):
+        clauses, params = [], []
+        if start:
+            clauses.append('"Month" >= ?')
+            params.append(start)
+        if end:
+            clauses.append('"Month" <= ?')
+            params.append(end)
+        return ''.join(f' AND {clause}' for clause in clauses), params
+
+    def finance_months(self, start=None, end=None):
+        where, params = self._month_range(start, end)
+        rows = self.connect().execute(
+            'SELECT "Month", "Type", "Category", cents FROM finance_months '
+            f'WHERE "Type" IN (\'Income\', \'Expense\') AND cents != 0{where}', params
+        )
+        return {(month, record_type, category): cents for month, record_type, category, cents in rows}
+
+    def attendance_months(self, start=None, end=None):
+        where, params = self._month_range(start, end)
+        rows = self.connect().execute(
+            f'SELECT "Month", "Session Name", hours, headcount FROM attendance_months WHERE headcount > 0{where}', params
+        )
+        return {(month, session_name): [hours, headcount] for month, session_name, hours, headcount in rows}
+
+    def version(self, table):
+        row = self.connect().execute('SELECT version FROM table_versions WHERE name = ?', (table,)).fetchone()
+        return f'sqlite-{row[0] if row else 0}'
+
+    def bulk_load(self, table, rows, replace=False):
+        conn = self.connect()
+        placeholders = ', '.join('?' for _ in TABLES[table]['columns'])
+        with conn:
+            if replace:
+                conn.execute(f'DELETE FROM {table}')
+            cursor = conn.executemany(f'INSERT INTO {table} ({self._columns(table)}) VALUES ({placeholders})', rows)
+            if table == 'finances':
+                conn.execute('DELETE FROM finance_totals')
+                conn.execute(
+                    'INSERT INTO finance_totals ("Type", "Category", cents) '
+                    'SELECT "Type", "Category", SUM(' + SQLITE_CENTS.format('') + ') FROM finances GROUP BY "Type", "Category"'
+                )
+                conn.execute('DELETE FROM finance_months')
+                conn.execute(
+                    'INSERT INTO finance_months ("Month", "Type", "Category", cents) SELECT '
+                    + SQLITE_MONTH.format('') + ', "Type", "Category", SUM(' + SQLITE_CENTS.format('') + ') '
+                    'FROM finances GROUP BY 1, 2, 3'
+                )
+            elif table == 'attendance':
+                conn.execute('DELETE FROM attendance_months')
+                conn.execute(
+                    'INSERT INTO attendance_months ("Month", "Session Name", hours, headcount) SELECT '
+                    + SQLITE_MONTH.format('') + ', COALESCE("Session Name", \'\'), SUM(' + SQLITE_HUNDREDTHS.format('') + '), '
+                    'COUNT(*) FROM attendance GROUP BY 1, 2'
+                )
+        return cursor.rowcount
+
+storage = SqliteStorage(SQLITE_DB) if STORAGE_BACKEND == 'sqlite' else CsvStorage()
+
+# Accounts
+# Users are rows of the 'users' table. Each process keeps them in dicts by id
+# and by casefolded username and re-reads the table only when a lookup misses
+# and the table's version has changed, so load_user on an ordinary request
+# never touches storage.
+USER_ROLES = ('admin', 'officer', 'member')
+# Members can read everything; only these roles change records or read /metrics.
+OFFICER_ROLES = ('admin', 'officer')
+
+class UserStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_id = {}
+        self._by_username = {}
+
+    def _refresh(self):
+        # Caller holds self._lock.
+        version = storage.version('users')
+        if version == self._version:
+            return
+        by_id = {}
+        by_username = {}
+        for record in storage.read('users'):
+            user = User(record['User ID'], record['Username'], record['Password Hash'], record['Role'] or 'member')
+            by_id[user.id] = user
+            by_username[user.username.casefold()] = user
+        self._by_id = by_id
+        self._by_username = by_username
+        self._version = version
+
+    def get(self, user_id):
+        user = self._by_id.get(user_id)
+        if user is None:
+            with self._lock:
+                self._refresh()
+                user = self._by_id.get(user_id)
+        return user
+
+    def find(self, username):
+        key = (username or '').strip().casefold()
+        user = self._by_username.get(key)
+        if user is None:
+            with self._lock:
+                self._refresh()
+                user = self._by_username.get(key)
+        return user
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return sorted(self._by_id.values(), key=lambda user: int(user.id))
+
+    def add(self, username, password_hash, role='member'):
+        username = username.strip()
+        if not username:
+            raise ValueError('Username is required')
+        if role not in USER_ROLES:
+            raise ValueError(f"Role must be one of: {', '.join(USER_ROLES)}")
+        with self._lock:
+            self._refresh()
+            if username.casefold() in self._by_username:
+                raise ValueError(f'User {username!r} already exists')
+            user_id = str(max((int(user_id) for user_id in self._by_id), default=0) + 1)
+            storage.append('users', [user_id, username, password_hash, role, datetime.now().strftime('%Y-%m-%d')])
+            user = User(user_id, username, password_hash, role)
+            self._by_id[user_id] = user
+            self._by_username[username.casefold()] = user
+        return user
+
+    def ensure_admin(self, admin, reset_password=False):
+        # Creates the admin account on first run. With reset_password an
+        # existing admin row takes admin's password hash, so setting
+        # MYSTERY_CLUB_ADMIN_PASSWORD_HASH changes the password later on.
+        with self._lock:
+            self._refresh()
+            if not self._by_id:
+                storage.append('users', [admin.id, admin.username, admin.password_hash, admin.role,
+                                         datetime.now().strftime('%Y-%m-%d')])
+                self._version = None
+                return
+            current = self._by_id.get(admin.id)
+            if not reset_password or current is None or current.password_hash == admin.password_hash:
+                return
+            columns = TABLES['users']['columns']
+            for record in storage.read('users'):
+                if record['User ID'] == admin.id:
+                    values = [record.get(column) or '' for column in columns]
+                    values[columns.index('Password Hash')] = admin.password_hash
+                    storage.update('users', record['_id'], values, record)
+            self._version = None
+
+user_store = UserStore()
+
+def officer_required(view):
+    # Goes under @login_required.
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if current_user.role not in OFFICER_ROLES:
+            return Response('Forbidden: only officers can change club records\n', status=403, mimetype='text/plain')
+        return view(*args, **kwargs)
+    return wrapped
+
+# Password checks
+# PBKDF2 is deliberately slow, so logins are verified on a small dedicated
+# pool instead of whatever thread the request arrived on. When the pool and
+# its queue are full the login is refused with 503 rather than queued without
+# bound, and each client IP gets LOGIN_RATE_LIMIT attempts per
+# LOGIN_RATE_PERIOD (a token bucket, per process).
+LOGIN_WORKERS = int(os.environ.get('MYSTERY_CLUB_LOGIN_WORKERS', '2'))
+LOGIN_QUEUE_SIZE = 8
+LOGIN_RATE_LIMIT = 10
+LOGIN_RATE_PERIOD = 60.0
+LOGIN_RATE_MAX_CLIENTS = 10000
+
+_password_pool = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix='password-check')
+_password_slots = threading.BoundedSemaphore(LOGIN_WORKERS + LOGIN_QUEUE_SIZE)
+
+def verify_password(user, password):
+    # True/False, or None when too many checks are already in flight
+    if not _password_slots.acquire(blocking=False):
+        return None
+    # Unknown usernames are checked against a real hash too, so the response
+    # time does not reveal which usernames exist.
+    password_hash = user.password_hash if user is not None else DEFAULT_ADMIN_PASSWORD_HASH
+    try:
+        future = _password_pool.submit(check_password_hash, password_hash, password)
+    except BaseException:
+        _password_slots.release()
+        raise
+    future.add_done_callback(lambda _: _password_slots.release())
+    return future.result() and user is not None
+
+_login_buckets = OrderedDict()
+_login_buckets_lock = threading.Lock()
+
+def allow_login_attempt(client):
+    now = time.monotonic()
+    with _login_buckets_lock:
+        tokens, updated = _login_buckets.pop(client, (LOGIN_RATE_LIMIT, now))
+        tokens = min(LOGIN_RATE_LIMIT, tokens + (now - updated) * LOGIN_RATE_LIMIT / LOGIN_RATE_PERIOD)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        _login_buckets[client] = (tokens, now)
+        while len(_login_buckets) > LOGIN_RATE_MAX_CLIENTS:
+            _login_buckets.popitem(last=False)
+    return allowed
+
+# Data files are created once per process, not checked on every page view.
+init_data()
+
+# Member directory
+# Members by normalized name and by normalized email, for constant-time
+# membership and duplicate checks, and a character trie over each member's
+# name, the later words of the name and the email for typeahead. Built from
+# storage on first use, then extended with the rows storage.tail() returns;
+# an edit or delete (in this process via on_write, or elsewhere when the
+# version changes without new rows) rebuilds it.
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+
+def normalize_name(name):
+    return ' '.join((name or '').casefold().split())
+
+def normalize_email(email):
+    return (email or '').strip().casefold()
+
+class MemberDirectory:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stale = True
+        self._version = None
+        self._cursor = None
+        self._by_name = {}
+        self._by_email = {}
+        self._trie = {}  # char -> child node; the None key lists members ending here
+
+    def notify(self, table, change='append'):
+        if table == 'members' and change != 'append':
+            self._stale = True
+
+    def _build(self):
+        # As in SearchIndex._build, a row appended during the read may be
+        # added twice; the dicts keep one and suggest() skips repeats.
+        self._stale = False
+        self._version = storage.version('members')
+        _, self._cursor, _ = storage.tail('members', None, replay=False)
+        self._by_name = {}
+        self._by_email = {}
+        self._trie = {}
+        for record in storage.read('members'):
+            self._add(record)
+
+    def _add(self, record):
+        name = normalize_name(record.get('Member Name'))
+        email = normalize_email(record.get('Email'))
+        if name:
+            self._by_name.setdefault(name, record)
+        if email:
+            self._by_email.setdefault(email, record)
+        words = name.split(' ')
+        for key in {name, email, *(' '.join(words[i:]) for i in range(1, len(words)))}:
+            if not key:
+                continue
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(record)
+
+    def _catch_up(self):
+        if self._stale:
+            return self._build()
+        version = storage.version('members')
+        if version == self._version:
+            return
+        records, cursor, restarted = storage.tail('members', self._cursor, replay=False)
+        if restarted or not records:
+            return self._build()
+        self._version = version
+        self._cursor = cursor
+        for record in records:
+            self._add(record)
+
+    def find(self, name=None, email=None):
+        # The member with this name or email, ignoring case and spacing
+        with self._lock:
+            self._catch_up()
+            return self._by_name.get(normalize_name(name)) or self._by_email.get(normalize_email(email))
+
+    def suggest(self, prefix, limit=SUGGEST_DEFAULT_LIMIT):
+        # Members whose name, any later word of it, or email starts with
+        # prefix, in alphabetical order of the matching key
+        prefix = normalize_name(prefix)
+        found = []
+        with self._lock:
+            self._catch_up()
+            node = self._trie
+            for char in prefix:
+                node = node.get(char)
+                if node is None:
+                    return []
+            stack = [node]
+            while stack and len(found) < limit:
+                node = stack.pop()
+                for record in node.get(None, ()):
+                    if len(found) < limit and all(record is not seen for seen in found):
+                        found.append(record)
+                stack.extend(node[char] for char in sorted((key for key in node if key is not None), reverse=True))
+        return found
+
+member_directory = MemberDirectory()
+on_write(member_directory.notify)
 
 # Helper functions for attendance
+@instrumented
+def get_page(table, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    return storage.page(table, before, after, limit)
+
+@instrumented
 def get_members():
-    members = []
-    if os.path.exists(MEMBERS_CSV):
-        with open(MEMBERS_CSV, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            members = list(reader)
-    return members
+    return storage.read('members')
 
+@instrumented
 def add_member(name, email):
-    with open(MEMBERS_CSV, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([name, email, datetime.now().strftime('%Y-%m-%d')])
+    # False if a member already has this name or email
+    if member_directory.find(name, email) is not None:
+        return False
+    storage.append('members', [name, email, datetime.now().strftime('%Y-%m-%d')])
+    return True
 
+@instrumented
 def get_attendance_records():
-    records = []
-    if os.path.exists(ATTENDANCE_CSV):
-        with open(ATTENDANCE_CSV, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            records = list(reader)
-    return records
+    return storage.read('attendance')
 
+@instrumented
 def add_attendance_record(date, member_name, session_name, hours, notes):
-    with open(ATTENDANCE_CSV, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([date, member_name, session_name, hours, notes])
+    # False unless member_name is a member; it is stored as spelled there.
+    member = member_directory.find(member_name)
+    if member is None:
+        return False
+    storage.append('attendance', [date, member['Member Name'], session_name, hours, notes])
+    return True
 
 # Financial functions
+@instrumented
 def get_financial_records():
-    records = []
-    if os.path.exists(FINANCES_CSV):
-        with open(FINANCES_CSV, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            records = list(reader)
-    return records
+    return storage.read('finances')
 
+@instrumented
 def add_financial_record(date, record_type, category, amount, description):
-    with open(FINANCES_CSV, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([date, record_type, category, amount, description])
-
-def get_financial_summary():
-    records = get_financial_records()
-    total_income = sum(float(record['Amount']) for record in records if record['Type'] == 'Income')
-    total_expenses = sum(float(record['Amount']) for record in records if record['Type'] == 'Expense')
-    balance = total_income - total_expenses
-    return {
-        'total_income': total_income,
-        'total_expenses': total_expenses,
-        'balance': balance,
-        'records': records
+    storage.append('finances', [date, record_type, category, amount, description])
+
+@instrumented
+def get_financial_summary(include_records=True, start=None, end=None):
+    totals = storage.finance_totals(start, end)
+    summary = {
+        'total_income': totals['total_income'],
+        'total_expenses': totals['total_expenses'],
+        'balance': totals['balance'],
+        'income_by_category': totals['income_by_category'],
+        'expense_by_category': totals['expense_by_category'],
     }
+    if include_records:
+        summary['records'] = get_financial_records()
+    return summary
+
+# Trend series
+# Charts over months, quarters or years are summed from the monthly rollups
+# (storage.finance_months / attendance_months), a few cells per month
+# whatever the number of records. start and end are YYYY-MM months,
+# inclusive; records without a usable date are left out.
+ROLLUP_GRANULARITIES = ('month', 'quarter', 'year')
+
+def month_period(month, granularity):
+    if granularity == 'year':
+        return month[:4]
+    if granularity == 'quarter':
+        return f'{month[:4]}-Q{(int(month[5:7]) - 1) // 3 + 1}'
+    return month
+
+def rollup_periods(months, granularity):
+    # Every period from the first to the last of `months`, so gaps show as zeros
+    if not months:
+        return []
+    periods = []
+    year, month = int(min(months)[:4]), int(min(months)[5:7])
+    last = max(months)
+    while f'{year:04d}-{month:02d}' <= last:
+        period = month_period(f'{year:04d}-{month:02d}', granularity)
+        if not periods or periods[-1] != period:
+            periods.append(period)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+@instrumented
+def get_financial_series(granularity='month', start=None, end=None):
+    cells = storage.finance_months(start, end)
+    series = {}
+    for period in rollup_periods([month for month, _, _ in cells if month], granularity):
+        series[period] = {'total_income': 0, 'total_expenses': 0, 'income_by_category': {}, 'expense_by_category': {}}
+    for (month, record_type, category), cents in cells.items():
+        if not month:
+            continue
+        entry = series[month_period(month, granularity)]
+        total, by_category = ('total_income', 'income_by_category') if record_type == 'Income' else \
+            ('total_expenses', 'expense_by_category')
+        entry[total] += cents
+        entry[by_category][category] = entry[by_category].get(category, 0) + cents
+    return [dict(_amount_summary(entry), period=period) for period, entry in series.items()]
+
+@instrumented
+def get_attendance_series(granularity='month', start=None, end=None):
+    cells = storage.attendance_months(start, end)
+    series = {}
+    for period in rollup_periods([month for month, _ in cells if month], granularity):
+        series[period] = {'period': period, 'hours': 0, 'headcount': 0, 'by_session': {}}
+    for (month, session_name), (hours, headcount) in cells.items():
+        if not month:
+            continue
+        entry = series[month_period(month, granularity)]
+        entry['hours'] += hours
+        entry['headcount'] += headcount
+        by_session = entry['by_session'].setdefault(session_name, {'hours': 0, 'headcount': 0})
+        by_session['hours'] += hours
+        by_session['headcount'] += headcount
+    for entry in series.values():
+        entry['hours'] = cents_to_amount(entry['hours'])
+        for by_session in entry['by_session'].values():
+            by_session['hours'] = cents_to_amount(by_session['hours'])
+    return list(series.values())
 
 # Event functions
+@instrumented
 def get_events():
-    events = []
-    if os.path.exists(EVENTS_CSV):
-        with open(EVENTS_CSV, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            events = list(reader)
-    return events
+    return storage.read('events')
 
+@instrumented
 def add_event(name, date, time, location, description):
-    with open(EVENTS_CSV, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([name, date, time, location, description])
+    storage.append('events', [name, date, time, location, description])
+
+# Edit and delete functions
+# `expected` is the record as the user saw it; the change is refused if the
+# row no longer holds it.
+@instrumented
+def get_record(table, row_id):
+    return storage.get(table, row_id)
+
+@instrumented
+def update_record(table, row_id, values, expected=None):
+    return storage.update(table, row_id, values, expected)
+
+@instrumented
+def delete_record(table, row_id, expected=None):
+    return storage.delete(table, row_id, expected)
+
+@app.template_global()
+def record_digest(record):
+    values = [str(value or '') for key, value in record.items() if key != '_id']
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()[:16]
+
+# Goals
+# A goal is appended to the todo table once and never rewritten. Completing,
+# reopening or deleting it appends one row to the todo_changes log instead.
+# Each process folds both tables into a dict by ID and a running count of
+# completed goals, and catches up with storage.tail(), so a toggle or delete
+# is one append and a lookup, whatever the number of goals.
+class TodoList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._cursors = {'todo': None, 'todo_changes': None}
+        self._todos = {}
+        self._completed = 0
+
+    def _catch_up(self):
+        # Caller holds self._lock. Changes are read before goals, so every
+        # change seen refers to a goal that is seen too.
+        changes, change_cursor, changes_restarted = storage.tail('todo_changes', self._cursors['todo_changes'])
+        todos, todo_cursor, todos_restarted = storage.tail('todo', self._cursors['todo'])
+        if (changes_restarted and self._cursors['todo_changes'] is not None) or \
+                (todos_restarted and self._cursors['todo'] is not None):
+            self._reset()
+            return self._catch_up()
+        self._cursors = {'todo': todo_cursor, 'todo_changes': change_cursor}
+
+        for record in todos:
+            todo_id = record['ID']
+            if not todo_id or todo_id in self._todos:
+                continue
+            self._todos[todo_id] = record
+            if record['Completed'] == 'True':
+                self._completed += 1
+        for change in changes:
+            todo = self._todos.get(change['ID'])
+            if todo is None:
+                continue
+            completed = todo['Completed'] == 'True'
+            if change['Change'] == 'delete':
+                del self._todos[change['ID']]
+                self._completed -= completed
+            elif change['Change'] in ('complete', 'reopen'):
+                done = change['Change'] == 'complete'
+                if done != completed:
+                    todo['Completed'] = 'True' if done else 'False'
+                    self._completed += 1 if done else -1
+
+    def all(self):
+        with self._lock:
+            self._catch_up()
+            return list(self._todos.values())
+
+    def summary(self):
+        with self._lock:
+            self._catch_up()
+            total = len(self._todos)
+            completed = self._completed
+        return {
+            'total': total,
+            'completed': completed,
+            'pending': total - completed,
+            'completion_rate': completed / total * 100 if total else 0,
+        }
+
+    def add(self, title, due_date=''):
+        with self._lock:
+            self._catch_up()
+            todo_id = storage.append_numbered('todo', 'ID', ['', title, due_date, 'False', datetime.now().strftime('%Y-%m-%d')])
+            self._catch_up()
+        return todo_id
+
+    def _change(self, todo_ids, change):
+        # Caller holds self._lock and has caught up.
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        storage.append_many('todo_changes', [[todo_id, change, now] for todo_id in todo_ids])
+        self._catch_up()
+
+    def toggle(self, todo_id):
+        # The new completed state, or None for an unknown ID
+        with self._lock:
+            self._catch_up()
+            todo = self._todos.get(todo_id)
+            if todo is None:
+                return None
+            done = todo['Completed'] != 'True'
+            self._change([todo_id], 'complete' if done else 'reopen')
+        return done
+
+    def delete(self, todo_id):
+        with self._lock:
+            self._catch_up()
+            if todo_id not in self._todos:
+                return False
+            self._change([todo_id], 'delete')
+        return True
+
+    def clear_completed(self):
+        with self._lock:
+            self._catch_up()
+            todo_ids = [todo_id for todo_id, todo in self._todos.items() if todo['Completed'] == 'True']
+            if todo_ids:
+                self._change(todo_ids, 'delete')
+        return len(todo_ids)
+
+todo_list = TodoList()
+
+# Attendance analytics
+# pandas is imported lazily (it is slow to import) and the parsed frame is
+# cached until the attendance table's version changes.
+STATS_FREQUENCIES = {'day': 'D', 'week': 'W', 'month': 'M', 'year': 'Y'}
+
+_attendance_frame = {'version': None, 'frame': None}
+_attendance_frame_lock = threading.Lock()
+
+def get_attendance_frame():
+    global _attendance_frame
+    import pandas as pd
+    version = storage.version('attendance')
+    with _attendance_frame_lock:
+        if _attendance_frame['version'] != version:
+            frame = storage.read_frame('attendance')
+            frame['Hours'] = pd.to_numeric(frame['Hours'], errors='coerce').fillna(0.0)
+            frame['Date'] = pd.to_datetime(frame['Date'], format='%Y-%m-%d', errors='coerce')
+            _attendance_frame = {'version': version, 'frame': frame}
+        return _attendance_frame['frame']
+
+@instrumented
+def get_attendance_stats(start=None, end=None, freq='month', top=10):
+    frame = get_attendance_frame()
+    if start:
+        frame = frame[frame['Date'] >= start]
+    if end:
+        frame = frame[frame['Date'] <= end]
+
+    by_member = frame.groupby('Member Name')
+    hours = by_member['Hours'].sum()
+    sessions = by_member.size()
+
+    dated = frame.dropna(subset=['Date'])
+    periods = dated['Date'].dt.to_period(STATS_FREQUENCIES[freq]).astype(str)
+    per_session = dated.groupby([periods, dated['Session Name']]).size()
+    over_time = {}
+    for (period, session_name), count in per_session.items():
+        over_time.setdefault(period, {})[session_name] = int(count)
+
+    top_members = hours.sort_values(ascending=False, kind='stable').head(top)
+    return {
+        'records': int(len(frame)),
+        'hours_per_member': {name: float(value) for name, value in hours.items()},
+        'sessions_per_member': {name: int(value) for name, value in sessions.items()},
+        'attendance_per_session': over_time,
+        'top_members': [
+            {'member': name, 'hours': float(value), 'sessions': int(sessions[name])}
+            for name, value in top_members.items()
+        ],
+    }
+
+# Event date index
+# Events sorted by (Date, Time), rebuilt only when the events table's
+# version changes, so a calendar window is two binary searches.
+_event_index = {'version': None, 'dates': [], 'events': []}
+_event_index_lock = threading.Lock()
+
+def get_event_index():
+    global _event_index
+    version = storage.version('events')
+    with _event_index_lock:
+        if _event_index['version'] != version:
+            events = sorted(get_events(), key=lambda event: (event.get('Date') or '', event.get('Time') or ''))
+            _event_index = {
+                'version': version,
+                'dates': [event.get('Date') or '' for event in events],
+                'events': events,
+            }
+        return _event_index
+
+@instrumented
+def get_events_between(start=None, end=None):
+    # start is inclusive and end exclusive, matching FullCalendar's range.
+    index = get_event_index()
+    dates = index['dates']
+    lo = bisect.bisect_left(dates, start) if start else 0
+    hi = bisect.bisect_left(dates, end) if end else len(dates)
+    return index['events'][lo:hi]
+
+# Search
+# One inverted index per table over the columns in SEARCH_FIELDS: each
+# casefolded word maps to an array of the positions of the rows holding it,
+# one entry per occurrence, and the words are kept sorted so a query word
+# finds every word it prefixes with one bisect. Rows must match every query
+# word and are ranked by BM25, an exact word weighing more than a longer one
+# it prefixes. A table is indexed from storage on its first search; later
+# searches only add the rows storage.tail() returns. Edits and deletes made
+# in this process (on_write), and changes from other processes that append
+# nothing (a version change with no new rows), re-index the table instead.
+SEARCH_FIELDS = {
+    'members': ['Member Name', 'Email'],
+    'attendance': ['Session Name', 'Notes'],
+    'finances': ['Category', 'Description'],
+    'events': ['Event Name', 'Location', 'Description'],
+}
+SEARCH_WORD = re.compile(r'\w+')
+SEARCH_PREFIX_WEIGHT = 0.7
+SEARCH_MAX_EXPANSIONS = 100  # indexed words one query prefix may match
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def search_words(text):
+    return SEARCH_WORD.findall(text.casefold()) if text else []
+
+class SearchIndex:
+    def __init__(self, fields):
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._stale = set()
+
+    def notify(self, table, change='append'):
+        if table in self.fields and change != 'append':
+            self._stale.add(table)
+
+    def _build(self, table):
+        # The version and cursor are taken before the read, so a row
+        # appended meanwhile is indexed twice rather than missed; _score()
+        # reports each row id once.
+        self._stale.discard(table)
+        index = {
+            'version': storage.version(table),
+            'cursor': storage.tail(table, None, replay=False)[1],
+            'rows': array('Q'),  # position -> row id
+            'lengths': array('I'),  # position -> words in the row
+            'total_length': 0,
+            'postings': {},  # word -> array of positions
+            'words': [],
+        }
+        self._tables[table] = index
+        self._add(table, index, storage.read(table))
+        return index
+
+    def _add(self, table, index, records):
+        postings = index['postings']
+        new_words = []
+        for record in records:
+            position = len(index['rows'])
+            words = [word for field in self.fields[table] for word in search_words(record.get(field))]
+            index['rows'].append(record['_id'])
+            index['lengths'].append(len(words))
+            index['total_length'] += len(words)
+            for word in words:
+                entries = postings.get(word)
+                if entries is None:
+                    entries = postings[word] = array('I')
+                    new_words.append(word)
+                entries.append(position)
+        if len(new_words) > 64:
+            index['words'] = sorted(postings)
+        else:
+            for word in new_words:
+                bisect.insort(index['words'], word)
+
+    def _catch_up(self, table):
+        # Caller holds self._lock.
+        index = self._tables.get(table)
+        if index is None or table in self._stale:
+            return self._build(table)
+        version = storage.version(table)
+        if version == index['version']:
+            return index
+        records, cursor, restarted = storage.tail(table, index['cursor'], replay=False)
+        if restarted or not records:
+            return self._build(table)
+        index['version'] = version
+        index['cursor'] = cursor
+        self._add(table, index, records)
+        return index
+
+    def _score(self, index, terms, limit):
+        # The best `limit` (score, row id) pairs among rows matching every
+        # term, scored over all rows at once with numpy.
+        import numpy as np
+        count = len(index['rows'])
+        if not count:
+            return []
+        lengths = np.frombuffer(index['lengths'], dtype=np.uint32)
+        norms = 1 - BM25_B + BM25_B * lengths / (index['total_length'] / count or 1)
+        words = index['words']
+        totals = None
+        for term in terms:
+            scores = np.zeros(count)
+            start = bisect.bisect_left(words, term)
+            for word in words[start:start + SEARCH_MAX_EXPANSIONS]:
+                if not word.startswith(term):
+                    break
+                positions, frequencies = np.unique(
+                    np.frombuffer(index['postings'][word], dtype=np.uint32), return_counts=True
+                )
+                weight = (1.0 if word == term else SEARCH_PREFIX_WEIGHT) * \
+                    math.log(1 + (count - len(positions) + 0.5) / (len(positions) + 0.5))
+                found = weight * frequencies * (BM25_K1 + 1) / (frequencies + BM25_K1 * norms[positions])
+                scores[positions] = np.maximum(scores[positions], found)
+            totals = scores if totals is None else np.where((totals > 0) & (scores > 0), totals + scores, 0)
+        matched = np.flatnonzero(totals)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(totals[matched], -limit)[-limit:]]
+        # A row indexed twice (see _build) is reported once.
+        rows = np.frombuffer(index['rows'], dtype=np.uint64)
+        best = {}
+        for position in matched:
+            row_id = int(rows[position])
+            best[row_id] = max(float(totals[position]), best.get(row_id, 0))
+        return [(score, row_id) for row_id, score in best.items()]
+
+    def search(self, query, tables=None, limit=SEARCH_DEFAULT_LIMIT):
+        # [(score, table, row id)], best first
+        terms = list(dict.fromkeys(search_words(query)))
+        if not terms:
+            return []
+        found = []
+        with self._lock:
+            for table in tables or self.fields:
+                scores = self._score(self._catch_up(table), terms, limit)
+                found.extend((score, table, row_id) for score, row_id in scores)
+        return heapq.nlargest(limit, found)
+
+search_index = SearchIndex(SEARCH_FIELDS)
+on_write(search_index.notify)
+
+@instrumented
+def search_records(query, tables=None, limit=SEARCH_DEFAULT_LIMIT):
+    results = []
+    for score, table, row_id in search_index.search(query, tables, limit):
+        record = storage.get(table, row_id)
+        if record is not None:
+            results.append({
+                'table': table,
+                'id': row_id,
+                'score': round(score, 3),
+                'record': {column: record[column] for column in TABLES[table]['columns']},
+            })
+    return results
+
+# Warm-up
+# Loads what the first page views would otherwise load cold: row indexes,
+# the finance snapshot, the member list and the event index. wsgi.py runs it
+# before the worker takes traffic; it returns seconds spent per step.
+def warm_up():
+    steps = [
+        ('members', get_members),
+        ('attendance', functools.partial(get_page, 'attendance')),
+        ('finances', functools.partial(get_page, 'finances')),
+        ('finance_totals', functools.partial(get_financial_summary, include_records=False)),
+        ('events', get_event_index),
+        ('todos', todo_list.summary),
+    ]
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+# Static assets
+# `flask build-assets` downloads the third-party files in VENDOR_ASSETS into
+# static/vendor/ (with the fonts and images their CSS refers to), then copies
+# every file under static/ into static/dist/ with a hash of its content in
+# the name, next to precompressed .gz (and, with the brotli package, .br)
+# copies, and lists them in static/dist/manifest.json. CSS url()s are
+# rewritten to the hashed names. Templates link assets with
+# asset_url('css/style.css'), and /assets/ serves the hashed files with a
+# one-year immutable Cache-Control, so repeat visits request none of them.
+# Before the first build asset_url falls back to the plain static file, or
+# for vendor files to the CDN.
+VENDOR_ASSETS = {
+    'vendor/bootstrap/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/fontawesome/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    'vendor/chart.js/chart.umd.min.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js',
+    'vendor/fullcalendar/index.global.min.js': 'https://cdn.jsdelivr.net/npm/fullcalendar@6.1.8/index.global.min.js',
+}
+ASSET_DIR = os.path.join(app.static_folder, 'dist')
+ASSET_MANIFEST = os.path.join(ASSET_DIR, 'manifest.json')
+ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_COMPRESSIBLE = {'.css', '.js', '.json', '.map', '.svg', '.ttf', '.eot', '.otf', '.txt', '.html'}
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_asset_manifest = {'signature': None, 'files': {}}
+mimetypes.add_type('font/woff2', '.woff2')  # missing from older Pythons' tables
+
+def _css_reference(reference):
+    # A relative url() target without its query or fragment, or None
+    reference = reference.strip()
+    if reference.startswith(('data:', '#', '/')) or '://' in reference:
+        return None
+    return reference.split('#')[0].split('?')[0]
+
+def _static_path(directory, reference):
+    # `reference` resolved against a static/ subdirectory, or None if it
+    # points outside static/
+    path = os.path.normpath(os.path.join(directory, reference)).replace(os.sep, '/')
+    return None if path.startswith('../') or path == '..' else path
+
+def vendor_assets(refresh=False):
+    # Download VENDOR_ASSETS (and what their CSS refers to) that are not
+    # in static/ yet; returns the paths fetched.
+    pending = list(VENDOR_ASSETS.items())
+    fetched = []
+    while pending:
+        name, url = pending.pop()
+        target = os.path.join(app.static_folder, name)
+        if refresh or not os.path.exists(target):
+            with urlopen(url, timeout=30) as response:
+                content = response.read()
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target + '.tmp', 'wb') as file:
+                file.write(content)
+            os.replace(target + '.tmp', target)
+            fetched.append(name)
+        if name.endswith('.css'):
+            with open(target, 'r', encoding='utf-8') as file:
+                for match in CSS_URL.finditer(file.read()):
+                    reference = _css_reference(match.group(2))
+                    path = reference and _static_path(os.path.dirname(name), reference)
+                    if path and path.startswith('vendor/') and not os.path.exists(os.path.join(app.static_folder, path)):
+                        pending.append((path, urljoin(url, reference)))
+    return fetched
+
+def _write_asset(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+
+def build_assets():
+    # Fingerprint everything under static/ into static/dist/; returns the
+    # new manifest. Stylesheets go last so their url()s can name the hashed
+    # files. Files of earlier builds are removed.
+    names = []
+    for directory, subdirectories, filenames in os.walk(app.static_folder):
+        relative = os.path.relpath(directory, app.static_folder).replace(os.sep, '/')
+        if relative == 'dist':
+            subdirectories[:] = []
+            continue
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if not filename.startswith('.') and not filename.endswith('.tmp'):
+                names.append(filename if relative == '.' else f'{relative}/{filename}')
+    names.sort(key=lambda name: name.endswith('.css'))
+
+    files = {}
+    for name in names:
+        with open(os.path.join(app.static_folder, name), 'rb') as file:
+            content = file.read()
+        if name.endswith('.css'):
+            text = content.decode('utf-8')
+            directory = os.path.dirname(name)
+
+            def hashed(match):
+                reference = _css_reference(match.group(2))
+                path = reference and _static_path(directory, reference)
+                if path not in files:
+                    return match.group(0)
+                relative = os.path.relpath(files[path], directory or '.').replace(os.sep, '/')
+                return f'url({match.group(1)}{relative}{match.group(2).strip()[len(reference):]}{match.group(1)})'
+            content = CSS_URL.sub(hashed, text).encode('utf-8')
+        stem, extension = os.path.splitext(name)
+        files[name] = f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+        target = os.path.join(ASSET_DIR, files[name])
+        _write_asset(target, content)
+        if extension.lower() in ASSET_COMPRESSIBLE:
+            compressed = gzip.compress(content, 9, mtime=0)
+            if len(compressed) < len(content):
+                _write_asset(target + '.gz', compressed)
+            if brotli is not None:
+                compressed = brotli.compress(content)
+                if len(compressed) < len(content):
+                    _write_asset(target + '.br', compressed)
+
+    keep = set(files.values())
+    keep |= {name + suffix for name in keep for suffix in ('.gz', '.br')} | {'manifest.json'}
+    for directory, _, filenames in os.walk(ASSET_DIR):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.relpath(path, ASSET_DIR).replace(os.sep, '/') not in keep:
+                os.remove(path)
+    with open(ASSET_MANIFEST + '.tmp', 'w') as file:
+        json.dump({'files': files}, file, indent=1, sort_keys=True)
+    os.replace(ASSET_MANIFEST + '.tmp', ASSET_MANIFEST)
+    return files
+
+def asset_manifest():
+    signature = _file_signature(ASSET_MANIFEST)
+    if signature != _asset_manifest['signature']:
+        try:
+            with open(ASSET_MANIFEST, 'r') as file:
+                files = json.load(file)['files']
+        except (FileNotFoundError, ValueError, KeyError):
+            files = {}
+        _asset_manifest.update(signature=signature, files=files)
+    return _asset_manifest['files']
+
+@app.template_global()
+def asset_url(name):
+    hashed = asset_manifest().get(name)
+    if hashed:
+        return url_for('asset', filename=hashed)
+    if name in VENDOR_ASSETS and not os.path.exists(os.path.join(app.static_folder, name)):
+        return VENDOR_ASSETS[name]
+    return url_for('static', filename=name)
+
+# Conditional GET
+# Pages and JSON APIs carry an ETag built from the versions of the tables
+# they read (plus the code/template build, URL and user). A matching
+# If-None-Match, or an If-Modified-Since no older than the newest data file,
+# is answered with 304 before any data is read or any template rendered.
+def _build_token():
+    root = app.root_path
+    # The asset manifest counts too: pages name the hashed asset files.
+    paths = [os.path.join(root, 'app.py'), ASSET_MANIFEST]
+    for directory, _, filenames in os.walk(os.path.join(root, 'templates')):
+        paths.extend(os.path.join(directory, filename) for filename in filenames)
+    stamps = sorted((path, os.stat(path).st_mtime_ns) for path in paths if os.path.exists(path))
+    return hashlib.sha1(repr(stamps).encode('utf-8')).hexdigest()[:12], max((stamp for _, stamp in stamps), default=0)
+
+APP_BUILD, APP_BUILD_MTIME_NS = _build_token()
+
+def data_etag(tables):
+    parts = [APP_BUILD, request.full_path, current_user.get_id() or '']
+    parts += [storage.version(table) for table in tables]
+    return hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def data_last_modified(tables):
+    if storage.name != 'csv':
+        return None
+    stamps = [APP_BUILD_MTIME_NS]
+    for table in tables:
+        for path in storage.paths(table):
+            signature = _file_signature(path)
+            if signature is not None:
+                stamps.append(signature[0])
+    newest = max(stamps) / 1e9
+    # HTTP dates have one-second resolution; a file changed within the last
+    # second could change again unnoticed, so leave it to the ETag.
+    if time.time() - newest < 1:
+        return None
+    return datetime.fromtimestamp(int(newest), timezone.utc)
+
+def conditional(*tables):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages must be rendered, never answered with 304.
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+            etag = data_etag(tables)
+            last_modified = data_last_modified(tables)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(last_modified and since and last_modified <= since)
+
+            response = Response(status=304) if not_modified else make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# Streamed rendering
+# Pages are streamed so the shell (navigation, forms) reaches the browser
+# before any table data is loaded. Views hand templates Lazy values that
+# load on first use, and the record tables are rendered through
+# cached_fragment(), which keeps their HTML per data version.
+STREAM_BUFFER_SIZE = 4096
+FRAGMENT_CACHE_MAX_CHARS = 16 * 1024 * 1024
+
+class Lazy:
+    def __init__(self, loader, *args, **kwargs):
+        self._loader = functools.partial(loader, *args, **kwargs)
+        self._loaded = False
+        self._value = None
+
+    def get(self):
+        if not self._loaded:
+            self._value = self._loader()
+            self._loaded = True
+        return self._value
+
+    def __getattr__(self, name):
+        value = self.get()
+        return value[name] if isinstance(value, dict) else getattr(value, name)
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+    def __iter__(self):
+        return iter(self.get())
+
+    def __len__(self):
+        return len(self.get())
+
+    def __bool__(self):
+        return bool(self.get())
+
+def render_streamed(template_name, **context):
+    # The session cookie goes out before the body, so flashed messages are
+    # popped now; base.html then reads them from the request cache.
+    get_flashed_messages()
+    chunks = stream_template(template_name, **context)
+
+    def buffered():
+        pending = []
+        size = 0
+        for chunk in chunks:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_BUFFER_SIZE:
+                yield ''.join(pending)
+                pending = []
+                size = 0
+        if pending:
+            yield ''.join(pending)
+    return Response(buffered(), mimetype='text/html')
+
+_fragment_cache = OrderedDict()
+_fragment_cache_chars = 0
+_fragment_cache_lock = threading.Lock()
+
+@app.template_global()
+def cached_fragment(template_name, tables, **context):
+    global _fragment_cache_chars
+    key = (template_name, tuple(storage.version(table) for table in tables), request.full_path)
+    with _fragment_cache_lock:
+        html = _fragment_cache.get(key)
+        if html is not None:
+            _fragment_cache.move_to_end(key)
+            return html
+
+    html = Markup(render_template(template_name, **context))
+    with _fragment_cache_lock:
+        if key not in _fragment_cache:
+            _fragment_cache[key] = html
+            _fragment_cache_chars += len(html)
+            while _fragment_cache_chars > FRAGMENT_CACHE_MAX_CHARS and _fragment_cache:
+                _, evicted = _fragment_cache.popitem(last=False)
+                _fragment_cache_chars -= len(evicted)
+    return html
+
+# Live feed
+# /api/live pushes newly appended attendance, finance and event rows, and
+# the finance totals whenever finances change, to open pages as server-sent
+# events. One watcher thread per process tails those tables and fans each
+# event out to every subscriber. A write in this process wakes it at once
+# (on_write); rows written by other worker processes are noticed through
+# storage.version() every LIVE_FEED_INTERVAL seconds. Each subscriber has a
+# queue of LIVE_FEED_QUEUE_SIZE events, and one that falls that far behind
+# is sent 'reset' and dropped instead of holding up the rest. The last
+# events are kept so a browser reconnecting with Last-Event-ID misses
+# nothing. A stream occupies a server thread, so at most
+# LIVE_FEED_MAX_CLIENTS are open per process and each ends after
+# LIVE_FEED_MAX_SECONDS; EventSource reconnects by itself.
+LIVE_TABLES = ('attendance', 'finances', 'events')
+LIVE_FEED_INTERVAL = 2.0
+LIVE_FEED_IDLE_SECONDS = 60
+LIVE_FEED_QUEUE_SIZE = 100
+LIVE_FEED_HEARTBEAT = 15
+LIVE_FEED_MAX_SECONDS = 300
+LIVE_FEED_RETRY_MS = 3000
+LIVE_FEED_MAX_CLIENTS = int(os.environ.get('MYSTERY_CLUB_LIVE_CLIENTS', '20'))
+LIVE_FEED_RESET = 'event: reset\ndata: {}\n\n'
+
+class LiveFeed:
+    def __init__(self, tables):
+        self.tables = tables
+        self.token = os.urandom(4).hex()  # event ids from another process are not ours
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._subscribers = set()
+        self._recent = []  # (sequence, message), newest last
+        self._sequence = 0
+        self._thread = None
+        self._cursors = {}
+        self._versions = {}
+
+    def notify(self, table, change='append'):
+        if table in self.tables:
+            self._wake.set()
+
+    def subscribe(self, last_event_id=None):
+        # A queue of SSE messages, or None when LIVE_FEED_MAX_CLIENTS are open
+        subscriber = queue.Queue(LIVE_FEED_QUEUE_SIZE)
+        token, _, sequence = (last_event_id or '').partition('-')
+        with self._lock:
+            if len(self._subscribers) >= LIVE_FEED_MAX_CLIENTS:
+                return None
+            if token == self.token and sequence.isdigit():
+                for number, message in self._recent:
+                    if number > int(sequence):
+                        subscriber.put_nowait(message)
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                # Start from the current end of each table.
+                for table in self.tables:
+                    self._versions[table] = storage.version(table)
+                    _, self._cursors[table], _ = storage.tail(table, None, replay=False)
+                self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _run(self):
+        idle_since = None
+        while True:
+            self._wake.wait(LIVE_FEED_INTERVAL)
+            self._wake.clear()
+            with self._lock:
+                if self._subscribers:
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since > LIVE_FEED_IDLE_SECONDS:
+                    self._thread = None
+                    return
+            try:
+                for table in self.tables:
+                    self._check(table)
+            except Exception:
+                app.logger.exception('Live feed watcher failed')
+
+    def _check(self, table):
+        version = storage.version(table)
+        if version == self._versions[table]:
+            return
+        self._versions[table] = version
+        # A replaced (compacted) file holds no new rows, only renumbered ones.
+        records, self._cursors[table], _ = storage.tail(table, self._cursors[table], replay=False)
+        data = {'records': records}
+        if table == 'finances':
+            data['totals'] = storage.finance_totals()
+        elif not records:
+            return
+        self._publish(table, data)
+
+    def _publish(self, name, data):
+        with self._lock:
+            self._sequence += 1
+            message = f'id: {self.token}-{self._sequence}\nevent: {name}\ndata: {json.dumps(data)}\n\n'
+            self._recent.append((self._sequence, message))
+            del self._recent[:-LIVE_FEED_QUEUE_SIZE]
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self._subscribers.discard(subscriber)
+                    with subscriber.mutex:
+                        subscriber.queue.clear()
+                    subscriber.put_nowait(LIVE_FEED_RESET)
+
+live_feed = LiveFeed(LIVE_TABLES)
+on_write(live_feed.notify)
 
 # Routes
 @app.route('/')
@@ -143,9 +3448,18 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        
-        if username == ADMIN_USER.username and check_password_hash(ADMIN_USER.password_hash, password):
-            login_user(ADMIN_USER)
+
+        if not allow_login_attempt(request.remote_addr):
+            flash('Too many login attempts. Please wait a minute and try again.')
+            return render_template('login.html'), 429
+
+        user = user_store.find(username)
+        verified = verify_password(user, password)
+        if verified is None:
+            flash('The server is busy. Please try again in a moment.')
+            return render_template('login.html'), 503
+        if verified:
+            login_user(user)
             return redirect(url_for('dashboard'))
         else:
             flash('Invalid username or password')
@@ -160,43 +3474,66 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@conditional()
 def dashboard():
     return render_template('dashboard.html')
 
 @app.route('/attendance')
 @login_required
+@conditional('attendance', 'members')
 def attendance():
-    init_csv_files()
-    members = get_members()
-    attendance_records = get_attendance_records()
-    return render_template('attendance.html', members=members, attendance_records=attendance_records)
+    members = Lazy(get_members)
+    page = Lazy(get_page, 'attendance', **_page_args())
+    return render_streamed('attendance.html', members=members, page=page)
 
 @app.route('/finances')
 @login_required
+@conditional('finances')
 def finances():
-    init_finances_csv()
-    summary = get_financial_summary()
-    return render_template('finances.html', summary=summary)
+    summary = get_financial_summary(include_records=False)
+    page = Lazy(get_page, 'finances', **_page_args())
+    return render_streamed('finances.html', summary=summary, page=page)
 
 @app.route('/events')
 @login_required
+@conditional('events')
 def events():
-    init_events_csv()
-    events_list = get_events()
-    return render_template('events.html', events=events_list)
+    events_list = Lazy(get_events)
+    return render_streamed('events.html', events=events_list)
+
+@app.route('/todos')
+@login_required
+def todos():
+    # Not conditional: the Overdue/Due Today badges change with the date.
+    return render_template('todo.html', todos=todo_list.all(), summary=todo_list.summary(),
+                           today=datetime.now().strftime('%Y-%m-%d'))
+
+@app.route('/search')
+@login_required
+@conditional(*SEARCH_FIELDS)
+def search():
+    query = request.args.get('q', '').strip()
+    table = request.args.get('table') if request.args.get('table') in SEARCH_FIELDS else ''
+    results = search_records(query, [table] if table else None) if query else []
+    return render_template('search.html', query=query, table=table, results=results,
+                           tables=EDITABLE_TABLES, fields=SEARCH_FIELDS)
 
 # Form handling routes
 @app.route('/add_member', methods=['POST'])
 @login_required
+@officer_required
 def add_member_route():
     name = request.form['name']
     email = request.form['email']
-    add_member(name, email)
-    flash('Member added successfully!')
+    if add_member(name, email):
+        flash('Member added successfully!')
+    else:
+        flash('Not added: a member with that name or email already exists.')
     return redirect(url_for('attendance'))
 
 @app.route('/add_attendance', methods=['POST'])
 @login_required
+@officer_required
 def add_attendance():
     date = request.form['date']
     member_name = request.form['member_name']
@@ -204,12 +3541,15 @@ def add_attendance():
     hours = request.form['hours']
     notes = request.form.get('notes', '')
     
-    add_attendance_record(date, member_name, session_name, hours, notes)
-    flash('Attendance record added successfully!')
+    if add_attendance_record(date, member_name, session_name, hours, notes):
+        flash('Attendance record added successfully!')
+    else:
+        flash(f'Not saved: {member_name} is not a member. Add them as a member first.')
     return redirect(url_for('attendance'))
 
 @app.route('/add_financial_record', methods=['POST'])
 @login_required
+@officer_required
 def add_financial_record_route():
     date = request.form['date']
     record_type = request.form['type']
@@ -223,6 +3563,7 @@ def add_financial_record_route():
 
 @app.route('/add_event', methods=['POST'])
 @login_required
+@officer_required
 def add_event_route():
     name = request.form['name']
     date = request.form['date']
@@ -234,61 +3575,818 @@ def add_event_route():
     flash('Event added successfully!')
     return redirect(url_for('events'))
 
+@app.route('/add_todo', methods=['POST'])
+@login_required
+@officer_required
+def add_todo_route():
+    title = request.form['title'].strip()
+    due_date = request.form.get('due_date', '').strip()
+    if len(title) < 3:
+        flash('Goal title must be at least 3 characters long!')
+        return redirect(url_for('todos'))
+    if due_date:
+        try:
+            datetime.strptime(due_date, '%Y-%m-%d')
+        except ValueError:
+            flash('Due date must be a date like 2024-10-31.')
+            return redirect(url_for('todos'))
+
+    todo_list.add(title, due_date)
+    flash('Goal added successfully!')
+    return redirect(url_for('todos'))
+
+@app.route('/toggle_todo/<todo_id>', methods=['POST'])
+@login_required
+@officer_required
+def toggle_todo(todo_id):
+    done = todo_list.toggle(todo_id)
+    if done is None:
+        flash('That goal no longer exists.')
+    elif done:
+        flash('Goal completed!')
+    return redirect(url_for('todos'))
+
+@app.route('/delete_todo/<todo_id>', methods=['POST'])
+@login_required
+@officer_required
+def delete_todo(todo_id):
+    if todo_list.delete(todo_id):
+        flash('Goal deleted.')
+    else:
+        flash('That goal no longer exists.')
+    return redirect(url_for('todos'))
+
+@app.route('/clear_completed', methods=['POST'])
+@login_required
+@officer_required
+def clear_completed():
+    count = todo_list.clear_completed()
+    flash(f"Cleared {count} completed goal{'' if count == 1 else 's'}.")
+    return redirect(url_for('todos'))
+
+# Edit and delete routes
+EDITABLE_TABLES = {
+    'attendance': {'title': 'Attendance', 'view': 'attendance', 'download': 'download_attendance'},
+    'members': {'title': 'Members', 'view': 'attendance', 'download': 'download_members'},
+    'finances': {'title': 'Finances', 'view': 'finances', 'download': 'download_finances'},
+    'events': {'title': 'Events', 'view': 'events', 'download': 'download_events'},
+}
+
+@app.route('/edit/<table>/<int:row_id>', methods=['GET', 'POST'])
+@login_required
+@officer_required
+def edit_record_route(table, row_id):
+    if table not in EDITABLE_TABLES:
+        return jsonify({'error': f'unknown table {table}'}), 404
+    spec = EDITABLE_TABLES[table]
+    record = get_record(table, row_id)
+    if record is None:
+        flash('That record no longer exists.')
+        return redirect(url_for(spec['view']))
+
+    form = record
+    if request.method == 'POST':
+        form = {column: request.form.get(column, '') for column in TABLES[table]['columns']}
+        values, error = validate_row(table, form, row_id)
+        if request.form.get('digest') != record_digest(record):
+            flash('Someone else changed this record. Review it and save again.')
+            form = record
+        elif error:
+            flash(f'Not saved: {error}')
+        elif update_record(table, row_id, values, record):
+            flash('Record updated successfully!')
+            return redirect(url_for(spec['view']))
+        else:
+            flash('Someone else changed this record. Review it and save again.')
+            return redirect(url_for('edit_record_route', table=table, row_id=row_id))
+
+    return render_template('edit_record.html', table=table, title=spec['title'], row_id=row_id,
+                           columns=TABLES[table]['columns'], form=form, digest=record_digest(record),
+                           back_url=url_for(spec['view']))
+
+@app.route('/delete/<table>/<int:row_id>', methods=['POST'])
+@login_required
+@officer_required
+def delete_record_route(table, row_id):
+    if table not in EDITABLE_TABLES:
+        return jsonify({'error': f'unknown table {table}'}), 404
+    spec = EDITABLE_TABLES[table]
+    record = get_record(table, row_id)
+    if record is None or request.form.get('digest') != record_digest(record) or \
+            not delete_record(table, row_id, record):
+        flash('That record was changed or deleted by someone else.')
+        return redirect(url_for(spec['view']))
+
+    page = get_page(table)
+    return render_template('delete_success.html', message=f"{spec['title']} record deleted.",
+                           data_type=spec['title'], redirect_url=url_for(spec['view']),
+                           download_url=url_for(spec['download']), headers=TABLES[table]['columns'],
+                           records=page['records'], total=page['total'],
+                           updated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+# Bulk import
+# Uploaded CSV or JSON-lines files are parsed as a stream, validated row by
+# row against the table's columns, and the valid rows are appended in
+# batches, so files far larger than memory can be loaded in one request.
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 100
+
+IMPORT_RULES = {
+    'attendance': {'required': ['Date', 'Member Name', 'Session Name', 'Hours'], 'dates': ['Date'], 'numbers': ['Hours']},
+    'members': {'required': ['Member Name', 'Email'], 'dates': ['Join Date'], 'numbers': []},
+    'finances': {'required': ['Date', 'Type', 'Category', 'Amount', 'Description'], 'dates': ['Date'], 'numbers': ['Amount']},
+    'events': {'required': ['Event Name', 'Date', 'Time', 'Location', 'Description'], 'dates': ['Date'], 'numbers': []},
+}
+IMPORT_REDIRECTS = {'attendance': 'attendance', 'members': 'attendance', 'finances': 'finances', 'events': 'events'}
+
+def validate_row(table, record, row_id=None, pending=None):
+    # Returns (values in column order, None) or (None, error message).
+    # Members and attendance get the checks add_member and
+    # add_attendance_record make: row_id is the row being edited, which may
+    # keep its own name and email, and `pending` collects the names and
+    # emails of members validated earlier in the same import.
+    columns = TABLES[table]['columns']
+    rules = IMPORT_RULES[table]
+    unknown = [key for key in record if key not in columns]
+    if unknown:
+        return None, f"unknown column(s): {', '.join(unknown)}"
+
+    record = {column: ('' if record.get(column) is None else str(record.get(column))).strip() for column in columns}
+    if table == 'members' and not record['Join Date']:
+        record['Join Date'] = datetime.now().strftime('%Y-%m-%d')
+    for column in rules['required']:
+        if not record[column]:
+            return None, f'{column} is required'
+    for column in rules['dates']:
+        try:
+            datetime.strptime(record[column], '%Y-%m-%d')
+        except ValueError:
+            return None, f'{column} must be a YYYY-MM-DD date'
+    for column in rules['numbers']:
+        try:
+            if float(record[column]) < 0:
+                raise ValueError
+        except ValueError:
+            return None, f'{column} must be a non-negative number'
+    if table == 'finances' and record['Type'] not in ('Income', 'Expense'):
+        return None, 'Type must be Income or Expense'
+    if table == 'members' and '@' not in record['Email']:
+        return None, 'Email is not valid'
+    if table == 'events':
+        try:
+            datetime.strptime(record['Time'], '%H:%M')
+        except ValueError:
+            return None, 'Time must be HH:MM'
+    if table == 'attendance':
+        member = member_directory.find(record['Member Name'])
+        if member is None:
+            return None, f"{record['Member Name']} is not a member. Add them as a member first."
+        record['Member Name'] = member['Member Name']
+    if table == 'members':
+        keys = {('name', normalize_name(record['Member Name'])), ('email', normalize_email(record['Email']))}
+        found = (member_directory.find(name=record['Member Name']), member_directory.find(email=record['Email']))
+        if any(member is not None and member['_id'] != row_id for member in found) or \
+                (pending is not None and keys & pending):
+            return None, 'a member with that name or email already exists.'
+        if pending is not None:
+            pending |= keys
+    return [record[column] for column in columns], None
+
+def _import_records(upload):
+    # Yield (line number, record dict or None, parse error or None).
+    lines = codecs.iterdecode(upload.stream, 'utf-8-sig')
+    filename = (upload.filename or '').lower()
+    if request.form.get('format') == 'jsonl' or filename.endswith(('.jsonl', '.ndjson')):
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield line_number, None, f'invalid JSON: {error}'
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, 'expected a JSON object'
+                continue
+            yield line_number, record, None
+    else:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, 'too many fields'
+                continue
+            yield reader.line_num, {key: value for key, value in record.items() if value is not None}, None
+
+@instrumented
+def import_rows(table, upload):
+    imported = 0
+    rejected = 0
+    errors = []
+    batch = []
+    pending = set()
+    for line_number, record, error in _import_records(upload):
+        values = None
+        if error is None:
+            values, error = validate_row(table, record, pending=pending)
+        if error is not None:
+            rejected += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({'line': line_number, 'error': error})
+            continue
+        batch.append(values)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            storage.append_many(table, batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        storage.append_many(table, batch)
+        imported += len(batch)
+    return {
+        'table': table,
+        'imported': imported,
+        'rejected': rejected,
+        'errors': errors,
+        'errors_truncated': rejected > len(errors),
+    }
+
+@app.route('/import/<table>', methods=['POST'])
+@login_required
+@officer_required
+def import_rows_route(table):
+    if table not in IMPORT_RULES:
+        return jsonify({'error': f'unknown table {table}'}), 404
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'no file uploaded'}), 400
+
+    result = import_rows(table, upload)
+
+    # Browser form posts get a flash message; API clients get the report.
+    if request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'text/html':
+        message = f"Imported {result['imported']} {table} row(s)."
+        if result['rejected']:
+            first = result['errors'][0]
+            message += f" Rejected {result['rejected']} (line {first['line']}: {first['error']})."
+        flash(message)
+        return redirect(url_for(IMPORT_REDIRECTS[table]))
+    return jsonify(result)
+
+# CSV exports
+# Filters each download route understands, mapped to the column they test.
+# Dates are compared as ISO strings, so start=2024-03&end=2024-03 selects
+# one month.
+EXPORT_FILTERS = {
+    'attendance': {'date': 'Date', 'member': 'Member Name'},
+    'members': {'date': 'Join Date', 'member': 'Member Name'},
+    'finances': {'date': 'Date', 'type': 'Type', 'category': 'Category'},
+    'events': {'date': 'Date'},
+}
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def _export_filters(table):
+    filters = {}
+    for name, column in EXPORT_FILTERS[table].items():
+        if name == 'date':
+            start = request.args.get('start', '').strip()
+            end = request.args.get('end', '').strip()
+            if start or end:
+                filters[column] = (start, end)
+        else:
+            value = request.args.get(name, '').strip()
+            if value:
+                filters[column] = value
+    return filters
+
+def _row_matches(record, filters):
+    for column, wanted in filters.items():
+        value = record.get(column) or ''
+        if isinstance(wanted, tuple):
+            start, end = wanted
+            if start and value < start:
+                return False
+            if end and value[:len(end)] > end:
+                return False
+        elif value.casefold() != wanted.casefold():
+            return False
+    return True
+
+def iter_csv_rows(path, filters):
+    # Matching live rows of one CSV as value lists, in file order, with
+    # edits and deletes applied; read as a stream.
+    index = get_row_index(path)
+    hidden = index['hidden'] if index else set()
+    replaced = index['replaced'] if index else {}
+    with open(path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        fieldnames = next(reader, None)
+        if fieldnames is None:
+            return
+        for row, values in enumerate(reader, 1):
+            if row in hidden:
+                continue
+            values = replaced.get(row, values)
+            if values and parse_marker(values, len(fieldnames)) is None and (
+                not filters or _row_matches(dict(zip(fieldnames, values)), filters)
+            ):
+                yield values
+
+def stream_csv(path, filters, header=True):
+    # Re-encode matching rows into a small buffer and hand it out whenever it
+    # fills, so memory stays flat whatever the file size. header=False leaves
+    # out the header row, for every partition after the first.
+    fieldnames = _read_header(path)[0]
+    if not fieldnames:
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fieldnames)
+    for values in iter_csv_rows(path, filters):
+        writer.writerow(values)
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_records(columns, records):
+    # stream_csv for rows that are already in memory
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for record in records:
+        writer.writerow([record.get(column, '') for column in columns])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_csv(table, download_name):
+    filters = _export_filters(table)
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    # The whole, uncompressed file goes through send_file, which already
+    # answers If-None-Match/If-Modified-Since and Range requests, unless it
+    # holds edits or deletes that have not been compacted away yet.
+    paths = storage.paths(table) if storage.name == 'csv' else []
+    whole = paths and not filters and not use_gzip and not any(dead_rows(path)[0] for path in paths)
+    if whole and len(paths) == 1:
+        # send_file resolves relative paths against the app root, not the
+        # working directory the data paths are relative to.
+        return send_file(os.path.abspath(paths[0]), as_attachment=True, download_name=download_name)
+
+    query = sorted(request.args.items(multi=True))
+    etag = hashlib.sha1(repr((storage.version(table), query)).encode('utf-8')).hexdigest()
+
+    # A partitioned table is served as one file, with Range support, too.
+    chunks = ConcatReader(paths) if whole else storage.export(table, filters)
+    mimetype = 'text/csv'
+    if use_gzip:
+        chunks = _gzip_chunks(chunks)
+        download_name += '.gz'
+        mimetype = 'application/gzip'
+
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+    response.set_etag(etag)
+    stamps = [signature[0] for signature in map(_file_signature, paths) if signature]
+    if stamps:
+        response.last_modified = datetime.fromtimestamp(max(stamps) / 1e9, timezone.utc)
+    # A 304 is decided here, before the generator is ever started.
+    if whole:
+        response.content_length = chunks.length
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response.make_conditional(request, accept_ranges=True, complete_length=chunks.length)
+    response.headers['Accept-Ranges'] = 'none'
+    return response.make_conditional(request)
+
+# Report export
+# /download_report streams one workbook with a sheet per table plus finance
+# totals and hours per member, or the same sheets as CSV files in a zip
+# (format=zip). Rows are written into the archive as they are read and the
+# compressed bytes handed to the response every EXPORT_CHUNK_SIZE, so memory
+# stays flat and the download starts at once; the summaries are tallied
+# while the attendance and finance sheets stream, so they match them
+# exactly. start/end (as for the CSV downloads) limit the dated tables.
+# The .xlsx is plain SpreadsheetML with inline strings, which needs no
+# shared-string table and so no second pass.
+REPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'mystery_club_report.xlsx'),
+    'zip': ('application/zip', 'mystery_club_report.zip'),
+}
+REPORT_TABLES = [('Members', 'members'), ('Attendance', 'attendance'), ('Finances', 'finances'), ('Events', 'events')]
+REPORT_NUMERIC = {'Hours', 'Amount', 'Sessions'}
+REPORT_NUMBER = re.compile(r'-?\d+(\.\d+)?')
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_TEXT = 32767
+XLSX_SPECIAL = re.compile('[&<>\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+XLSX_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+XLSX_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_RELATIONSHIPS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XLSX_PACKAGE_RELATIONSHIPS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.'
+XLSX_STYLES = (
+    f'<styleSheet xmlns="{XLSX_MAIN}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+def report_sheets(filters):
+    # (title, columns, rows) per sheet; rows are lazy value lists, and the
+    # summary sheets are only read after the sheets they tally.
+    hours = {}
+    totals = {}
+
+    def tally_attendance(rows):
+        name, hours_column = (TABLES['attendance']['columns'].index(column) for column in ('Member Name', 'Hours'))
+        for values in rows:
+            member = hours.setdefault(values[name], [0, 0])
+            member[0] += to_cents(values[hours_column])
+            member[1] += 1
+            yield values
+
+    def tally_finances(rows):
+        type_column, category, amount = (TABLES['finances']['columns'].index(column) for column in ('Type', 'Category', 'Amount'))
+        for values in rows:
+            key = (values[type_column], values[category])
+            totals[key] = totals.get(key, 0) + to_cents(values[amount])
+            yield values
+
+    def finance_summary():
+        income = expenses = 0
+        for (record_type, category), cents in sorted(totals.items()):
+            if record_type == 'Income':
+                income += cents
+            elif record_type == 'Expense':
+                expenses += cents
+            yield [record_type, category, f'{cents / 100:.2f}']
+        yield ['Total Income', '', f'{income / 100:.2f}']
+        yield ['Total Expenses', '', f'{expenses / 100:.2f}']
+        yield ['Balance', '', f'{(income - expenses) / 100:.2f}']
+
+    def hours_per_member():
+        for name, (hundredths, sessions) in sorted(hours.items(), key=lambda item: (-item[1][0], item[0])):
+            yield [name, str(sessions), f'{hundredths / 100:.2f}']
+
+    wrappers = {'attendance': tally_attendance, 'finances': tally_finances}
+    for title, table in REPORT_TABLES:
+        rows = storage.rows(table, {column: value for column, value in filters.items() if column in TABLES[table]['columns']})
+        yield title, TABLES[table]['columns'], wrappers.get(table, iter)(rows)
+    yield 'Finance Summary', ['Type', 'Category', 'Amount'], finance_summary()
+    yield 'Hours per Member', ['Member Name', 'Sessions', 'Hours'], hours_per_member()
+
+def xlsx_column(position):
+    letters = ''
+    position += 1
+    while position:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def xlsx_row(number, letters, values, numeric, style=''):
+    # Most rows hold nothing to escape; one search over the whole row says so.
+    plain = XLSX_SPECIAL.search(''.join(values)) is None
+    cells = []
+    for letter, value, is_numeric in zip(letters, values, numeric):
+        if is_numeric and REPORT_NUMBER.fullmatch(value):
+            cells.append(f'<c r="{letter}{number}"><v>{value}</v></c>')
+            continue
+        text = value[:XLSX_MAX_TEXT]
+        if not plain:
+            text = html.escape(XLSX_ILLEGAL.sub('', text), quote=False)
+        if text:
+            space = ' xml:space="preserve"' if text[0].isspace() or text[-1].isspace() else ''
+            cells.append(f'<c r="{letter}{number}"{style} t="inlineStr"><is><t{space}>{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+def xlsx_sheet(columns, rows):
+    # One worksheet's XML in pieces: a bold, frozen header row, then rows
+    letters = [xlsx_column(position) for position in range(len(columns))]
+    numeric = [column in REPORT_NUMERIC for column in columns]
+    yield (XML_DECLARATION + f'<worksheet xmlns="{XLSX_MAIN}"><sheetViews><sheetView workbookViewId="0">'
+           '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>')
+    yield xlsx_row(1, letters, columns, [False] * len(columns), ' s="1"')
+    for number, values in enumerate(rows, 2):
+        yield xlsx_row(number, letters, values, numeric)
+    yield '</sheetData></worksheet>'
+
+def csv_sheet(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for values in rows:
+        writer.writerow(values)
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def split_sheets(sheets, limit):
+    # A sheet with more rows than fit (header included) continues in
+    # "Title (2)", "Title (3)", ...
+    for title, columns, rows in sheets:
+        rows = iter(rows)
+        part = 1
+        while True:
+            yield title if part == 1 else f'{title} ({part})', columns, itertools.islice(rows, limit - 1)
+            following = next(rows, None)
+            if following is None:
+                break
+            rows = itertools.chain([following], rows)
+            part += 1
+
+def xlsx_package(titles):
+    # The workbook parts that list the sheets, written after them
+    sheets = ''.join(
+        f'<sheet name="{html.escape(title)}" sheetId="{number}" r:id="rId{number}"/>' for number, title in enumerate(titles, 1)
+    )
+    relationships = ''.join(
+        f'<Relationship Id="rId{number}" Type="{XLSX_RELATIONSHIPS}/worksheet" Target="worksheets/sheet{number}.xml"/>'
+        for number in range(1, len(titles) + 1)
+    )
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{number}.xml" ContentType="{XLSX_CONTENT_TYPE}worksheet+xml"/>'
+        for number in range(1, len(titles) + 1)
+    )
+    styles = len(titles) + 1
+    return [
+        ('xl/workbook.xml', f'<workbook xmlns="{XLSX_MAIN}" xmlns:r="{XLSX_RELATIONSHIPS}"><sheets>{sheets}</sheets></workbook>'),
+        ('xl/_rels/workbook.xml.rels',
+         f'<Relationships xmlns="{XLSX_PACKAGE_RELATIONSHIPS}">{relationships}'
+         f'<Relationship Id="rId{styles}" Type="{XLSX_RELATIONSHIPS}/styles" Target="styles.xml"/></Relationships>'),
+        ('xl/styles.xml', XLSX_STYLES),
+        ('[Content_Types].xml',
+         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         f'<Override PartName="/xl/workbook.xml" ContentType="{XLSX_CONTENT_TYPE}sheet.main+xml"/>'
+         f'<Override PartName="/xl/styles.xml" ContentType="{XLSX_CONTENT_TYPE}styles+xml"/>{overrides}</Types>'),
+        ('_rels/.rels',
+         f'<Relationships xmlns="{XLSX_PACKAGE_RELATIONSHIPS}">'
+         f'<Relationship Id="rId1" Type="{XLSX_RELATIONSHIPS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'),
+    ]
+
+class ZipStream:
+    # Write-only file for zipfile: collects what the archive writes until
+    # take() hands it on. zipfile sees no tell()/seek() and so writes each
+    # member's sizes after its data instead of going back for them.
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+def stream_report(sheets, report_format):
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        def write_member(name, pieces):
+            with archive.open(name, 'w') as member:
+                buffered = []
+                size = 0
+                for piece in pieces:
+                    buffered.append(piece)
+                    size += len(piece)
+                    if size >= EXPORT_CHUNK_SIZE:
+                        member.write(''.join(buffered).encode('utf-8'))
+                        buffered = []
+                        size = 0
+                        if sink.size:
+                            yield sink.take()
+                member.write(''.join(buffered).encode('utf-8'))
+            yield sink.take()
+
+        if report_format == 'zip':
+            for title, columns, rows in sheets:
+                yield from write_member(title.lower().replace(' ', '_') + '.csv', csv_sheet(columns, rows))
+        else:
+            titles = []
+            for title, columns, rows in split_sheets(sheets, XLSX_MAX_ROWS):
+                titles.append(title)
+                yield from write_member(f'xl/worksheets/sheet{len(titles)}.xml', xlsx_sheet(columns, rows))
+            for name, text in xlsx_package(titles):
+                yield from write_member(name, [XML_DECLARATION + text])
+    yield sink.take()
+
 # Download routes
+@app.route('/download_report')
+@login_required
+def download_report():
+    report_format = request.args.get('format', 'xlsx').lower()
+    if report_format not in REPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(REPORT_FORMATS)}"}), 400
+    start = request.args.get('start', '').strip()
+    end = request.args.get('end', '').strip()
+    filters = {'Date': (start, end)} if start or end else {}
+
+    query = sorted(request.args.items(multi=True))
+    versions = [storage.version(table) for _, table in REPORT_TABLES]
+    mimetype, download_name = REPORT_FORMATS[report_format]
+    response = Response(stream_report(report_sheets(filters), report_format), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+    response.headers['Accept-Ranges'] = 'none'
+    response.set_etag(hashlib.sha1(repr((versions, query)).encode('utf-8')).hexdigest())
+    return response.make_conditional(request)
+
 @app.route('/download_attendance')
 @login_required
 def download_attendance():
-    return send_file(ATTENDANCE_CSV, as_attachment=True, download_name='attendance.csv')
+    return export_csv('attendance', 'attendance.csv')
 
 @app.route('/download_members')
 @login_required
 def download_members():
-    return send_file(MEMBERS_CSV, as_attachment=True, download_name='members.csv')
+    return export_csv('members', 'members.csv')
 
 @app.route('/download_finances')
 @login_required
 def download_finances():
-    return send_file(FINANCES_CSV, as_attachment=True, download_name='finances.csv')
+    return export_csv('finances', 'finances.csv')
 
 @app.route('/download_events')
 @login_required
 def download_events():
-    return send_file(EVENTS_CSV, as_attachment=True, download_name='events.csv')
+    return export_csv('events', 'events.csv')
+
+@app.route('/download_todos')
+@login_required
+def download_todos():
+    # Goals are exported as they currently stand, with the change log applied.
+    chunks = stream_records(TABLES['todo']['columns'], todo_list.all())
+    response = Response(chunks, mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=todos.csv'
+    return response
 
 # API routes
+@app.route('/api/live')
+@login_required
+def live_feed_route():
+    subscriber = live_feed.subscribe(request.headers.get('Last-Event-ID'))
+    if subscriber is None:
+        response = jsonify({'error': 'too many live connections'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(LIVE_FEED_MAX_SECONDS)
+        return response
+
+    def stream():
+        try:
+            yield f'retry: {LIVE_FEED_RETRY_MS}\n\n'
+            deadline = time.monotonic() + LIVE_FEED_MAX_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    message = subscriber.get(timeout=LIVE_FEED_HEARTBEAT)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                yield message
+                if message is LIVE_FEED_RESET:
+                    return
+        finally:
+            live_feed.unsubscribe(subscriber)
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/search')
+@login_required
+@conditional(*SEARCH_FIELDS)
+def search_api():
+    query = request.args.get('q', '').strip()
+    tables = [table for table in request.args.get('tables', '').split(',') if table]
+    unknown = [table for table in tables if table not in SEARCH_FIELDS]
+    if unknown:
+        return jsonify({'error': f"tables must be among {', '.join(SEARCH_FIELDS)}"}), 400
+    limit = max(1, min(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), SEARCH_MAX_LIMIT))
+    return jsonify({'query': query, 'results': search_records(query, tables or None, limit)})
+
+@app.route('/api/members/suggest')
+@login_required
+@conditional('members')
+def member_suggest_api():
+    limit = max(1, min(request.args.get('limit', SUGGEST_DEFAULT_LIMIT, type=int), SUGGEST_MAX_LIMIT))
+    members = member_directory.suggest(request.args.get('q', ''), limit)
+    return jsonify([{'name': member['Member Name'], 'email': member['Email']} for member in members])
+
+def _range_args():
+    # (start, end) from YYYY-MM-DD or YYYY-MM query arguments as dates, a
+    # month standing for its first or last day; ValueError if malformed
+    bounds = []
+    for name in ('start', 'end'):
+        value = request.args.get(name) or None
+        if value is not None:
+            if len(value) == 7:
+                day = datetime.strptime(value, '%Y-%m')
+                if name == 'end':
+                    day = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+                value = day.strftime('%Y-%m-%d')
+            else:
+                datetime.strptime(value, '%Y-%m-%d')
+        bounds.append(value)
+    return tuple(bounds)
+
 @app.route('/api/financial_data')
 @login_required
+@conditional('finances')
 def financial_data_api():
-    summary = get_financial_summary()
+    # With granularity, `series` adds totals per period; its periods cover
+    # whole months even when start/end fall mid-month.
+    granularity = request.args.get('granularity') or None
+    if granularity is not None and granularity not in ROLLUP_GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(ROLLUP_GRANULARITIES)}"}), 400
+    try:
+        start, end = _range_args()
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM or YYYY-MM-DD'}), 400
+    summary = get_financial_summary(include_records=False, start=start, end=end)
     
-    # Prepare data for Chart.js
-    income_by_category = {}
-    expense_by_category = {}
-    
-    for record in summary['records']:
-        if record['Type'] == 'Income':
-            category = record['Category']
-            amount = float(record['Amount'])
-            income_by_category[category] = income_by_category.get(category, 0) + amount
-        elif record['Type'] == 'Expense':
-            category = record['Category']
-            amount = float(record['Amount'])
-            expense_by_category[category] = expense_by_category.get(category, 0) + amount
-    
-    return jsonify({
+    data = {
         'summary': {
             'total_income': summary['total_income'],
             'total_expenses': summary['total_expenses'],
             'balance': summary['balance']
         },
-        'income_by_category': income_by_category,
-        'expense_by_category': expense_by_category
+        'income_by_category': summary['income_by_category'],
+        'expense_by_category': summary['expense_by_category']
+    }
+    if granularity is not None:
+        data['granularity'] = granularity
+        data['series'] = get_financial_series(granularity, start and start[:7], end and end[:7])
+    return jsonify(data)
+
+@app.route('/api/attendance_trend')
+@login_required
+@conditional('attendance')
+def attendance_trend_api():
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in ROLLUP_GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(ROLLUP_GRANULARITIES)}"}), 400
+    try:
+        start, end = _range_args()
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM or YYYY-MM-DD'}), 400
+    return jsonify({
+        'granularity': granularity,
+        'series': get_attendance_series(granularity, start and start[:7], end and end[:7]),
     })
 
+@app.route('/api/attendance_stats')
+@login_required
+@conditional('attendance')
+def attendance_stats_api():
+    freq = request.args.get('freq', 'month')
+    if freq not in STATS_FREQUENCIES:
+        return jsonify({'error': f"freq must be one of {', '.join(STATS_FREQUENCIES)}"}), 400
+    top = max(1, min(request.args.get('top', 10, type=int), 100))
+    start = request.args.get('start') or None
+    end = request.args.get('end') or None
+    for value in (start, end):
+        if value is not None:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    stats = get_attendance_stats(start=start, end=end, freq=freq, top=top)
+    return jsonify(stats)
+
 @app.route('/api/events')
 @login_required
+@conditional('events')
 def events_api():
-    events = get_events()
+    # FullCalendar sends ISO datetimes such as 2024-01-28T00:00:00-05:00;
+    # event dates are stored as YYYY-MM-DD, so the date part is enough.
+    start = request.args.get('start', '')[:10] or None
+    end = request.args.get('end', '')[:10] or None
+    events = get_events_between(start, end)
     
     # Format events for FullCalendar.js
     calendar_events = []
@@ -302,6 +4400,100 @@ def events_api():
     
     return jsonify(calendar_events)
 
+@app.route('/metrics')
+def metrics():
+    # Scrapers authenticate with a bearer token; officers can use their session.
+    token = request.headers.get('Authorization', '')
+    if not (METRICS_TOKEN and token == f'Bearer {METRICS_TOKEN}'):
+        if not current_user.is_authenticated:
+            return Response('Unauthorized\n', status=401, mimetype='text/plain',
+                            headers={'WWW-Authenticate': 'Bearer realm="metrics"'})
+        if current_user.role not in OFFICER_ROLES:
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    # Hashed names never change content: cache for a year without
+    # revalidating, and send the precompressed copy the browser accepts.
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.exists(os.path.join(ASSET_DIR, filename + suffix)):
+            break
+    else:
+        encoding, suffix = None, ''
+    response = send_from_directory(ASSET_DIR, filename + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Content-Disposition', None)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    return response
+
+# CLI commands
+@app.cli.command('migrate-sqlite')
+@click.option('--replace', is_flag=True, help='Empty the SQLite tables before loading.')
+def migrate_sqlite_command(replace):
+    """Bulk-load data/*.csv into the SQLite database."""
+    source = CsvStorage()
+    target = SqliteStorage(SQLITE_DB)
+    for table, spec in TABLES.items():
+        if not any(os.path.exists(path) for path in source.paths(table)):
+            continue
+        # read() applies edits and deletes and joins partitions.
+        rows = ([record.get(column) or '' for column in spec['columns']] for record in source.read(table))
+        count = target.bulk_load(table, rows, replace=replace)
+        click.echo(f'{table}: loaded {count} rows')
+    click.echo(f'Done. Set MYSTERY_CLUB_STORAGE=sqlite to serve from {SQLITE_DB}.')
+
+@app.cli.command('create-user')
+@click.argument('username')
+@click.option('--role', type=click.Choice(USER_ROLES), default='member', show_default=True)
+@click.password_option()
+def create_user_command(username, role, password):
+    """Add a login account."""
+    try:
+        user = user_store.add(username, generate_password_hash(password), role)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    click.echo(f'Created {user.role} {user.username} (id {user.id})')
+
+@app.cli.command('compact')
+@click.argument('tables', nargs=-1)
+def compact_command(tables):
+    """Drop deleted and superseded rows from the data files now."""
+    for table in tables or EDITABLE_TABLES:
+        click.echo(f'{table}: dropped {storage.compact(table)} rows')
+
+@app.cli.command('partition')
+@click.argument('tables', nargs=-1)
+def partition_command(tables):
+    """Split single-file tables into yearly partition files."""
+    if storage.name != 'csv':
+        raise click.ClickException('Partitioning applies to the CSV backend only.')
+    for table in tables or PARTITIONED_TABLES:
+        if table not in PARTITIONED_TABLES:
+            raise click.BadParameter(f'{table} is not partitioned by date', param_hint='TABLES')
+        moved = partition_table(table)
+        click.echo(f'{table}: moved {moved} rows into {partition_dir(table)}/ ({len(partition_keys(table))} partitions)')
+
+@app.cli.command('build-assets')
+@click.option('--offline', is_flag=True, help='Only fingerprint what is in static/; download nothing.')
+@click.option('--refresh', is_flag=True, help='Download the vendor files again even if present.')
+def build_assets_command(offline, refresh):
+    """Vendor third-party assets and write hashed, precompressed copies to static/dist/."""
+    if not offline:
+        for name in vendor_assets(refresh):
+            click.echo(f'downloaded {name}')
+    files = build_assets()
+    click.echo(f'Built {len(files)} assets into {ASSET_DIR}' + ('' if brotli else ' (gzip only; pip install brotli for .br)'))
+
+@app.cli.command('hash-password')
+@click.password_option()
+def hash_password_command(password):
+    """Print a hash for MYSTERY_CLUB_ADMIN_PASSWORD_HASH."""
+    click.echo(generate_password_hash(password))
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', debug=True)
 
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Benchmark every Mystery Club route through the Flask test client.
+
+    python benchmark.py --rows 100000 --save benchmark_baseline.json
+    python benchmark.py --rows 100000 --compare benchmark_baseline.json
+
+A fresh dataset is generated into a temporary directory (or --data points at
+an existing data directory, which is copied first so it is never modified).
+Each route is requested --requests times; p50/p95/p99 latency and
+throughput come from that timed pass, peak memory from one extra request
+under tracemalloc. --compare exits with status 1 when a route's p95 is
+more than --tolerance slower than the saved baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import generate_data
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (name, method, url, form data)
+ROUTES = [
+    ('dashboard', 'get', '/dashboard', None),
+    ('attendance', 'get', '/attendance', None),
+    ('attendance_page_5', 'get', '/attendance?before={older}', None),
+    ('finances', 'get', '/finances', None),
+    ('events', 'get', '/events', None),
+    ('todos', 'get', '/todos', None),
+    ('api_financial_data', 'get', '/api/financial_data', None),
+    ('api_financial_trend', 'get', '/api/financial_data?granularity=month', None),
+    ('api_events_month', 'get', '/api/events?start={month_start}&end={month_end}', None),
+    ('api_events_all', 'get', '/api/events', None),
+    ('api_attendance_stats', 'get', '/api/attendance_stats', None),
+    ('api_attendance_trend', 'get', '/api/attendance_trend?granularity=month', None),
+    ('api_members_suggest', 'get', '/api/members/suggest?q={member_prefix}', None),
+    ('download_attendance', 'get', '/download_attendance', None),
+    ('download_attendance_month', 'get', '/download_attendance?start={month}&end={month}', None),
+    ('download_members', 'get', '/download_members', None),
+    ('download_finances', 'get', '/download_finances', None),
+    ('download_finances_month', 'get', '/download_finances?start={month}&end={month}', None),
+    ('download_events', 'get', '/download_events', None),
+    ('download_report', 'get', '/download_report', None),
+    ('download_report_zip', 'get', '/download_report?format=zip', None),
+    ('add_member', 'post', '/add_member', {'name': 'Bench {n}', 'email': 'bench{n}@example.org'}),
+    ('add_attendance', 'post', '/add_attendance',
+     {'date': '{today}', 'member_name': '{member}', 'session_name': 'Benchmark', 'hours': '1', 'notes': ''}),
+    ('add_financial_record', 'post', '/add_financial_record',
+     {'date': '{today}', 'type': 'Income', 'category': 'Benchmark', 'amount': '1.00', 'description': 'bench'}),
+    ('add_event', 'post', '/add_event',
+     {'name': 'Bench {n}', 'date': '{today}', 'time': '18:00', 'location': 'Lab', 'description': 'bench'}),
+    ('add_todo', 'post', '/add_todo', {'title': 'Bench goal {n}', 'due_date': ''}),
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def fill(template, context):
+    if template is None:
+        return None
+    if isinstance(template, dict):
+        return {key: fill(value, context) for key, value in template.items()}
+    return template.format(**context)
+
+
+def request(client, method, url, data):
+    response = getattr(client, method)(url, data=data)
+    # Drain streamed bodies so their cost is measured too.
+    body = response.get_data()
+    response.close()
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method.upper()} {url} returned {response.status_code}')
+    return len(body)
+
+
+def run(args):
+    work = tempfile.mkdtemp(prefix='mystery-bench-')
+    data_dir = os.path.join(work, 'data')
+    if args.data:
+        shutil.copytree(args.data, data_dir)
+        rows = None
+    else:
+        generate_data.generate(data_dir, args.rows, max(20, args.rows // 50), args.years, args.seed, args.single_file)
+        rows = args.rows
+
+    os.chdir(work)
+    sys.path.insert(0, ROOT)
+    start = time.perf_counter()
+    import app as app_module
+    import_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    app_module.warm_up()
+    warm_up_seconds = time.perf_counter() - start
+
+    app = app_module.app
+    app.config['TESTING'] = True
+    client = app.test_client()
+    response = client.post('/login', data={'username': args.username, 'password': args.password})
+    if response.status_code != 302:
+        raise SystemExit('Login failed; pass --username/--password')
+
+    members = app_module.get_members()
+    today = time.strftime('%Y-%m-%d')
+    context = {
+        'today': today,
+        'month': today[:7],
+        'month_start': today[:8] + '01',
+        'month_end': today[:8] + '28',
+        'member': members[0]['Member Name'] if members else 'Nobody',
+        'member_prefix': members[0]['Member Name'][:2] if members else 'a',
+    }
+    # The `before` cursor of the fifth page, following the Older links
+    page = app_module.storage.page('attendance')
+    for _ in range(3):
+        if page['older']:
+            page = app_module.storage.page('attendance', before=page['older'])
+    context['older'] = page['older'] or 1
+
+    results = {}
+    for name, method, url, data in ROUTES:
+        if args.routes and name not in args.routes:
+            continue
+        context['n'] = 0
+        request(client, method, fill(url, context), fill(data, context))  # warm-up
+
+        latencies = []
+        body_bytes = 0
+        began = time.perf_counter()
+        for n in range(args.requests):
+            context['n'] = n + 1
+            sent = time.perf_counter()
+            body_bytes = request(client, method, fill(url, context), fill(data, context))
+            latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - began
+
+        tracemalloc.start()
+        context['n'] = args.requests + 1
+        request(client, method, fill(url, context), fill(data, context))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'requests_per_second': args.requests / elapsed if elapsed else 0.0,
+            'peak_memory_kb': peak / 1024,
+            'response_bytes': body_bytes,
+        }
+
+    shutil.rmtree(work, ignore_errors=True)
+    return {
+        'meta': {
+            'rows': rows,
+            'requests': args.requests,
+            'python': platform.python_version(),
+            'storage': app_module.storage.name,
+            'import_seconds': import_seconds,
+            'warm_up_seconds': warm_up_seconds,
+        },
+        'routes': results,
+    }
+
+
+def print_report(report):
+    print(f"rows={report['meta']['rows']} requests={report['meta']['requests']} "
+          f"storage={report['meta']['storage']} import={report['meta']['import_seconds']:.2f}s "
+          f"warm-up={report['meta'].get('warm_up_seconds', 0):.2f}s")
+    print(f"{'route':28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'peak KB':>10} {'bytes':>10}")
+    for name, result in report['routes'].items():
+        print(f"{name:28} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f} "
+              f"{result['requests_per_second']:9.1f} {result['peak_memory_kb']:10.1f} {result['response_bytes']:10d}")
+
+
+def compare(report, baseline, tolerance, min_ms):
+    regressions = []
+    for name, result in report['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+        limit = before['p95_ms'] * (1 + tolerance)
+        if result['p95_ms'] > limit and result['p95_ms'] - before['p95_ms'] > min_ms:
+            regressions.append(f"{name}: p95 {result['p95_ms']:.2f} ms vs baseline {before['p95_ms']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='rows per table to generate (default 10000)')
+    parser.add_argument('--years', type=int, default=5, help='years of generated history (default 5)')
+    parser.add_argument('--seed', type=int, default=1, help='generator seed (default 1)')
+    parser.add_argument('--data', help='benchmark a copy of this data directory instead of generating one')
+    parser.add_argument('--single-file', action='store_true', help='generate one file per table instead of yearly partitions')
+    parser.add_argument('--requests', type=int, default=30, help='timed requests per route (default 30)')
+    parser.add_argument('--routes', nargs='*', help='only run these route names')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--save', help='write the results to this baseline file')
+    parser.add_argument('--compare', help='fail if p95 regressed against this baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown (default 0.25 = 25%%)')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='ignore regressions smaller than this (default 1 ms)')
+    args = parser.parse_args()
+    # run() changes into its scratch directory; resolve paths first.
+    for name in ('data', 'save', 'compare'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    report = run(args)
+    print_report(report)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f'Saved baseline to {args.save}')
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.tolerance, args.min_ms)
+        if regressions:
+            print('Regressions:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print('No regressions against baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Generate realistic Mystery Club data files for load testing.
+
+    python generate_data.py --rows 100000 --out /tmp/club/data
+
+Rows are written one at a time, so even 1M-row tables use constant memory.
+Attendance, finance and event rows are spread over --years of history and
+written in date order, the way the app appends them. Attendance and finances
+are split into one file per year (data/attendance/2024.csv, ...) as the app
+stores them; --single-file writes the older one-file layout instead.
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+from datetime import date, timedelta
+
+FIRST_NAMES = [
+    'Agatha', 'Arthur', 'Beatrice', 'Cedric', 'Clara', 'Dorothy', 'Edmund', 'Eleanor', 'Felix', 'Georgina',
+    'Harriet', 'Hercule', 'Iris', 'Jasper', 'Josephine', 'Lionel', 'Lucia', 'Margery', 'Miles', 'Nora',
+    'Oliver', 'Philippa', 'Quentin', 'Rosalind', 'Sebastian', 'Sybil', 'Theodore', 'Ursula', 'Vera', 'Wilfred',
+]
+LAST_NAMES = [
+    'Ashdown', 'Blackwood', 'Carrington', 'Dalgliesh', 'Ellery', 'Fairfax', 'Grimsby', 'Hastings', 'Ingram',
+    'Japp', 'Kingsley', 'Lemoine', 'Marple', 'Norwood', 'Oakes', 'Poirot', 'Quill', 'Ravenscroft', 'Strand',
+    'Thorne', 'Underwood', 'Vane', 'Whitlock', 'Yardley',
+]
+SESSIONS = [
+    'Weekly Meeting', 'Mystery Game Night', 'Book Discussion', 'Escape Room Trip', 'Cipher Workshop',
+    'Film Screening', 'Murder Mystery Dinner', 'Puzzle Hunt', 'Officer Meeting',
+]
+NOTES = ['', '', '', '', 'Arrived late', 'Left early', 'Brought snacks', 'Led the discussion', 'First visit']
+INCOME_CATEGORIES = ['Membership Dues', 'Fundraising', 'Bake Sale', 'Donations', 'Ticket Sales', 'Grant']
+EXPENSE_CATEGORIES = ['Supplies', 'Food', 'Books', 'Venue Rental', 'Printing', 'Prizes', 'Transport']
+EVENT_NAMES = [
+    'Halloween Mystery Night', 'Escape Room Challenge', 'Sherlock Film Marathon', 'Agatha Christie Book Club',
+    'Cipher Championship', 'Murder Mystery Dinner', 'Detective Trivia', 'Spring Puzzle Hunt',
+]
+LOCATIONS = ['Library Room 2', 'Student Union Hall', 'Room 114', 'Cafeteria', 'Online', 'Town Escape Rooms']
+
+HEADERS = {
+    'members.csv': ['Member Name', 'Email', 'Join Date'],
+    'attendance.csv': ['Date', 'Member Name', 'Session Name', 'Hours', 'Notes'],
+    'finances.csv': ['Date', 'Type', 'Category', 'Amount', 'Description'],
+    'events.csv': ['Event Name', 'Date', 'Time', 'Location', 'Description'],
+}
+# Split by the year of their first column (Date), as the app does
+PARTITIONED = {'attendance.csv', 'finances.csv'}
+
+
+def member_names(count, rng):
+    seen = set()
+    for index in range(count):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        if name in seen:
+            name = f'{name} {index}'
+        seen.add(name)
+        yield name
+
+
+def dates_in_order(count, first_day, days, rng):
+    # count dates spread evenly over the range, with a little jitter
+    step = days / max(count, 1)
+    for index in range(count):
+        yield first_day + timedelta(days=min(days - 1, int(index * step + rng.random() * step)))
+
+
+def write_table(path, header, rows):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_partitions(directory, header, rows):
+    # Rows arrive in date order, so only one year's file is open at a time.
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    year = None
+    file = None
+    try:
+        for row in rows:
+            row_year = str(row[0])[:4]
+            if row_year != year:
+                if file is not None:
+                    file.close()
+                year = row_year
+                path = os.path.join(directory, f'{year}.csv')
+                new = not os.path.exists(path)
+                file = open(path, 'a', newline='')
+                writer = csv.writer(file)
+                if new:
+                    writer.writerow(header)
+            writer.writerow(row)
+            count += 1
+    finally:
+        if file is not None:
+            file.close()
+    return count
+
+
+def generate(out, rows, members, years, seed, single_file=False):
+    rng = random.Random(seed)
+    os.makedirs(out, exist_ok=True)
+    # Derived sidecar files (row indexes, snapshots) would be stale, and so
+    # would a table left in the other layout.
+    for filename in os.listdir(out):
+        if filename.startswith('.'):
+            os.remove(os.path.join(out, filename))
+    for filename in PARTITIONED:
+        shutil.rmtree(os.path.join(out, os.path.splitext(filename)[0]), ignore_errors=True)
+        if os.path.exists(os.path.join(out, filename)):
+            os.remove(os.path.join(out, filename))
+
+    days = 365 * years
+    first_day = date.today() - timedelta(days=days)
+    names = list(member_names(members, rng))
+
+    def member_rows():
+        for name, joined in zip(names, dates_in_order(len(names), first_day, days, rng)):
+            email = name.lower().replace(' ', '.') + '@example.org'
+            yield [name, email, joined.isoformat()]
+
+    def attendance_rows():
+        for day in dates_in_order(rows, first_day, days, rng):
+            hours = rng.choice([0.5, 1, 1, 1.5, 2, 2, 2.5, 3, 4])
+            yield [day.isoformat(), rng.choice(names), rng.choice(SESSIONS), hours, rng.choice(NOTES)]
+
+    def finance_rows():
+        for day in dates_in_order(rows, first_day, days, rng):
+            if rng.random() < 0.45:
+                category = rng.choice(INCOME_CATEGORIES)
+                yield [day.isoformat(), 'Income', category, f'{rng.lognormvariate(3.5, 0.8):.2f}', f'{category} collected']
+            else:
+                category = rng.choice(EXPENSE_CATEGORIES)
+                yield [day.isoformat(), 'Expense', category, f'{rng.lognormvariate(3, 0.9):.2f}', f'{category} purchase']
+
+    def event_rows():
+        for day in dates_in_order(rows, first_day, days, rng):
+            name = rng.choice(EVENT_NAMES)
+            time = f'{rng.randint(15, 20):02d}:{rng.choice(["00", "30"])}'
+            yield [name, day.isoformat(), time, rng.choice(LOCATIONS), f'{name} for all members']
+
+    generators = {
+        'members.csv': member_rows(),
+        'attendance.csv': attendance_rows(),
+        'finances.csv': finance_rows(),
+        'events.csv': event_rows(),
+    }
+    counts = {}
+    for filename, table_rows in generators.items():
+        if filename in PARTITIONED and not single_file:
+            directory = os.path.join(out, os.path.splitext(filename)[0])
+            counts[directory + os.sep] = write_partitions(directory, HEADERS[filename], table_rows)
+        else:
+            counts[os.path.join(out, filename)] = write_table(os.path.join(out, filename), HEADERS[filename], table_rows)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='attendance, finance and event rows (default 10000)')
+    parser.add_argument('--members', type=int, help='member rows (default rows / 50, at least 20)')
+    parser.add_argument('--years', type=int, default=5, help='years of history to spread rows over (default 5)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default 1)')
+    parser.add_argument('--out', default='data', help='output directory (default ./data)')
+    parser.add_argument('--single-file', action='store_true', help='write attendance and finances as one file each')
+    args = parser.parse_args()
+
+    members = args.members if args.members is not None else max(20, args.rows // 50)
+    counts = generate(args.out, args.rows, members, args.years, args.seed, args.single_file)
+    for path, count in counts.items():
+        print(f'{path}: {count} rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+// Live updates for Mystery Club pages, fed by the /api/live event stream.
+//
+// Pages opt in with markup:
+//   <tbody data-live-table="attendance" data-live-columns='["Date", ...]'>
+//       new rows are added here (data-live-order="append" adds them last)
+//   <span data-live-total="balance">       replaced with the finance total
+//   <ul data-live-activity>                one line per new record
+// and can listen for 'live:<table>' events on document.
+
+(function() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    const MAX_ACTIVITY = 20;
+
+    function formatCell(column, value) {
+        const cell = document.createElement('td');
+        if (column === 'Amount') {
+            cell.textContent = '$' + Number(value || 0).toFixed(2);
+        } else if (column === 'Type') {
+            const badge = document.createElement('span');
+            badge.className = 'badge ' + (value === 'Income' ? 'bg-success' : 'bg-danger');
+            badge.textContent = value;
+            cell.appendChild(badge);
+        } else if (column === 'Event Name') {
+            const strong = document.createElement('strong');
+            strong.textContent = value;
+            cell.appendChild(strong);
+        } else {
+            cell.textContent = value || '';
+        }
+        return cell;
+    }
+
+    function addRows(table, records) {
+        document.querySelectorAll(`[data-live-table="${table}"]`).forEach(function(body) {
+            const columns = JSON.parse(body.dataset.liveColumns);
+            const append = body.dataset.liveOrder === 'append';
+            records.forEach(function(record) {
+                const row = document.createElement('tr');
+                row.className = 'table-info';
+                columns.forEach(function(column) {
+                    row.appendChild(formatCell(column, record[column]));
+                });
+                // Edit/delete buttons need the row number; they appear on reload.
+                row.appendChild(document.createElement('td'));
+                if (append) {
+                    body.appendChild(row);
+                } else {
+                    body.insertBefore(row, body.firstChild);
+                }
+            });
+        });
+    }
+
+    function updateTotals(totals) {
+        document.querySelectorAll('[data-live-total]').forEach(function(element) {
+            const value = totals[element.dataset.liveTotal];
+            if (value !== undefined) {
+                element.textContent = '$' + Number(value).toFixed(2);
+            }
+        });
+    }
+
+    function describe(table, record) {
+        if (table === 'attendance') {
+            return `Attendance: ${record['Member Name']} at ${record['Session Name']} (${record['Date']})`;
+        }
+        if (table === 'finances') {
+            return `${record['Type']}: $${Number(record['Amount'] || 0).toFixed(2)} ${record['Category']} (${record['Date']})`;
+        }
+        return `Event: ${record['Event Name']} on ${record['Date']} at ${record['Time']}`;
+    }
+
+    function addActivity(table, records) {
+        document.querySelectorAll('[data-live-activity]').forEach(function(list) {
+            const empty = list.querySelector('.live-empty');
+            if (empty) {
+                empty.remove();
+            }
+            records.forEach(function(record) {
+                const item = document.createElement('li');
+                item.className = 'list-group-item';
+                item.textContent = describe(table, record);
+                list.insertBefore(item, list.firstChild);
+            });
+            while (list.children.length > MAX_ACTIVITY) {
+                list.removeChild(list.lastChild);
+            }
+        });
+    }
+
+    const source = new EventSource('/api/live');
+
+    ['attendance', 'finances', 'events'].forEach(function(table) {
+        source.addEventListener(table, function(event) {
+            const data = JSON.parse(event.data);
+            addRows(table, data.records);
+            addActivity(table, data.records);
+            if (data.totals) {
+                updateTotals(data.totals);
+            }
+            document.dispatchEvent(new CustomEvent('live:' + table, { detail: data }));
+        });
+    });
+
+    // Sent when this page fell too far behind to catch up.
+    source.addEventListener('reset', function() {
+        source.close();
+        if (typeof showToast === 'function') {
+            showToast('Live updates paused. Reload the page to see the latest records.', 'info');
+        }
+    });
+})();
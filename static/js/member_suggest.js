@@ -0,0 +1,44 @@
+// Member typeahead for the attendance form. Suggestions are fetched from
+// /api/members/suggest as the officer types instead of listing every member.
+//
+//   <input data-suggest-url="/api/members/suggest" list="member_suggestions">
+//   <datalist id="member_suggestions"></datalist>
+
+(function() {
+    const DELAY_MS = 150;
+
+    document.querySelectorAll('[data-suggest-url]').forEach(function(input) {
+        const list = document.getElementById(input.getAttribute('list'));
+        let timer = null;
+        let latest = 0;
+
+        function load() {
+            const request = ++latest;
+            const url = input.dataset.suggestUrl + '?q=' + encodeURIComponent(input.value);
+            fetch(url, { credentials: 'same-origin' })
+                .then(function(response) {
+                    return response.ok ? response.json() : [];
+                })
+                .then(function(members) {
+                    // Answers to earlier keystrokes may arrive late.
+                    if (request !== latest) {
+                        return;
+                    }
+                    list.replaceChildren();
+                    members.forEach(function(member) {
+                        const option = document.createElement('option');
+                        option.value = member.name;
+                        option.label = member.email;
+                        list.appendChild(option);
+                    });
+                })
+                .catch(function() {});
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(load, DELAY_MS);
+        });
+        input.addEventListener('focus', load, { once: true });
+    });
+})();
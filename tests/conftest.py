@@ -0,0 +1,79 @@
+# The app keeps its data under data/ in the working directory and caches
+# most of it in module globals, so each test imports a fresh copy of app.py
+# in its own directory.
+import importlib
+import os
+import sys
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PASSWORD = 'admin123'
+# Few iterations, so logging in does not dominate the test run
+PASSWORD_HASH = generate_password_hash(PASSWORD, 'pbkdf2:sha256:1000')
+
+
+def load_app(monkeypatch, backend):
+    monkeypatch.setenv('MYSTERY_CLUB_STORAGE', backend)
+    monkeypatch.setenv('MYSTERY_CLUB_FSYNC', '0')
+    monkeypatch.setenv('MYSTERY_CLUB_ADMIN_PASSWORD_HASH', PASSWORD_HASH)
+    sys.modules.pop('app', None)
+    return importlib.import_module('app')
+
+
+def reload_app(club, monkeypatch):
+    # A new process on the same data directory: nothing is cached in memory.
+    return load_app(monkeypatch, club.storage.name)
+
+
+def stop_live_feed(club):
+    thread = club.live_feed._thread
+    if thread is not None:
+        club.LIVE_FEED_IDLE_SECONDS = 0
+        club.LIVE_FEED_INTERVAL = 0.01
+        club.live_feed._wake.set()
+        thread.join(5)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    return tmp_path / 'data'
+
+
+@pytest.fixture(params=['csv', 'sqlite'])
+def club(request, data_dir, monkeypatch):
+    module = load_app(monkeypatch, request.param)
+    yield module
+    stop_live_feed(module)
+    sys.modules.pop('app', None)
+
+
+@pytest.fixture
+def csv_club(data_dir, monkeypatch):
+    module = load_app(monkeypatch, 'csv')
+    yield module
+    stop_live_feed(module)
+    sys.modules.pop('app', None)
+
+
+def login(club, username='admin', password=PASSWORD):
+    client = club.app.test_client()
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    return client
+
+
+def add_user(club, username, role):
+    club.user_store.add(username, PASSWORD_HASH, role)
+    return login(club, username)
+
+
+@pytest.fixture
+def client(club):
+    return login(club)
@@ -0,0 +1,141 @@
+# HTTP behaviour: roles, conditional GET, downloads and the streamed report,
+# the live event stream, and the goals list.
+import csv
+import io
+import re
+import zipfile
+
+from conftest import add_user
+
+
+def add_records(club):
+    club.add_member('Ann Lee', 'ann@example.org')
+    club.add_member('Bob Ray', 'bob@example.org')
+    club.add_attendance_record('2023-11-02', 'Ann Lee', 'Ciphers', '2', '')
+    club.add_attendance_record('2024-01-05', 'Bob Ray', 'Ciphers', '1.5', '')
+    club.add_attendance_record('2024-01-12', 'Ann Lee', 'Films', '3', '')
+    club.add_financial_record('2023-12-01', 'Income', 'Dues', '40', 'December dues')
+    club.add_financial_record('2024-01-03', 'Expense', 'Food', '12.25', 'Pizza & <drinks>')
+
+
+def test_members_can_read_but_not_change_records(club):
+    add_records(club)
+    member = add_user(club, 'reader', 'member')
+    officer = add_user(club, 'officer', 'officer')
+    finance = club.storage.read('finances')[0]
+
+    for path in ('/dashboard', '/attendance', '/finances', '/events', '/todos', '/download_finances',
+                 '/api/financial_data', '/search?q=dues'):
+        assert member.get(path).status_code == 200, path
+    assert member.post('/add_event', data={'event_name': 'Quiz'}).status_code == 403
+    assert member.post('/add_todo', data={'title': 'Plan the quiz'}).status_code == 403
+    assert member.get(f"/edit/finances/{finance['_id']}").status_code == 403
+    assert member.post(f"/delete/finances/{finance['_id']}", data={'digest': club.record_digest(finance)}).status_code == 403
+    assert member.get('/metrics').status_code == 403
+    assert len(club.storage.read('finances')) == 2
+    assert club.storage.read('events') == []
+
+    assert officer.get(f"/edit/finances/{finance['_id']}").status_code == 200
+    assert officer.get('/metrics').status_code == 200
+    assert club.app.test_client().get('/metrics').status_code == 401
+
+
+def test_unchanged_data_is_answered_with_304(client, club):
+    add_records(club)
+    response = client.get('/api/financial_data')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    assert client.get('/api/financial_data', headers={'If-None-Match': etag}).status_code == 304
+    # The ETag covers the query string and the tables the route reads.
+    assert client.get('/api/financial_data?start=2024-01', headers={'If-None-Match': etag}).status_code == 200
+    club.add_attendance_record('2024-02-01', 'Ann Lee', 'Films', '1', '')
+    assert client.get('/api/financial_data', headers={'If-None-Match': etag}).status_code == 304
+    club.add_financial_record('2024-02-01', 'Income', 'Dues', '5', 'February dues')
+    response = client.get('/api/financial_data', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['summary']['total_income'] == 45
+
+
+def test_partitioned_downloads_support_ranges(csv_club):
+    add_records(csv_club)
+    client = add_user(csv_club, 'officer', 'officer')
+    assert csv_club.is_partitioned('finances')
+    response = client.get('/download_finances')
+    whole = response.get_data()
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    rows = list(csv.reader(io.StringIO(whole.decode('utf-8'))))
+    assert rows[0] == csv_club.TABLES['finances']['columns']
+    assert [row[4] for row in rows[1:]] == ['December dues', 'Pizza & <drinks>']
+
+    response = client.get('/download_finances', headers={'Range': 'bytes=10-59'})
+    assert response.status_code == 206
+    assert response.get_data() == whole[10:60]
+    assert response.headers['Content-Range'] == f'bytes 10-59/{len(whole)}'
+
+
+def test_report_workbook_has_a_sheet_per_table_and_summaries(client, club):
+    add_records(club)
+    response = client.get('/download_report?format=xlsx')
+    assert response.status_code == 200
+    assert 'mystery_club_report.xlsx' in response.headers['Content-Disposition']
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        assert archive.testzip() is None
+        workbook = archive.read('xl/workbook.xml').decode('utf-8')
+        sheets = [archive.read(f'xl/worksheets/sheet{number}.xml').decode('utf-8') for number in range(1, 7)]
+    assert re.findall(r'<sheet name="([^"]+)"', workbook) == [
+        'Members', 'Attendance', 'Finances', 'Events', 'Finance Summary', 'Hours per Member']
+    assert [sheet.count('<row ') for sheet in sheets] == [3, 4, 3, 1, 6, 3]
+    assert 'Pizza &amp; &lt;drinks&gt;' in sheets[2]
+    assert 'Balance' in sheets[4] and '27.75' in sheets[4]
+
+
+def test_report_zip_is_filtered_by_date(client, club):
+    add_records(club)
+    response = client.get('/download_report?format=zip&start=2024-01-01&end=2024-12-31')
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        assert archive.namelist() == ['members.csv', 'attendance.csv', 'finances.csv', 'events.csv',
+                                      'finance_summary.csv', 'hours_per_member.csv']
+        attendance = list(csv.reader(io.StringIO(archive.read('attendance.csv').decode('utf-8'))))
+        hours = list(csv.reader(io.StringIO(archive.read('hours_per_member.csv').decode('utf-8'))))
+    assert [row[0] for row in attendance[1:]] == ['2024-01-05', '2024-01-12']
+    assert hours[1:] == [['Ann Lee', '1', '3.00'], ['Bob Ray', '1', '1.50']]
+    assert client.get('/download_report?format=pdf').status_code == 400
+
+
+def test_live_feed_streams_new_rows(client, club, monkeypatch):
+    monkeypatch.setattr(club, 'LIVE_FEED_HEARTBEAT', 0.2)
+    response = client.get('/api/live', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    try:
+        assert next(chunks).decode('utf-8').startswith('retry: ')
+        club.add_event('Quiz', '2024-05-01', '19:00', 'Lab', 'Teams of four')
+        for _ in range(50):
+            message = next(chunks).decode('utf-8')
+            if not message.startswith(':'):
+                break
+        assert message.startswith('id: ')
+        assert 'event: events\n' in message
+        assert '"Event Name": "Quiz"' in message
+    finally:
+        response.close()
+
+
+def test_goals_can_be_added_completed_and_cleared(client, club):
+    for title in ('Plan the quiz', 'Book the hall', 'Order prizes'):
+        assert client.post('/add_todo', data={'title': title}).status_code == 302
+    assert client.post('/add_todo', data={'title': 'No', 'due_date': ''}).status_code == 302
+    ids = [todo['ID'] for todo in club.todo_list.all()]
+    assert ids == ['1', '2', '3']
+
+    client.post('/toggle_todo/1')
+    client.post('/toggle_todo/3')
+    client.post('/toggle_todo/3')
+    client.post('/delete_todo/2')
+    assert club.todo_list.summary() == {'total': 2, 'completed': 1, 'pending': 1, 'completion_rate': 50.0}
+    client.post('/clear_completed')
+    assert [todo['Title'] for todo in club.todo_list.all()] == ['Order prizes']
+    response = client.get('/download_todos')
+    assert list(csv.reader(io.StringIO(response.get_data(as_text=True))))[1][1] == 'Order prizes'
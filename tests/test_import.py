@@ -0,0 +1,109 @@
+# Bulk import: every row is validated as the add and edit forms validate
+# it, and the report says which lines were rejected and why.
+import io
+import json
+
+from conftest import add_user
+
+
+def upload(client, table, text, filename='rows.csv'):
+    response = client.post(f'/import/{table}', data={'file': (io.BytesIO(text.encode('utf-8')), filename)},
+                           headers={'Accept': 'application/json'})
+    return response.get_json()
+
+
+def test_rows_are_validated_line_by_line(client, club):
+    report = upload(client, 'finances', 'Date,Type,Category,Amount,Description\n'
+                                        '2024-01-05,Income,Dues,20,January\n'
+                                        '2024-13-01,Income,Dues,20,Late\n'
+                                        '2024-01-06,Gift,Dues,20,Gift\n'
+                                        '2024-01-07,Expense,Food,-3,Refund\n'
+                                        '2024-01-08,Expense,,3,Misc\n'
+                                        '2024-01-09,Expense,Food,4.50,Snacks\n')
+    assert report['imported'] == 2
+    assert report['rejected'] == 4
+    assert report['errors'] == [
+        {'line': 3, 'error': 'Date must be a YYYY-MM-DD date'},
+        {'line': 4, 'error': 'Type must be Income or Expense'},
+        {'line': 5, 'error': 'Amount must be a non-negative number'},
+        {'line': 6, 'error': 'Category is required'},
+    ]
+    assert [record['Description'] for record in club.storage.read('finances')] == ['January', 'Snacks']
+    assert club.storage.finance_totals()['balance'] == 15.5
+
+
+def test_unknown_columns_are_rejected(client, club):
+    report = upload(client, 'events', 'Event Name,Date,Time,Location,Description,Secret\n'
+                                      'Quiz,2024-02-01,19:00,Lab,Teams,x\n')
+    assert report['imported'] == 0
+    assert report['errors'][0]['error'] == 'unknown column(s): Secret'
+
+
+def test_json_lines_keep_numeric_zeros(client, club):
+    club.add_member('Ann Lee', 'ann@example.org')
+    lines = [{'Date': '2024-03-01', 'Member Name': 'Ann Lee', 'Session Name': 'Ciphers', 'Hours': 0},
+             {'Date': '2024-03-02', 'Member Name': 'Ann Lee', 'Session Name': 'Ciphers', 'Hours': 1.5, 'Notes': None},
+             'not an object']
+    text = '\n'.join(json.dumps(line) for line in lines) + '\n{broken\n'
+    report = upload(client, 'attendance', text, filename='rows.jsonl')
+    assert report['imported'] == 2
+    assert [error['line'] for error in report['errors']] == [3, 4]
+    assert [record['Hours'] for record in club.storage.read('attendance')] == ['0', '1.5']
+
+
+def test_members_may_not_duplicate_names_or_emails(client, club):
+    club.add_member('Ann Lee', 'ann@example.org')
+    report = upload(client, 'members', 'Member Name,Email,Join Date\n'
+                                       'ann  LEE,other@example.org,2024-01-01\n'
+                                       'Bob Ray,ANN@example.org,2024-01-01\n'
+                                       'Cid Moss,cid@example.org,2024-01-01\n'
+                                       'cid moss,cid2@example.org,2024-01-01\n'
+                                       'Dee Park,CID@example.org,\n'
+                                       'Eve Stone,eve@example.org,\n')
+    assert report['imported'] == 2
+    assert [error['line'] for error in report['errors']] == [2, 3, 5, 6]
+    assert {error['error'] for error in report['errors']} == {'a member with that name or email already exists.'}
+    assert [record['Member Name'] for record in club.storage.read('members')] == ['Ann Lee', 'Cid Moss', 'Eve Stone']
+    # A missing join date is today's.
+    assert club.storage.read('members')[2]['Join Date']
+
+
+def test_attendance_must_name_a_member(client, club):
+    club.add_member('Ann Lee', 'ann@example.org')
+    report = upload(client, 'attendance', 'Date,Member Name,Session Name,Hours,Notes\n'
+                                          '2024-03-01,Nobody,Ciphers,1,\n'
+                                          '2024-03-01,ann   lee,Ciphers,2,\n')
+    assert report['imported'] == 1
+    assert report['errors'] == [{'line': 2, 'error': 'Nobody is not a member. Add them as a member first.'}]
+    # Stored as the member directory spells the name
+    assert [record['Member Name'] for record in club.storage.read('attendance')] == ['Ann Lee']
+
+
+def test_member_edits_keep_their_own_name(client, club):
+    club.add_member('Ann Lee', 'ann@example.org')
+    club.add_member('Bob Ray', 'bob@example.org')
+    bob = club.storage.read('members')[1]
+
+    def edit(**changes):
+        form = {column: bob[column] for column in club.TABLES['members']['columns']}
+        form.update(changes, digest=club.record_digest(bob))
+        return client.post(f"/edit/members/{bob['_id']}", data=form).status_code
+
+    assert edit(**{'Email': 'ann@example.org'}) == 200
+    assert edit(**{'Member Name': 'ANN LEE'}) == 200
+    assert edit(**{'Member Name': 'Bob  Ray', 'Email': 'BOB@example.org'}) == 302
+
+
+def test_members_cannot_import(club):
+    member = add_user(club, 'reader', 'member')
+    response = member.post('/import/events', data={'file': (io.BytesIO(b'Event Name\n'), 'rows.csv')})
+    assert response.status_code == 403
+    assert club.storage.read('events') == []
+
+
+def test_browser_imports_flash_a_summary(client, club):
+    response = client.post('/import/events', data={'file': (io.BytesIO(b'Event Name,Date,Time,Location,Description\n'
+                                                                      b'Quiz,2024-02-01,19:00,Lab,Teams\nBad,,19:00,Lab,None\n'),
+                                                            'rows.csv')},
+                           headers={'Accept': 'text/html'}, follow_redirects=True)
+    assert 'Imported 1 events row(s). Rejected 1 (line 3: Date is required).' in response.get_data(as_text=True)
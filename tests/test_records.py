@@ -0,0 +1,156 @@
+# Edits and deletes: the marker overlay on CSV files, compaction, and the
+# edit/delete routes, on both storage backends.
+import csv
+import time
+
+from conftest import reload_app
+
+COLUMNS = ['Event Name', 'Date', 'Time', 'Location', 'Description']
+
+
+def add_events(club, count):
+    for n in range(count):
+        club.add_event(f'Event {n}', '2024-05-01', '18:00', 'Lab', f'Talk {n}')
+    return club.storage.read('events')
+
+
+def values(record):
+    return [record[column] for column in COLUMNS]
+
+
+def names(club):
+    return [record['Event Name'] for record in club.storage.read('events')]
+
+
+def test_edit_replaces_the_row_in_place(club):
+    records = add_events(club, 5)
+    record = records[2]
+    changed = values(record)
+    changed[0] = 'Renamed'
+
+    assert club.update_record('events', record['_id'], changed, record)
+    assert club.get_record('events', record['_id'])['Event Name'] == 'Renamed'
+    assert names(club) == ['Event 0', 'Event 1', 'Renamed', 'Event 3', 'Event 4']
+    page = club.storage.page('events', limit=10)['records']
+    assert sorted(record['Event Name'] for record in page) == sorted(names(club))
+
+
+def test_delete_hides_the_row(club):
+    records = add_events(club, 5)
+    record = records[1]
+
+    assert club.delete_record('events', record['_id'], record)
+    assert club.get_record('events', record['_id']) is None
+    assert names(club) == ['Event 0', 'Event 2', 'Event 3', 'Event 4']
+    assert len(club.storage.page('events', limit=10)['records']) == 4
+    # A deleted row cannot be deleted or edited again.
+    assert not club.delete_record('events', record['_id'], record)
+    assert not club.update_record('events', record['_id'], values(record), record)
+
+
+def test_stale_edits_are_refused(club):
+    record = add_events(club, 3)[0]
+    first = values(record)
+    first[4] = 'First edit'
+    assert club.update_record('events', record['_id'], first, record)
+
+    second = values(record)
+    second[4] = 'Second edit'
+    assert not club.update_record('events', record['_id'], second, record)
+    assert club.get_record('events', record['_id'])['Description'] == 'First edit'
+
+
+def test_edit_route_checks_the_digest(client, club):
+    record = add_events(club, 2)[0]
+    form = dict(zip(COLUMNS, values(record)), digest=club.record_digest(record))
+    form['Location'] = 'Library'
+    response = client.post(f"/edit/events/{record['_id']}", data=form)
+    assert response.status_code == 302
+    assert club.get_record('events', record['_id'])['Location'] == 'Library'
+
+    # The same form again carries the digest of the old values.
+    form['Location'] = 'Hall'
+    response = client.post(f"/edit/events/{record['_id']}", data=form, follow_redirects=True)
+    assert 'Someone else changed this record' in response.get_data(as_text=True)
+    assert club.get_record('events', record['_id'])['Location'] == 'Library'
+
+
+def test_delete_route(client, club):
+    record = add_events(club, 2)[1]
+    response = client.post(f"/delete/events/{record['_id']}", data={'digest': club.record_digest(record)})
+    assert 'Events record deleted.' in response.get_data(as_text=True)
+    assert names(club) == ['Event 0']
+
+    # Deleting it a second time changes nothing.
+    response = client.post(f"/delete/events/{record['_id']}", data={'digest': club.record_digest(record)})
+    assert response.status_code == 302
+    assert names(club) == ['Event 0']
+
+
+def test_edit_route_validates_rows(client, club):
+    record = add_events(club, 1)[0]
+    form = dict(zip(COLUMNS, values(record)), digest=club.record_digest(record))
+    form['Time'] = 'evening'
+    response = client.post(f"/edit/events/{record['_id']}", data=form)
+    assert 'Not saved: Time must be HH:MM' in response.get_data(as_text=True)
+    assert club.get_record('events', record['_id'])['Time'] == '18:00'
+
+
+def test_markers_are_appended_and_reloaded(csv_club, monkeypatch):
+    records = add_events(csv_club, 6)
+    changed = values(records[0])
+    changed[0] = 'Renamed'
+    csv_club.update_record('events', records[0]['_id'], changed, records[0])
+    csv_club.delete_record('events', records[3]['_id'], records[3])
+
+    with open(csv_club.EVENTS_CSV, newline='') as file:
+        rows = list(csv.reader(file))[1:]
+    assert len(rows) == 8
+    assert [row[0] for row in rows[6:]] == [csv_club.REPLACEMENT, csv_club.TOMBSTONE]
+
+    expected = names(csv_club)
+    fresh = reload_app(csv_club, monkeypatch)
+    assert names(fresh) == expected == ['Renamed', 'Event 1', 'Event 2', 'Event 4', 'Event 5']
+    assert fresh.get_record('events', records[3]['_id']) is None
+
+
+def test_compaction_drops_markers_and_renumbers(csv_club, monkeypatch):
+    records = add_events(csv_club, 10)
+    for record in records[:4]:
+        csv_club.delete_record('events', record['_id'], record)
+    changed = values(records[5])
+    changed[4] = 'Edited'
+    csv_club.update_record('events', records[5]['_id'], changed, records[5])
+    before = csv_club.storage.read('events')
+
+    # Five markers, four deleted rows and one replaced row
+    assert csv_club.storage.compact('events') == 10
+    with open(csv_club.EVENTS_CSV, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == COLUMNS
+    assert rows[1:] == [values(record) for record in before]
+    after = csv_club.storage.read('events')
+    assert [values(record) for record in after] == [values(record) for record in before]
+    assert [record['_id'] for record in after] == [1, 2, 3, 4, 5, 6]
+    assert csv_club.dead_rows(csv_club.EVENTS_CSV) == (0, 6)
+
+    # An edit form opened before compaction is refused, not applied to
+    # whatever row now has that number.
+    assert not csv_club.update_record('events', records[5]['_id'], changed, records[5])
+    fresh = reload_app(csv_club, monkeypatch)
+    assert [values(record) for record in fresh.storage.read('events')] == [values(record) for record in before]
+
+
+def test_deletes_start_a_background_compaction(csv_club, monkeypatch):
+    monkeypatch.setattr(csv_club, 'COMPACT_MIN_DEAD', 4)
+    records = add_events(csv_club, 8)
+    csv_club.delete_record('events', records[0]['_id'], records[0])
+    assert csv_club.dead_rows(csv_club.EVENTS_CSV) == (2, 9)
+
+    csv_club.delete_record('events', records[1]['_id'], records[1])
+    for _ in range(500):
+        if csv_club.dead_rows(csv_club.EVENTS_CSV) == (0, 6):
+            break
+        time.sleep(0.01)
+    assert csv_club.dead_rows(csv_club.EVENTS_CSV) == (0, 6)
+    assert names(csv_club) == [f'Event {n}' for n in range(2, 8)]
@@ -0,0 +1,162 @@
+# The running finance totals and attendance rollups must match a recount of
+# the live rows after any mix of appends, edits, deletes and compaction.
+import random
+
+from conftest import reload_app
+
+FINANCE_COLUMNS = ['Date', 'Type', 'Category', 'Amount', 'Description']
+ATTENDANCE_COLUMNS = ['Date', 'Member Name', 'Session Name', 'Hours', 'Notes']
+
+
+def expected_finances(club, start=None, end=None):
+    summary = {'total_income': 0, 'total_expenses': 0, 'income_by_category': {}, 'expense_by_category': {}}
+    months = {}
+    for record in club.storage.read('finances'):
+        if (start and record['Date'] < start) or (end and record['Date'] > end):
+            continue
+        cents = club.to_cents(record['Amount'])
+        key = 'income' if record['Type'] == 'Income' else 'expense'
+        summary['total_income' if key == 'income' else 'total_expenses'] += cents
+        by_category = summary[f'{key}_by_category']
+        by_category[record['Category']] = by_category.get(record['Category'], 0) + cents
+        month = (record['Date'][:7], record['Type'], record['Category'])
+        months[month] = months.get(month, 0) + cents
+    return club._amount_summary(summary), months
+
+
+def expected_attendance(club):
+    cells = {}
+    for record in club.storage.read('attendance'):
+        cell = cells.setdefault((record['Date'][:7], record['Session Name']), [0, 0])
+        cell[0] += club.to_cents(record['Hours'])
+        cell[1] += 1
+    return cells
+
+
+def assert_finances_match(club):
+    totals, months = expected_finances(club)
+    assert club.storage.finance_totals() == totals
+    assert club.storage.finance_months() == months
+    totals, _ = expected_finances(club, '2024-03-01', '2024-08-31')
+    assert club.storage.finance_totals('2024-03-01', '2024-08-31') == totals
+
+
+def hold_compaction(club, monkeypatch):
+    # Background compaction renumbers rows between a read and the edit that
+    # follows it; these tests compact explicitly instead.
+    monkeypatch.setattr(club, 'COMPACT_MIN_DEAD', 10 ** 9)
+    return club
+
+
+def mutate(club, table, columns, change, steps, rng):
+    for _ in range(steps):
+        record = rng.choice(club.storage.read(table))
+        if rng.random() < 0.4:
+            assert club.delete_record(table, record['_id'], record)
+        else:
+            values = [record[column] for column in columns]
+            change(values, rng)
+            assert club.update_record(table, record['_id'], values, record)
+
+
+def change_finance(values, rng):
+    values[1] = rng.choice(['Income', 'Expense'])
+    values[2] = rng.choice(['Dues', 'Food', 'Books', 'Prizes'])
+    values[3] = f'{rng.randint(1, 5000) / 100:.2f}'
+    if rng.random() < 0.3:
+        values[0] = f'{rng.choice([2023, 2024])}-{rng.randint(1, 12):02d}-15'
+
+
+def add_finances(club, rng, count):
+    for _ in range(count):
+        club.add_financial_record(f'{rng.choice([2023, 2024])}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                                  rng.choice(['Income', 'Expense']), rng.choice(['Dues', 'Food', 'Books']),
+                                  f'{rng.randint(1, 10000) / 100:.2f}', '')
+
+
+def test_finance_totals_follow_edits_and_deletes(club, monkeypatch):
+    hold_compaction(club, monkeypatch)
+    rng = random.Random(1)
+    add_finances(club, rng, 120)
+    assert_finances_match(club)
+
+    mutate(club, 'finances', FINANCE_COLUMNS, change_finance, 60, rng)
+    assert_finances_match(club)
+    add_finances(club, rng, 20)
+    assert_finances_match(club)
+
+    club.storage.compact('finances')
+    assert_finances_match(club)
+    assert_finances_match(reload_app(club, monkeypatch))
+
+
+def test_totals_saved_by_another_process_are_reused(csv_club, monkeypatch):
+    hold_compaction(csv_club, monkeypatch)
+    rng = random.Random(2)
+    add_finances(csv_club, rng, 40)
+    assert_finances_match(csv_club)
+    mutate(csv_club, 'finances', FINANCE_COLUMNS, change_finance, 10, rng)
+
+    # A second copy catches up from the saved columns, then both mutate.
+    other = hold_compaction(reload_app(csv_club, monkeypatch), monkeypatch)
+    assert_finances_match(other)
+    mutate(other, 'finances', FINANCE_COLUMNS, change_finance, 10, rng)
+    mutate(csv_club, 'finances', FINANCE_COLUMNS, change_finance, 10, rng)
+    assert_finances_match(csv_club)
+    assert_finances_match(other)
+
+
+def test_emptied_categories_leave_the_totals(club):
+    club.add_financial_record('2024-01-01', 'Expense', 'Food', '12.50', '')
+    club.add_financial_record('2024-01-02', 'Income', 'Dues', '10', '')
+    assert club.storage.finance_totals()['expense_by_category'] == {'Food': 12.5}
+
+    record = next(record for record in club.storage.read('finances') if record['Category'] == 'Food')
+    club.delete_record('finances', record['_id'], record)
+    totals = club.storage.finance_totals()
+    assert totals['expense_by_category'] == {}
+    assert totals['income_by_category'] == {'Dues': 10.0}
+    assert club.storage.finance_totals('2024-01-01', '2024-01-31')['expense_by_category'] == {}
+    assert club.storage.finance_months() == {('2024-01', 'Income', 'Dues'): 1000}
+
+
+def change_attendance(values, rng):
+    values[2] = rng.choice(['Puzzles', 'Ciphers', 'Cases', 'Films'])
+    values[3] = str(rng.randint(1, 16) / 4)
+    if rng.random() < 0.3:
+        values[0] = f'{rng.choice([2023, 2024])}-{rng.randint(1, 12):02d}-10'
+
+
+def test_attendance_rollup_follows_edits_and_deletes(club, monkeypatch):
+    hold_compaction(club, monkeypatch)
+    rng = random.Random(3)
+    for n in range(6):
+        club.add_member(f'Member {n}', f'member{n}@example.org')
+    for _ in range(150):
+        assert club.add_attendance_record(f'{rng.choice([2023, 2024])}-{rng.randint(1, 12):02d}-01',
+                                          f'Member {rng.randrange(6)}', rng.choice(['Puzzles', 'Ciphers', 'Cases']),
+                                          str(rng.randint(1, 16) / 4), '')
+    assert club.storage.attendance_months() == expected_attendance(club)
+
+    mutate(club, 'attendance', ATTENDANCE_COLUMNS, change_attendance, 80, rng)
+    assert club.storage.attendance_months() == expected_attendance(club)
+
+    club.storage.compact('attendance')
+    assert club.storage.attendance_months() == expected_attendance(club)
+    fresh = reload_app(club, monkeypatch)
+    assert fresh.storage.attendance_months() == expected_attendance(fresh)
+
+
+def test_attendance_markers_do_not_rescan_the_file(csv_club, monkeypatch):
+    for n in range(3):
+        csv_club.add_member(f'Member {n}', f'member{n}@example.org')
+    for n in range(30):
+        csv_club.add_attendance_record('2024-02-01', f'Member {n % 3}', 'Puzzles', '1.5', '')
+    csv_club.storage.attendance_months()
+
+    def recount(self):
+        raise AssertionError('rollup recounted the whole file')
+    monkeypatch.setattr(csv_club.AttendanceRollup, '_recount', recount)
+    rng = random.Random(4)
+    mutate(csv_club, 'attendance', ATTENDANCE_COLUMNS, change_attendance, 20, rng)
+    assert csv_club.storage.attendance_months() == expected_attendance(csv_club)
@@ -0,0 +1,78 @@
+# Full-text search (BM25 over the SEARCH_FIELDS of each table) and the
+# member name typeahead.
+def add_events(club):
+    club.add_event('Cipher night', '2024-05-01', '18:00', 'Lab', 'Caesar and Vigenere ciphers')
+    club.add_event('Film club', '2024-05-02', '18:00', 'Hall', 'A detective film, then a cipher')
+    club.add_event('Cipher cipher cipher', '2024-05-03', '18:00', 'Lab', 'Ciphers all evening')
+    club.add_event('Board games', '2024-05-04', '18:00', 'Lab', 'Deduction games')
+
+
+def titles(results):
+    return [result['record']['Event Name'] for result in results]
+
+
+def test_results_are_ranked_and_need_every_term(club):
+    add_events(club)
+    results = club.search_records('cipher')
+    assert titles(results) == ['Cipher cipher cipher', 'Cipher night', 'Film club']
+    assert [result['score'] for result in results] == sorted((result['score'] for result in results), reverse=True)
+    assert titles(club.search_records('cipher film')) == ['Film club']
+    assert club.search_records('cipher chess') == []
+    assert club.search_records('  ') == []
+
+
+def test_words_match_by_prefix(club):
+    add_events(club)
+    assert titles(club.search_records('deduct')) == ['Board games']
+    # An exact word outranks a longer word it is a prefix of.
+    club.add_event('Puzzles', '2024-05-05', '18:00', 'Lab', 'Evening')
+    club.add_event('Puzzle', '2024-05-06', '18:00', 'Lab', 'Evening')
+    assert titles(club.search_records('puzzle')) == ['Puzzle', 'Puzzles']
+
+
+def test_edits_and_deletes_reach_the_index(club):
+    add_events(club)
+    record = next(record for record in club.storage.read('events') if record['Event Name'] == 'Board games')
+    values = [record[column] for column in club.TABLES['events']['columns']]
+    values[0] = 'Riddle games'
+    assert club.update_record('events', record['_id'], values, record)
+    assert titles(club.search_records('riddle')) == ['Riddle games']
+    assert club.search_records('board') == []
+
+    record = club.get_record('events', record['_id'])
+    assert club.delete_record('events', record['_id'], record)
+    assert club.search_records('riddle') == []
+    club.add_event('Riddle relay', '2024-06-01', '18:00', 'Lab', 'Teams')
+    assert titles(club.search_records('riddle')) == ['Riddle relay']
+
+
+def test_search_api_filters_tables(client, club):
+    add_events(club)
+    club.add_member('Cipher Jones', 'cj@example.org')
+    response = client.get('/api/search?q=cipher&tables=members')
+    assert [result['table'] for result in response.get_json()['results']] == ['members']
+    response = client.get('/api/search?q=cipher&limit=2')
+    assert len(response.get_json()['results']) == 2
+    assert client.get('/api/search?q=cipher&tables=secrets').status_code == 400
+
+
+def test_suggest_matches_names_later_words_and_emails(client, club):
+    club.add_member('Ann Lee', 'ann@example.org')
+    club.add_member('Bob Annand', 'bob@example.org')
+    club.add_member('Cid Moss', 'moss.c@example.org')
+
+    def suggest(prefix, limit=10):
+        response = client.get('/api/members/suggest', query_string={'q': prefix, 'limit': limit})
+        return [member['name'] for member in response.get_json()]
+
+    assert suggest('ann') == ['Ann Lee', 'Bob Annand']
+    assert suggest('ANN', limit=1) == ['Ann Lee']
+    assert suggest('moss') == ['Cid Moss']
+    assert suggest('bob@') == ['Bob Annand']
+    assert suggest('zed') == []
+
+    club.add_member('Anna Field', 'field@example.org')
+    assert suggest('ann') == ['Ann Lee', 'Anna Field', 'Bob Annand']
+    record = club.storage.read('members')[0]
+    assert club.delete_record('members', record['_id'], record)
+    assert suggest('ann') == ['Anna Field', 'Bob Annand']
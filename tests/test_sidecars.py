@@ -0,0 +1,96 @@
+# Sidecar files are shared by every worker process; these tests run the
+# app in separate processes against one data directory.
+import csv
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRELUDE = f'import sys\nsys.path.insert(0, {ROOT!r})\nimport app\n'
+
+
+def script(code):
+    return [sys.executable, '-c', PRELUDE + code]
+
+
+def run(cwd, code):
+    return subprocess.run(script(code), cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def test_catching_up_does_not_duplicate_row_offsets(tmp_path):
+    os.makedirs(tmp_path / 'data')
+    run(tmp_path, "app.storage.init_table('events')\n"
+                  "for n in range(200):\n    app.add_event(f'E{n}', '2024-01-01', '18:00', 'Lab', '')")
+
+    # Both workers have the index loaded; one appends (saving the new
+    # offsets), then the other catches up on the same rows.
+    reader = subprocess.Popen(
+        script("app.get_row_index(app.EVENTS_CSV)\nprint('ready', flush=True)\nsys.stdin.readline()\n"
+               "print(len(app.get_row_index(app.EVENTS_CSV)['offsets']) - 1)"),
+        cwd=tmp_path, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    assert reader.stdout.readline().strip() == 'ready'
+    run(tmp_path, "app.get_row_index(app.EVENTS_CSV)\n"
+                  "for n in range(5):\n    app.add_event(f'W{n}', '2024-01-02', '18:00', 'Lab', '')")
+    output, _ = reader.communicate('\n', timeout=60)
+    assert output.strip() == '205'
+
+    with open(tmp_path / 'data' / 'events.csv', newline='') as file:
+        rows = sum(1 for _ in csv.reader(file)) - 1
+    output = run(tmp_path, "index = app.get_row_index(app.EVENTS_CSV)\n"
+                           "page = app.storage.page('events', limit=10)\n"
+                           "print(len(index['offsets']) - 1, max(record['_id'] for record in page['records']))")
+    assert output.split() == [str(rows), str(rows)]
+
+
+def test_catching_up_does_not_shift_finance_columns(tmp_path):
+    os.makedirs(tmp_path / 'data')
+    run(tmp_path, "app.storage.init_table('finances')\n"
+                  "for n in range(50):\n    app.add_financial_record('2026-03-01', 'Income', 'Dues', '100', '')")
+
+    # As above, with a snapshot in both workers; the one catching up then
+    # appends (and deletes) rows of its own.
+    reader = subprocess.Popen(
+        script("app.get_financial_summary(include_records=False)\nprint('ready', flush=True)\nsys.stdin.readline()\n"
+               "app.get_financial_summary(include_records=False)\n"
+               "for n in range(5):\n    app.add_financial_record('2026-04-01', 'Income', 'Sales', '1.01', '')\n"
+               "record = app.storage.read('finances')[0]\napp.delete_record('finances', record['_id'], record)"),
+        cwd=tmp_path, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    assert reader.stdout.readline().strip() == 'ready'
+    run(tmp_path, "app.get_financial_summary(include_records=False)\n"
+                  "for n in range(10):\n    app.add_financial_record('2026-03-02', 'Income', 'Dues', '100', '')")
+    reader.communicate('\n', timeout=60)
+
+    output = run(tmp_path, "print(app.get_financial_summary(include_records=False, start='2026-03-01', end='2026-03-31')['total_income'],\n"
+                           "      app.get_financial_summary(include_records=False, start='2026-04-01', end='2026-04-30')['total_income'])")
+    assert output.split() == ['5900.0', '5.05']
+
+
+def test_concurrent_goals_get_distinct_ids(tmp_path):
+    os.makedirs(tmp_path / 'data')
+    run(tmp_path, "app.todo_list.add('First')")
+
+    # Every worker has caught up on the same goals before any of them adds.
+    workers = [
+        subprocess.Popen(
+            script("app.todo_list.all()\nprint('ready', flush=True)\nsys.stdin.readline()\n"
+                   "for n in range(5):\n    app.todo_list.add(f'Goal {n}')"),
+            cwd=tmp_path, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(4)
+    ]
+    for worker in workers:
+        assert worker.stdout.readline().strip() == 'ready'
+    for worker in workers:
+        worker.stdin.write('\n')
+        worker.stdin.flush()
+    for worker in workers:
+        worker.communicate(timeout=60)
+        assert worker.returncode == 0
+
+    with open(tmp_path / 'data' / 'todo.csv', newline='') as file:
+        ids = [row['ID'] for row in csv.DictReader(file)]
+    assert sorted(ids, key=int) == [str(n) for n in range(1, 22)]
+    output = run(tmp_path, "print(app.todo_list.summary()['total'])")
+    assert output.strip() == '21'
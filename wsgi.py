@@ -2,6 +2,9 @@
 
 import sys
 import os
+import time
+
+started = time.perf_counter()
 
 # Add your project directory to the sys.path
 path = '/home/yourusername/mystery_club'
@@ -11,8 +14,27 @@ if path not in sys.path:
 # Set the working directory
 os.chdir(path)
 
-from app import app as application
+# Precomputed admin password hash (generate one with `flask hash-password`)
+# os.environ.setdefault('MYSTERY_CLUB_ADMIN_PASSWORD_HASH', 'pbkdf2:sha256:...')
+
+# Client IPs come from the X-Forwarded-For header of PythonAnywhere's proxy.
+# os.environ.setdefault('MYSTERY_CLUB_PROXIES', '1')
+
+from app import app as application, warm_up
+
+imported = time.perf_counter()
+
+# Preload table caches before this worker accepts traffic.
+# Set MYSTERY_CLUB_WARM_UP=0 to skip.
+if os.environ.get('MYSTERY_CLUB_WARM_UP', '1') != '0':
+    timings = warm_up()
+    steps = ' '.join(f'{name}={seconds * 1000:.0f}ms' for name, seconds in timings.items())
+else:
+    steps = 'skipped'
+
+ready = time.perf_counter()
+print(f'Mystery Club ready in {ready - started:.3f}s '
+      f'(import {imported - started:.3f}s, warm-up {ready - imported:.3f}s: {steps})', file=sys.stderr)
 
 if __name__ == "__main__":
     application.run()
-